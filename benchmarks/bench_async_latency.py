@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Event loop latency while AMinidumpFileReader.search scans a large dump.
+# A ticker task sleeps 1ms in a loop and records how late it wakes up, a blocked loop shows up as few ticks with a large lag.
+# "blocking" is the file source AsyncFile was before it read in an executor (plain file reads in async defs),
+# "AsyncFile" is the current one. The dump is a synthetic one (tests/dumpgen.py) written to a temporary file.
+#
+# python3 benchmarks/bench_async_latency.py [dump size in MB]
+#
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from minidump.aminidumpfile import AMinidumpFile
+from dumpgen import make_dump
+
+PATTERN = b'\x11\x22\x33\x44\x55\x66\x77\x88'
+
+class BlockingFile:
+	"""
+	The file source before the executor reads, every read blocks the event loop
+	"""
+	def __init__(self, filename):
+		self.filename = filename
+		self.fhandle = open(filename, 'rb')
+
+	async def read(self, n = -1):
+		return self.fhandle.read(n)
+
+	async def seek(self, n, beg = 0):
+		return self.fhandle.seek(n, beg)
+
+	def tell(self):
+		return self.fhandle.tell()
+
+	def close(self):
+		self.fhandle.close()
+
+async def ticker(stop, lags):
+	while not stop.is_set():
+		start = time.perf_counter()
+		await asyncio.sleep(0.001)
+		lags.append(time.perf_counter() - start - 0.001)
+
+async def measure(mf, chunksize):
+	reader = mf.get_reader()
+	stop = asyncio.Event()
+	lags = []
+	task = asyncio.create_task(ticker(stop, lags))
+	await asyncio.sleep(0) # let the ticker start
+	start = time.perf_counter()
+	hits = await reader.search(PATTERN, chunksize = chunksize)
+	elapsed = time.perf_counter() - start
+	stop.set()
+	await task
+	lags.sort()
+	return elapsed, len(hits), lags
+
+async def run(filename, hit_count):
+	print('%-10s %10s %8s %8s %10s %10s %10s' % ('source', 'chunk', 'search s', 'ticks', 'p50 ms', 'p99 ms', 'max ms'))
+	for chunksize in [1024*1024, 4*1024*1024]:
+		for name in ['blocking', 'AsyncFile']:
+			if name == 'blocking':
+				handle = BlockingFile(filename)
+				mf = await AMinidumpFile.parse_external(handle, filename)
+			else:
+				mf = await AMinidumpFile.parse(filename)
+				handle = mf.file_handle
+			elapsed, hits, lags = await measure(mf, chunksize)
+			handle.close()
+			if hits != hit_count:
+				raise Exception('%s found %d hits instead of %d' % (name, hits, hit_count))
+			print('%-10s %10d %8.2f %8d %10.2f %10.2f %10.2f' % (
+				name, chunksize, elapsed, len(lags), lags[len(lags) // 2] * 1e3, lags[int(len(lags) * 0.99)] * 1e3, lags[-1] * 1e3)
+			)
+
+def main():
+	size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	# segments are 64KB-256KB, 128KB on average
+	data, segments = make_dump(segment_count = size_mb * 1024 // 128, segment_size = 0x10000)
+	data = bytearray(data)
+	# a hit in every 100th segment, so the search runs through the whole dump
+	hit_count = 0
+	for va, segment in segments[::100]:
+		pos = data.find(segment)
+		data[pos + 0x100 : pos + 0x100 + len(PATTERN)] = PATTERN
+		hit_count += 1
+	with tempfile.TemporaryDirectory() as tempdir:
+		filename = os.path.join(tempdir, 'bench.dmp')
+		with open(filename, 'wb') as f:
+			f.write(data)
+		del data
+		print('dump: %d MB, %d segments' % (os.path.getsize(filename) // (1024*1024), len(segments)))
+		asyncio.run(run(filename, hit_count))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Memory footprint of the per-entry parsed objects, bytes per entry for every stream.
+# "before" models the objects as they were before they got __slots__: the same attributes stored in an instance __dict__
+# (the parsed entry is copied into instances of a plain class with the same name, nested entries included).
+#
+# python3 benchmarks/bench_memory_footprint.py [entries]
+#
+import io
+import os
+import sys
+import enum
+import struct
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from minidump.common_structs import MinidumpMemorySegment
+from minidump.streams.MemoryListStream import MINIDUMP_MEMORY_DESCRIPTOR
+from minidump.streams.Memory64ListStream import MINIDUMP_MEMORY_DESCRIPTOR64
+from minidump.streams.MemoryInfoListStream import MINIDUMP_MEMORY_INFO, MinidumpMemoryInfo
+from minidump.streams.HandleDataStream import MINIDUMP_HANDLE_DESCRIPTOR, MINIDUMP_HANDLE_DESCRIPTOR_2, MinidumpHandleDescriptor
+from minidump.streams.ModuleListStream import MINIDUMP_MODULE, MinidumpModule
+from minidump.streams.UnloadedModuleListStream import MINIDUMP_UNLOADED_MODULE, MinidumpUnloadedModule
+from minidump.streams.ThreadListStream import MINIDUMP_THREAD
+from minidump.streams.ThreadExListStream import MINIDUMP_THREAD_EX
+from minidump.streams.ThreadInfoListStream import MINIDUMP_THREAD_INFO
+from minidump.streams.ContextStream import CONTEXT, WOW64_CONTEXT
+
+# the module names are read from offset 0 of the buffer
+NAME = 'C:\\Windows\\System32\\ntdll.dll'.encode('utf-16-le')
+NAME_BUFFER = struct.pack('<I', len(NAME)) + NAME + b'\x00\x00'
+
+def buffer(data):
+	return io.BytesIO(data)
+
+# stream, entry type, function creating the i-th entry
+ENTRIES = [
+	('MemoryListStream', 'MINIDUMP_MEMORY_DESCRIPTOR', lambda i: MINIDUMP_MEMORY_DESCRIPTOR.parse(buffer(struct.pack('<QII', 0x10000 + i * 0x1000, 0x1000, 0x100)))),
+	('Memory64ListStream', 'MinidumpMemorySegment', lambda i: MinidumpMemorySegment.parse_full(MINIDUMP_MEMORY_DESCRIPTOR64.parse(buffer(struct.pack('<QQ', 0x10000 + i * 0x1000, 0x1000))), i * 0x1000)),
+	('MemoryInfoListStream', 'MINIDUMP_MEMORY_INFO', lambda i: MINIDUMP_MEMORY_INFO.parse(buffer(struct.pack('<QQIIQIIII', 0x10000 + i * 0x1000, 0x10000, 4, 0, 0x1000, 0x1000, 4, 0x20000, 0)))),
+	('MemoryInfoListStream', 'MinidumpMemoryInfo', lambda i: MinidumpMemoryInfo.parse(MINIDUMP_MEMORY_INFO.parse(buffer(struct.pack('<QQIIQIIII', 0x10000 + i * 0x1000, 0x10000, 4, 0, 0x1000, 0x1000, 4, 0x20000, 0))), None)),
+	('HandleDataStream', 'MINIDUMP_HANDLE_DESCRIPTOR', lambda i: MINIDUMP_HANDLE_DESCRIPTOR.parse(buffer(struct.pack('<QIIIII', 4 * i, 0, 0, 0, 0x1f0fff, 1)))),
+	('HandleDataStream', 'MINIDUMP_HANDLE_DESCRIPTOR_2', lambda i: MINIDUMP_HANDLE_DESCRIPTOR_2.parse(buffer(struct.pack('<QIIIIIII', 4 * i, 0, 0, 0, 0x1f0fff, 1, 0, 0)))),
+	('HandleDataStream', 'MinidumpHandleDescriptor', lambda i: MinidumpHandleDescriptor.parse(MINIDUMP_HANDLE_DESCRIPTOR.parse(buffer(struct.pack('<QIIIII', 4 * i, 0, 0, 0, 0x1f0fff, 1))), None)),
+	('ModuleListStream', 'MinidumpModule', lambda i: MinidumpModule.parse(MINIDUMP_MODULE.parse(buffer(struct.pack('<QIIII', 0x7ff000000000 + i * 0x100000, 0x4000, 0, 0, 0) + b'\x00' * 84)), buffer(NAME_BUFFER))),
+	('UnloadedModuleListStream', 'MinidumpUnloadedModule', lambda i: MinidumpUnloadedModule.parse(MINIDUMP_UNLOADED_MODULE.parse(buffer(struct.pack('<QIIII', 0x7ff000000000 + i * 0x100000, 0x4000, 0, 0, 0))), buffer(NAME_BUFFER))),
+	('ThreadListStream', 'MINIDUMP_THREAD', lambda i: MINIDUMP_THREAD.parse(buffer(struct.pack('<IIIIQ', i, 0, 0, 0, 0x7ff000000000 + i * 0x1000) + b'\x00' * 24))),
+	('ThreadExListStream', 'MINIDUMP_THREAD_EX', lambda i: MINIDUMP_THREAD_EX.parse(buffer(struct.pack('<IIIIQ', i, 0, 0, 0, 0x7ff000000000 + i * 0x1000) + b'\x00' * 40))),
+	('ThreadInfoListStream', 'MINIDUMP_THREAD_INFO', lambda i: MINIDUMP_THREAD_INFO.parse(buffer(struct.pack('<III', i, 0, 0) + b'\x00' * 52))),
+	('ThreadListStream (context)', 'CONTEXT', lambda i: CONTEXT.parse(buffer(struct.pack('<QQQQQQ', i, i + 1, i + 2, i + 3, i + 4, i + 5) + b'\x00' * 1184))),
+	('ThreadListStream (context)', 'WOW64_CONTEXT', lambda i: WOW64_CONTEXT.parse(buffer(struct.pack('<IIII', i, i + 1, i + 2, i + 3) + b'\x00' * 700))),
+]
+
+PLAIN_TYPES = {}
+
+def get_slots(cls):
+	slots = []
+	for klass in reversed(cls.__mro__):
+		for name in klass.__dict__.get('__slots__', ()):
+			if name not in slots:
+				slots.append(name)
+	return slots
+
+def unslotted(obj):
+	"""
+	Copies obj into an instance of a plain (__dict__ backed) class with the same attributes, recursively
+	"""
+	if isinstance(obj, list):
+		return [unslotted(x) for x in obj]
+	cls = type(obj)
+	if not hasattr(cls, '__slots__') or not cls.__module__.startswith('minidump') or isinstance(obj, enum.Enum):
+		return obj
+	plain_type = PLAIN_TYPES.get(cls)
+	if plain_type is None:
+		plain_type = type(cls.__name__, (), {})
+		PLAIN_TYPES[cls] = plain_type
+	plain = plain_type()
+	for name in get_slots(cls):
+		if hasattr(obj, name):
+			setattr(plain, name, unslotted(getattr(obj, name)))
+	return plain
+
+def measure(create, count):
+	"""
+	Returns the bytes allocated per object by create(i) and the objects
+	"""
+	tracemalloc.start()
+	objects = [create(i) for i in range(count)]
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return size / count, objects
+
+def slotted_size(obj):
+	"""
+	Size of the slotted instances in obj, these are replaced by the plain instances in the "before" model
+	"""
+	if isinstance(obj, list):
+		return sum(slotted_size(x) for x in obj)
+	cls = type(obj)
+	if not hasattr(cls, '__slots__') or not cls.__module__.startswith('minidump') or isinstance(obj, enum.Enum):
+		return 0
+	return sys.getsizeof(obj) + sum(slotted_size(getattr(obj, name)) for name in get_slots(cls) if hasattr(obj, name))
+
+def main():
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	list_size, _ = measure(lambda i: None, count)
+	print('%-28s %-30s %12s %12s %8s' % ('stream', 'entry', 'before B', 'after B', 'saved'))
+	for stream, name, create in ENTRIES:
+		after, objects = measure(create, count)
+		# the copies share the attribute values with the originals, only the containers are new
+		plain, _ = measure(lambda i: unslotted(objects[i]), count)
+		before = after - slotted_size(objects[0]) + plain - list_size
+		print('%-28s %-30s %12d %12d %7.0f%%' % (stream, name, before, after, (before - after) * 100 / before))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Cost of resolving a virtual address to its memory segment vs the number of segments.
+# "linear" is the scan over the segment list the readers did before MinidumpSegmentIndex, "index" is MinidumpSegmentIndex.find.
+# "random" looks up addresses in random segments, "local" stays in the same segment for 16 lookups (pointer chasing).
+# The reader rows time MinidumpFileReader.read of 8 bytes from a synthetic dump (tests/dumpgen.py).
+#
+# python3 benchmarks/bench_segment_index.py [lookups]
+#
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from minidump.common_structs import MinidumpMemorySegment, MinidumpSegmentIndex
+from minidump.minidumpfile import MinidumpFile
+from dumpgen import make_dump
+
+SEGMENT_COUNTS = [100, 1000, 10000, 100000]
+
+class Descriptor:
+	def __init__(self, start, size):
+		self.StartOfMemoryRange = start
+		self.DataSize = size
+
+def make_segments(count):
+	segments = []
+	va = 0x10000
+	for i in range(count):
+		segments.append(MinidumpMemorySegment.parse_full(Descriptor(va, 0x1000), i * 0x1000))
+		va += 0x2000 # every segment is followed by an unmapped gap
+	return segments
+
+def get_addresses(segments, count, local):
+	rnd = random.Random(1)
+	addresses = []
+	while len(addresses) < count:
+		segment = rnd.choice(segments)
+		for _ in range(16 if local is True else 1):
+			addresses.append(rnd.randrange(segment.start_virtual_address, segment.end_virtual_address))
+	return addresses[:count]
+
+def linear_find(segments, virt_addr):
+	for segment in segments:
+		if segment.inrange(virt_addr):
+			return segment
+	return None
+
+def timeit(func, addresses):
+	"""
+	Returns the time per call of func in microseconds
+	"""
+	start = time.perf_counter()
+	for address in addresses:
+		func(address)
+	return (time.perf_counter() - start) / len(addresses) * 1e6
+
+def main():
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	print('%-10s %-8s %14s %14s %10s' % ('segments', 'pattern', 'linear us', 'index us', 'speedup'))
+	for segment_count in SEGMENT_COUNTS:
+		segments = make_segments(segment_count)
+		index = MinidumpSegmentIndex(segments)
+		for pattern in ['random', 'local']:
+			addresses = get_addresses(segments, count, pattern == 'local')
+			# the linear scan is slow with many segments, it is timed on fewer addresses
+			linear = timeit(lambda a: linear_find(segments, a), addresses[:max(100, count * 1000 // segment_count)])
+			indexed = timeit(index.find, addresses)
+			print('%-10d %-8s %14.2f %14.2f %9.0fx' % (segment_count, pattern, linear, indexed, linear / indexed))
+
+	print()
+	print('%-10s %-8s %14s' % ('segments', 'pattern', 'read us'))
+	for segment_count in [100, 1000, 10000]:
+		data, segments = make_dump(segment_count = segment_count)
+		reader = MinidumpFile.parse_bytes(data).get_reader()
+		for pattern in ['random', 'local']:
+			rnd = random.Random(1)
+			addresses = []
+			while len(addresses) < count:
+				va, segment = rnd.choice(segments)
+				for _ in range(16 if pattern == 'local' else 1):
+					addresses.append(va + rnd.randrange(len(segment) - 8))
+			print('%-10d %-8s %14.2f' % (segment_count, pattern, timeit(lambda a: reader.read(a, 8), addresses[:count])))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+import bisect
+import itertools
+from array import array
+
+from minidump.common_structs import MinidumpSegmentTable, MinidumpSegmentIndex
+from minidump.streams.MemoryInfoListStream import MinidumpMemoryInfoTable, MemoryState, AllocationProtect
+
+class MinidumpAddressRange:
+	"""
+	A piece of the address space with the same memory info region, captured memory region and module.
+	info: MinidumpMemoryInfo or None, segment: the (merged) captured MinidumpMemorySegment or None, module: MinidumpModule or None
+	"""
+	__slots__ = ('start', 'end', 'info', 'segment', 'module', 'is_accessible')
+
+	def __init__(self):
+		self.start = None
+		self.end = None
+		self.info = None
+		self.segment = None
+		self.module = None
+		self.is_accessible = None
+
+	@property
+	def is_captured(self):
+		return self.segment is not None
+
+	def __str__(self):
+		return '[%s - %s] %s%s%s%s' % (
+			hex(self.start),
+			hex(self.end),
+			'captured' if self.is_captured else 'not captured',
+			'' if self.is_accessible else ' inaccessible',
+			' %s' % self.info.State.name if self.info is not None and self.info.State is not None else '',
+			' %s' % self.module.name if self.module is not None else '',
+		)
+
+class MinidumpAddressMap:
+	"""
+	Address space map joining the memory info regions, the captured memory regions and the modules.
+	The address space is cut at every start and end address of those into pieces, the map stores the start address of
+	every piece and which region/captured region/module (if any) covers it, so an address is looked up with one binary search.
+	A piece is inaccessible if its memory info region is not committed, or is a no access or guard page.
+	"""
+	def __init__(self, memory_info = None, regions = None, modules = None):
+		"""
+		memory_info: MinidumpMemoryInfoTable (or list of MinidumpMemoryInfo) or None
+		regions: MinidumpSegmentIndex of the captured memory regions (contiguous segments merged)
+		modules: list of MinidumpModule
+		"""
+		if memory_info is not None and not isinstance(memory_info, MinidumpMemoryInfoTable):
+			memory_info = MinidumpMemoryInfoTable.from_infos(memory_info)
+		if regions is not None and not isinstance(regions, MinidumpSegmentIndex):
+			regions = MinidumpSegmentIndex(regions)
+		self.memory_info = memory_info
+		self.regions = regions
+		self.modules = list(modules) if modules is not None else []
+
+		intervals = []
+		if self.memory_info is not None:
+			intervals.append([(base, base + size) for base, size in zip(self.memory_info.base_addresses, self.memory_info.region_sizes)])
+		else:
+			intervals.append([])
+		if self.regions is not None and isinstance(self.regions.segments, MinidumpSegmentTable):
+			intervals.append([(start, start + size) for start, size in zip(self.regions.segments.starts, self.regions.segments.sizes)])
+		elif self.regions is not None:
+			intervals.append([(x.start_virtual_address, x.end_virtual_address) for x in self.regions.segments])
+		else:
+			intervals.append([])
+		intervals.append([(x.baseaddress, x.endaddress) for x in self.modules])
+
+		points = set()
+		for entries in intervals:
+			for start, end in entries:
+				if end > start:
+					points.add(start)
+					points.add(end)
+		points = sorted(points)
+		# piece i is [starts[i], starts[i+1]), the last piece ends at self.end
+		self.starts = array('Q', points[:-1])
+		self.end = points[-1] if len(points) > 0 else 0
+		self.info_ids, self.region_ids, self.module_ids = [MinidumpAddressMap.assign(self.starts, entries) for entries in intervals]
+
+		self.accessible = bytearray(b'\x01') * len(self.starts)
+		if self.memory_info is not None:
+			# most regions share a handful of state/protect combinations
+			values = {}
+			for key in zip(self.memory_info.states, self.memory_info.protects):
+				if key not in values:
+					values[key] = MinidumpAddressMap.is_accessible_value(*key)
+			info_accessible = [values[key] for key in zip(self.memory_info.states, self.memory_info.protects)]
+			self.accessible = bytearray(x == -1 or info_accessible[x] for x in self.info_ids)
+
+	@staticmethod
+	def assign(starts, entries):
+		"""
+		Returns the index of the entry covering each piece (-1 where there is none)
+		"""
+		order = sorted((x for x in range(len(entries)) if entries[x][1] > entries[x][0]), key = lambda x: entries[x][0])
+		entry_starts = [entries[x][0] for x in order]
+		entry_ends = [entries[x][1] for x in order]
+		# entry_starts[j - 1] is the last entry starting at or before the piece
+		positions = map(bisect.bisect_right, itertools.repeat(entry_starts), starts)
+		return array('i', [order[j - 1] if j > 0 and start < entry_ends[j - 1] else -1 for j, start in zip(positions, starts)])
+
+	@staticmethod
+	def is_accessible_value(state, protect):
+		if state != MemoryState.MEM_COMMIT.value:
+			return False
+		if protect & 0xff in [0, AllocationProtect.PAGE_NOACCESS.value]:
+			return False
+		return protect & AllocationProtect.PAGE_GUARD.value == 0
+
+	def __len__(self):
+		return len(self.starts)
+
+	def get_piece_end(self, i):
+		return self.starts[i + 1] if i + 1 < len(self.starts) else self.end
+
+	def get_range(self, i, start = None, end = None):
+		r = MinidumpAddressRange()
+		r.start = self.starts[i] if start is None else max(start, self.starts[i])
+		r.end = self.get_piece_end(i) if end is None else min(end, self.get_piece_end(i))
+		if self.info_ids[i] != -1:
+			r.info = self.memory_info[self.info_ids[i]]
+		if self.region_ids[i] != -1:
+			r.segment = self.regions.segments[self.region_ids[i]]
+		if self.module_ids[i] != -1:
+			r.module = self.modules[self.module_ids[i]]
+		r.is_accessible = self.accessible[i] == 1
+		return r
+
+	def is_hole(self, i):
+		return self.info_ids[i] == -1 and self.region_ids[i] == -1 and self.module_ids[i] == -1
+
+	def find(self, virt_addr):
+		"""
+		Returns the MinidumpAddressRange containing virt_addr, None if nothing is known about the address
+		"""
+		i = bisect.bisect_right(self.starts, virt_addr) - 1
+		if i < 0 or virt_addr >= self.get_piece_end(i) or self.is_hole(i):
+			return None
+		return self.get_range(i)
+
+	def get_pieces(self, start, end):
+		"""
+		Returns the range of piece indices overlapping [start, end)
+		"""
+		first = max(bisect.bisect_right(self.starts, start) - 1, 0)
+		last = bisect.bisect_left(self.starts, end)
+		return range(first, last)
+
+	def iter_ranges(self, start = None, end = None):
+		"""
+		Yields the MinidumpAddressRange pieces overlapping [start, end) in address order, clipped to [start, end).
+		Addresses nothing is known about are skipped.
+		"""
+		start = start if start is not None else 0
+		end = end if end is not None else self.end
+		for i in self.get_pieces(start, end):
+			if self.is_hole(i) or self.get_piece_end(i) <= start:
+				continue
+			yield self.get_range(i, start, end)
+
+	def iter_captured(self, start = None, end = None, accessible_only = False):
+		"""
+		Yields (start, end, segment) for the captured parts of [start, end) in address order, adjacent pieces of the
+		same captured region are joined. With accessible_only the parts which are known to be inaccessible are skipped.
+		"""
+		start = start if start is not None else 0
+		end = end if end is not None else self.end
+		current = None
+		for i in self.get_pieces(start, end):
+			region_id = self.region_ids[i]
+			if region_id == -1 or (accessible_only is True and self.accessible[i] == 0):
+				continue
+			pstart = max(start, self.starts[i])
+			pend = min(end, self.get_piece_end(i))
+			if pend <= pstart:
+				continue
+			if current is not None and current[2] == region_id and current[1] == pstart:
+				current[1] = pend
+				continue
+			if current is not None:
+				yield current[0], current[1], self.regions.segments[current[2]]
+			current = [pstart, pend, region_id]
+		if current is not None:
+			yield current[0], current[1], self.regions.segments[current[2]]
+
+	def iter_gaps(self, start = None, end = None):
+		"""
+		Yields (start, end) for the parts of [start, end) which are not captured in the dump, in address order.
+		Without start/end the whole address range of the map is reported.
+		"""
+		start = start if start is not None else (self.starts[0] if len(self.starts) > 0 else 0)
+		end = end if end is not None else self.end
+		pos = start
+		for cstart, cend, _ in self.iter_captured(start, end):
+			if cstart > pos:
+				yield pos, cstart
+			pos = cend
+		if pos < end:
+			yield pos, end
+
+	def is_captured(self, virt_addr, size = 1):
+		"""
+		Returns True if all of [virt_addr, virt_addr + size) is captured in the dump
+		"""
+		segment = self.regions.find(virt_addr) if self.regions is not None else None
+		return segment is not None and virt_addr + size <= segment.end_virtual_address
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+import asyncio
+
+from minidump.chunkcache import AMinidumpChunkCache
+from minidump.common_structs import AReadAtFile
+from minidump.httpfile import HTTPRangeSource, get_fetch_parts
+
+class AHTTPRangeFile(AReadAtFile):
+	"""
+	Async read only file object for a file served over HTTP(S), for AMinidumpFile.parse_external.
+	Same as HTTPRangeFile, the blocking requests run in an executor (like the reads of AsyncFile) and the blocks are kept
+	in an AMinidumpChunkCache, so tasks missing the same block at the same time wait for one request.
+	read_at(offset, size) reads at an absolute offset, concurrent readers can use it safely.
+	executor: concurrent.futures executor running the requests, None uses the event loop's default executor
+	"""
+	def __init__(self, url, block_size = 64*1024, cache_size = 64*1024*1024, max_connections = 8, retries = 3, timeout = 30, headers = None, executor = None):
+		AReadAtFile.__init__(self)
+		self.url = url
+		self.source = HTTPRangeSource(url, headers = headers, max_connections = max_connections, retries = retries, timeout = timeout)
+		self.cache = AMinidumpChunkCache(max_size = cache_size, block_size = block_size)
+		self.max_connections = max_connections
+		self.executor = executor
+
+	async def get_size(self):
+		if self.source.size is None:
+			# the first block is needed anyway, the header of the dump is there
+			await self.read_at(0, 1)
+		return self.source.size
+
+	def fetch_block_range(self, first, last):
+		block_size = self.cache.block_size
+		return self.source.fetch(first * block_size, (last + 1) * block_size)
+
+	async def fetch_blocks(self, missing):
+		"""
+		Fetches the missing blocks, returns a block index -> block dict
+		"""
+		loop = asyncio.get_running_loop()
+		parts = get_fetch_parts(missing, self.max_connections)
+		self.cache.begin_fetch(missing)
+		try:
+			results = await asyncio.gather(*[loop.run_in_executor(self.executor, self.fetch_block_range, first, last) for first, last in parts])
+		except BaseException as e:
+			self.cache.fail_fetch(missing, e)
+			raise
+
+		block_size = self.cache.block_size
+		blocks = {}
+		for (first, last), data in zip(parts, results):
+			for k in range(first, last + 1):
+				block = data[(k - first) * block_size : (k - first + 1) * block_size]
+				if len(block) == 0:
+					break
+				blocks[k] = block
+		self.cache.end_fetch(list(blocks.keys()), list(blocks.values()))
+		# blocks past the end of the file, tasks waiting for them see the size of the file and skip them
+		self.cache.fail_fetch(missing, asyncio.CancelledError())
+		return blocks
+
+	async def read_at(self, offset, size):
+		if self.source.size is not None:
+			size = min(size, self.source.size - offset)
+		if size <= 0:
+			return b''
+		block_size = self.cache.block_size
+		first = offset // block_size
+		last = (offset + size - 1) // block_size
+		blocks = {k : self.cache.get(k) for k in range(first, last + 1)}
+		while True:
+			if self.source.size is not None:
+				last = min(last, (self.source.size - 1) // block_size)
+			missing = []
+			pending = []
+			for k in range(first, last + 1):
+				if blocks.get(k) is not None:
+					continue
+				if k in self.cache:
+					# fetched by another task while this one was waiting
+					blocks[k] = self.cache.get(k)
+				elif self.cache.is_pending(k):
+					pending.append(k)
+				else:
+					missing.append(k)
+			if len(missing) == 0 and len(pending) == 0:
+				break
+			if len(missing) > 0:
+				blocks.update(await self.fetch_blocks(missing))
+			for k in pending:
+				# if the fetch of the other task got cancelled the block is fetched in the next round
+				blocks[k] = await self.cache.wait(k)
+		start = offset - first * block_size
+		if first == last:
+			return blocks[first][start : start + size]
+		return b''.join(blocks[k] for k in range(first, last + 1))[start : start + size]
+
+	def close(self):
+		self.source.close()
+
+	def get_stats(self):
+		"""
+		Returns the request counters of the source and the block cache counters
+		"""
+		stats = self.source.get_stats()
+		stats['cache'] = self.cache.get_stats()
+		return stats
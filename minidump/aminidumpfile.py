@@ -5,32 +5,69 @@
 #
 
 import io
+import os
 import sys
 import enum
 import struct
+import asyncio
 import logging
+import threading
 
 from minidump.header import MinidumpHeader
 from minidump.aminidumpreader import AMinidumpFileReader
 from minidump.streams import *
 from minidump.common_structs import *
-from minidump.constants import MINIDUMP_STREAM_TYPE
+from minidump.constants import MINIDUMP_STREAM_TYPE, MINIDUMP_STREAM_ATTRIBUTES
 from minidump.directory import MINIDUMP_DIRECTORY
+from minidump.indexfile import MinidumpIndexFile
 
 
-class AsyncFile:
-	def __init__(self, filename):
+class AsyncFile(AReadAtFile):
+	"""
+	Async file source doing positional reads (os.pread) in an executor, so reading large segments does not block the event loop.
+	read_at(offset, size) reads at an absolute offset without any seek state, concurrent readers can use it safely.
+	read/seek/tell are kept for callers using the file object interface (see AReadAtFile).
+	executor: concurrent.futures executor running the reads, None uses the event loop's default executor
+	inline_size: reads smaller than this are done directly, for those the executor round trip costs more than the read
+	"""
+	def __init__(self, filename, executor = None, inline_size = 16*1024):
+		AReadAtFile.__init__(self)
 		self.filename = filename
 		self.fhandle = open(filename, 'rb')
-	
-	async def read(self, n = -1):
-		return self.fhandle.read(n)
+		self.fd = self.fhandle.fileno()
+		self.size = os.fstat(self.fd).st_size
+		self.executor = executor
+		self.inline_size = inline_size
+		# os.pread is not available on Windows, there the reads seek the (otherwise unused) file object under this lock
+		self.lock = threading.Lock()
 
-	async def seek(self, n, beg = 0):
-		return self.fhandle.seek(n, beg)
+	def pread(self, offset, size):
+		if hasattr(os, 'pread'):
+			chunks = []
+			while size > 0:
+				data = os.pread(self.fd, size, offset)
+				if len(data) == 0:
+					break
+				chunks.append(data)
+				offset += len(data)
+				size -= len(data)
+			if len(chunks) == 1:
+				return chunks[0]
+			return b''.join(chunks)
+		with self.lock:
+			self.fhandle.seek(offset, 0)
+			return self.fhandle.read(size)
 
-	def tell(self):
-		return self.fhandle.tell()
+	async def read_at(self, offset, size):
+		if size < self.inline_size:
+			return self.pread(offset, size)
+		return await asyncio.get_running_loop().run_in_executor(self.executor, self.pread, offset, size)
+
+	async def get_size(self):
+		return self.size
+
+	def close(self):
+		self.fhandle.close()
 
 class AMinidumpFile:
 	def __init__(self):
@@ -53,17 +90,25 @@ class AMinidumpFile:
 		self.misc_info = None
 		self.memory_info = None
 		self.thread_info = None
+		# names of the streams to parse (keys of MINIDUMP_STREAM_ATTRIBUTES), None means all
+		self.streams = None
 
 	@staticmethod
-	async def parse(filename):
+	async def parse(filename, use_index = False, streams = None, executor = None):
+		"""
+		use_index: keep the parsed memory segments and memory info in a <filename>.mdidx sidecar file,
+		reopening the dump later skips parsing those streams (see MinidumpIndexFile)
+		streams: list of the stream attributes to parse (eg. ['sysinfo', 'modules']), the others will be None
+		executor: executor running the file reads (see AsyncFile), None uses the event loop's default executor
+		"""
 		mf = AMinidumpFile()
 		mf.filename = filename
-		mf.file_handle = AsyncFile(filename)
-		await mf._parse()
+		mf.file_handle = AsyncFile(filename, executor = executor)
+		await mf._parse(index_filename = filename + '.mdidx' if use_index is True else None, streams = streams)
 		return mf
 
 	@staticmethod
-	async def parse_external(file_handle, filename = ''):
+	async def parse_external(file_handle, filename = '', streams = None):
 		"""
 		External file handle must be an object that exposes basic file IO functionality
 		that you'd get by python's file buffer (read, seek, tell etc.)
@@ -71,7 +116,7 @@ class AMinidumpFile:
 		mf = AMinidumpFile()
 		mf.filename = filename
 		mf.file_handle = file_handle
-		await mf._parse()
+		await mf._parse(streams = streams)
 		return mf
 
 	@staticmethod
@@ -88,9 +133,26 @@ class AMinidumpFile:
 	def get_reader(self):
 		return AMinidumpFileReader(self)
 
-	async def _parse(self):
+	async def _parse(self, index_filename = None, streams = None):
+		if streams is not None:
+			for name in streams:
+				if name not in MINIDUMP_STREAM_ATTRIBUTES:
+					raise Exception('Unknown stream %s' % name)
+			self.streams = list(streams)
 		await self.__parse_header()
+		index = None
+		if index_filename is not None:
+			await self.file_handle.seek(0, 0)
+			header_data = await self.file_handle.read(32)
+			await self.file_handle.seek(self.header.StreamDirectoryRva, 0)
+			header_data += await self.file_handle.read(self.header.NumberOfStreams * 12)
+			key = MinidumpIndexFile.get_key(self.filename, header_data)
+			index = MinidumpIndexFile.load(index_filename, key)
+			if index is not None:
+				index.apply(self)
 		await self.__parse_directories()
+		if index_filename is not None and index is None and self.streams is None:
+			MinidumpIndexFile.from_minidump(self, key).save(index_filename)
 
 	async def __parse_header(self):
 		self.header = await MinidumpHeader.aparse(self.file_handle)
@@ -107,8 +169,14 @@ class AMinidumpFile:
 				logging.debug('Found Unknown UserStream directory Type: %x' % (user_stream_type_value))
 
 	async def __parse_directories(self):
+		selected = None
+		if self.streams is not None:
+			selected = [MINIDUMP_STREAM_ATTRIBUTES[name] for name in self.streams]
 
 		for dir in self.directories:
+			if selected is not None and dir.StreamType not in selected:
+				logging.debug('Skipping %s @%x Size: %d' % (dir.StreamType.name, dir.Location.Rva, dir.Location.DataSize))
+				continue
 			if dir.StreamType == MINIDUMP_STREAM_TYPE.UnusedStream:
 				logging.debug('Found UnusedStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
 				continue # Reserved. Do not use this enumeration value.
@@ -129,7 +197,8 @@ class AMinidumpFile:
 				continue
 			elif dir.StreamType == MINIDUMP_STREAM_TYPE.MemoryListStream:
 				logging.debug('Found MemoryListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.memory_segments = await MinidumpMemoryList.aparse(dir, self.file_handle)
+				if self.memory_segments is None: # already loaded from the index file
+					self.memory_segments = await MinidumpMemoryList.aparse(dir, self.file_handle)
 				#logging.debug(str(self.memory_segments))
 				continue
 			elif dir.StreamType == MINIDUMP_STREAM_TYPE.SystemInfoStream:
@@ -144,7 +213,8 @@ class AMinidumpFile:
 				continue
 			elif dir.StreamType == MINIDUMP_STREAM_TYPE.Memory64ListStream:
 				logging.debug('Found Memory64ListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.memory_segments_64 = await MinidumpMemory64List.aparse(dir, self.file_handle)
+				if self.memory_segments_64 is None: # already loaded from the index file
+					self.memory_segments_64 = await MinidumpMemory64List.aparse(dir, self.file_handle)
 				#logging.debug(str(self.memory_segments_64))
 				continue
 			elif dir.StreamType == MINIDUMP_STREAM_TYPE.CommentStreamA:
@@ -185,7 +255,8 @@ class AMinidumpFile:
 				continue
 			elif dir.StreamType == MINIDUMP_STREAM_TYPE.MemoryInfoListStream:
 				logging.debug('Found MemoryInfoListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.memory_info = await MinidumpMemoryInfoList.aparse(dir, self.file_handle)
+				if self.memory_info is None: # already loaded from the index file
+					self.memory_info = await MinidumpMemoryInfoList.aparse(dir, self.file_handle)
 				#logging.debug(str(self.memory_info))
 				continue
 			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ThreadInfoListStream:
@@ -5,29 +5,24 @@
 #
 import struct
 import ntpath
+import asyncio
 from .common_structs import *
+from .addressmap import MinidumpAddressMap
+from .chunkcache import AMinidumpChunkCache, MinidumpReadAhead
 from .streams.SystemInfoStream import PROCESSOR_ARCHITECTURE
 
 
-class VirtualSegment:
-	def __init__(self, start, end, start_file_address):
-		self.start = start
-		self.end = end
-		self.start_file_address = start_file_address
-
-		self.data = None
-
-	def inrange(self, start, end):
-		return self.start <= start and end<= self.end
-
 class AMinidumpBufferedMemorySegment:
-	def __init__(self, memory_segment, chunksize = 10*1024):
+	def __init__(self, memory_segment, chunksize = 10*1024, cache = None, readahead = None):
 		self.start_address = memory_segment.start_virtual_address
 		self.end_address = memory_segment.end_virtual_address
 		self.total_size = memory_segment.end_virtual_address - memory_segment.start_virtual_address
 		self.start_file_address = memory_segment.start_file_address
 		self.chunksize = chunksize
-		self.chunks = []
+		# blocks are shared with the other segments of the reader, see AMinidumpChunkCache
+		self.cache = cache if cache is not None else AMinidumpChunkCache()
+		self.block_count = -(-self.total_size // self.cache.block_size)
+		self.readahead = readahead if readahead is not None else MinidumpReadAhead(policy = 'fixed', initial_size = chunksize, block_size = self.cache.block_size)
 
 	def inrange(self, position):
 		return self.start_address <= position < self.end_address
@@ -37,66 +32,175 @@ class AMinidumpBufferedMemorySegment:
 			return None
 		return self.end_address - position
 
-	async def find(self, file_handle, pattern, startpos):
-		data = await self.read(file_handle, 0, -1)
-		return data.find(pattern, startpos)
-
-	async def read(self, file_handle, start, end):
-		if end is None:
-			await file_handle.seek(self.start_file_address + start)
-			return await file_handle.read(self.end_address - (self.start_file_address + start))
-
-		for chunk in self.chunks:
-			if chunk.inrange(start, end):
-				return chunk.data[start - chunk.start: end - chunk.start]
+	async def find(self, file_handle, pattern, startpos = 0):
+		"""
+		Returns the segment relative offset of the first occurrence of pattern at or after startpos, -1 if not found
+		"""
+		hits = await self.find_all(file_handle, pattern, startpos, find_first = True)
+		if len(hits) == 0:
+			return -1
+		return hits[0]
 
-		if self.total_size <= 2*self.chunksize:
-			chunksize = self.total_size
-			vs = VirtualSegment(0, chunksize, self.start_file_address)
-			await file_handle.seek(self.start_file_address)
-			vs.data = await file_handle.read(chunksize)
-			self.chunks.append(vs)
-			return vs.data[start - vs.start: end - vs.start]
+	async def find_all(self, file_handle, pattern, startpos = 0, find_first = False, window = 1024*1024):
+		"""
+		Returns the segment relative offsets of all occurrences of pattern at or after startpos.
+		The segment is scanned once, window bytes at a time through the chunk cache,
+		consecutive windows overlap by len(pattern)-1 bytes so matches crossing window edges are found as well.
+		"""
+		hits = []
+		pattern = MinidumpSignature.from_pattern(pattern)
+		plen = len(pattern)
+		if plen == 0:
+			return hits
+		pos = startpos
+		while pos + plen <= self.total_size:
+			end = min(pos + window + plen - 1, self.total_size)
+			data = bytes(await self.read(file_handle, pos, end))
+			marker = pattern.find(data)
+			# matches starting in the overlap belong to the next window
+			while marker != -1 and marker < window:
+				hits.append(pos + marker)
+				if find_first is True:
+					return hits
+				marker = pattern.find(data, marker + 1)
+			pos += window
+		return hits
+
+	def readahead_limit(self, block_index):
+		"""
+		Returns the index of the block after the last one that should be fetched when block_index is missing
+		"""
+		window = self.readahead.get_window()
+		if self.readahead.policy == 'fixed' and self.total_size <= 2*window:
+			return self.block_count
+		return min(self.block_count, block_index + -(-window // self.cache.block_size))
 
-		chunksize = max((end-start), self.chunksize)
-		if start + chunksize > self.end_address:
-			chunksize = self.end_address - start
+	def is_known(self, block_index):
+		"""
+		Returns True if the block is cached or another task is fetching it
+		"""
+		key = (self.start_address, block_index)
+		return key in self.cache or self.cache.is_pending(key)
 
-		vs = VirtualSegment(start, start+chunksize, self.start_file_address + start)
-		await file_handle.seek(vs.start_file_address)
-		vs.data = await file_handle.read(chunksize)
-		self.chunks.append(vs)
+	async def read(self, file_handle, start, end):
+		if end is None:
+			return await aread_at(file_handle, self.start_file_address + start, self.total_size - start)
+
+		sequential = self.readahead.access(self.start_address + start, self.start_address + end)
+		block_size = self.cache.block_size
+		first = start // block_size
+		last = (end - 1) // block_size
+		blocks = [self.cache.get((self.start_address, i)) for i in range(first, last + 1)]
+
+		adjusted = False
+		i = first
+		while i <= last:
+			if blocks[i - first] is not None:
+				i += 1
+				continue
+			key = (self.start_address, i)
+			if key in self.cache:
+				# fetched by another task while this one was waiting
+				blocks[i - first] = self.cache.get(key)
+				continue
+			if self.cache.is_pending(key):
+				# another task is reading this block, waiting for it instead of reading it again
+				# if that read got cancelled the loop comes back here and fetches the block itself
+				blocks[i - first] = await self.cache.wait(key)
+				continue
+			# fetching every consecutive missing block with one read, reading ahead past the requested range
+			# blocks which are cached or being fetched by another task end the run
+			j = i
+			while j < last and blocks[j + 1 - first] is None and not self.is_known(j + 1):
+				j += 1
+			if adjusted is False:
+				# once per read, however many missing runs the read has
+				self.readahead.adjust(sequential)
+				adjusted = True
+			limit = self.readahead_limit(i)
+			while j + 1 < limit and not self.is_known(j + 1):
+				j += 1
+
+			keys = [(self.start_address, k) for k in range(i, j + 1)]
+			self.cache.begin_fetch(keys)
+			try:
+				data = await aread_at(file_handle, self.start_file_address + i * block_size, min((j + 1) * block_size, self.total_size) - i * block_size)
+			except BaseException as e:
+				self.cache.fail_fetch(keys, e)
+				raise
+			self.readahead.fetched(len(data))
+			fetched = [data[(k - i) * block_size : (k - i + 1) * block_size] for k in range(i, j + 1)]
+			self.cache.end_fetch(keys, fetched)
+			for k in range(i, min(j, last) + 1):
+				blocks[k - first] = fetched[k - i]
+			i = j + 1
+
+		offset = first * block_size
+		if len(blocks) == 1:
+			return blocks[0][start - offset : end - offset]
+		return b''.join(blocks)[start - offset : end - offset]
 
-		return vs.data[start - vs.start: end - vs.start]
 
 class AMinidumpBufferedReader:
-	def __init__(self, reader, segment_chunk_size = 10*1024):
+	def __init__(self, reader, segment_chunk_size = 10*1024, cache_size = 64*1024*1024, readahead = 'adaptive', cache = None):
 		self.reader = reader
+		# several readers of the same dump can share one cache (and its pending fetches)
+		self.cache = cache if cache is not None else AMinidumpChunkCache(max_size = cache_size)
+		self.readahead = MinidumpReadAhead(policy = readahead, initial_size = segment_chunk_size, block_size = self.cache.block_size)
 		self.memory_segments = []
+		self.segment_cache = {} #start address of the memory segment -> buffered segment
 		self.segment_chunk_size = segment_chunk_size
 
 		self.current_segment = None
 		self.current_position = None
 
-	async def _select_segment(self, requested_position):
+	def _get_buffered_segment(self, memory_segment):
+		"""
+		Returns the buffered segment for memory_segment, creating it on first use
+		"""
+		newsegment = self.segment_cache.get(memory_segment.start_virtual_address)
+		if newsegment is None:
+			newsegment = AMinidumpBufferedMemorySegment(memory_segment, chunksize=self.segment_chunk_size, cache=self.cache, readahead=self.readahead)
+			self.segment_cache[memory_segment.start_virtual_address] = newsegment
+			self.memory_segments.append(newsegment)
+		return newsegment
+
+	async def _read_span(self, position, size):
+		"""
+		Reads size bytes from position which is in the current segment, continuing in the adjacent segments when the read crosses the segment end.
+		Returns the data and the segment the read ended in.
 		"""
+		segment = self.current_segment
+		data = []
+		while True:
+			n = min(size, segment.end_address - position)
+			data.append(await segment.read(self.reader.file_handle, position - segment.start_address, position - segment.start_address + n))
+			position += n
+			size -= n
+			if size == 0:
+				break
+			memory_segment = self.reader.region_index.find(position)
+			if memory_segment is None:
+				raise Exception('Would read over segment boundaries!')
+			segment = self._get_buffered_segment(memory_segment)
+		if len(data) == 1:
+			return data[0], segment
+		return b''.join(data), segment
 
+	async def _select_segment(self, requested_position):
 		"""
-		# check if we have semgnet for requested address in cache
-		for memory_segment in self.memory_segments:
-			if memory_segment.inrange(requested_position):
-				self.current_segment = memory_segment
-				self.current_position = requested_position
-				return
+		Positions the reader to requested_position, selecting the memory segment that holds the address
+		"""
+		# most of the time we are moving inside the current segment
+		if self.current_segment is not None and self.current_segment.inrange(requested_position):
+			self.current_position = requested_position
+			return
 
-		# not in cache, check if it's present in memory space. if yes then create a new buffered memeory object, and copy data
-		for memory_segment in self.reader.memory_segments:
-			if memory_segment.inrange(requested_position):
-				newsegment = AMinidumpBufferedMemorySegment(memory_segment, chunksize=self.segment_chunk_size)
-				self.memory_segments.append(newsegment)
-				self.current_segment = newsegment
-				self.current_position = requested_position
-				return
+		memory_segment = self.reader.region_index.find(requested_position)
+		if memory_segment is not None:
+			self.current_segment = self._get_buffered_segment(memory_segment)
+			self.current_position = requested_position
+			return
 
 		raise Exception('Memory address 0x%08x is not in process memory space' % requested_position)
 
@@ -152,13 +256,26 @@ class AMinidumpBufferedReader:
 		"""
 		return self.current_position
 
+	def get_cache_stats(self):
+		"""
+		Returns the hit/miss/eviction/coalesced counters and the current size of the chunk cache
+		"""
+		return self.cache.get_stats()
+
+	def get_readahead_stats(self):
+		"""
+		Returns the read-ahead policy in use, the current window size and the access pattern counters
+		"""
+		return self.readahead.get_stats()
+
 	async def peek(self, length):
 		"""
 		Returns up to length bytes from the current memory segment
 		"""
 		t = self.current_position + length
 		if not self.current_segment.inrange(t - 1):
-			raise Exception('Would read over segment boundaries!')
+			data, _ = await self._read_span(self.current_position, length)
+			return data
 		return await self.current_segment.read(self.reader.file_handle, self.current_position - self.current_segment.start_address , t - self.current_segment.start_address)
 
 	async def read(self, size = -1):
@@ -178,7 +295,9 @@ class AMinidumpBufferedReader:
 
 		t = self.current_position + size
 		if not self.current_segment.inrange(t - 1):
-			raise Exception('Would read over segment boundaries!')
+			data, self.current_segment = await self._read_span(self.current_position, size)
+			self.current_position = t
+			return data
 
 		old_new_pos = self.current_position
 		self.current_position = t
@@ -212,26 +331,19 @@ class AMinidumpBufferedReader:
 
 	async def find(self, pattern):
 		"""
-		Searches for a pattern in the current memory segment
+		Searches for a pattern in the current memory segment starting from the current position, returns the address of the first occurrence or -1
 		"""
-		pos = await self.current_segment.find(self.reader.file_handle, pattern)
+		pos = await self.current_segment.find(self.reader.file_handle, pattern, self.current_position - self.current_segment.start_address)
 		if pos == -1:
 			return -1
-		return pos + self.current_position
+		return pos + self.current_segment.start_address
 
 	async def find_all(self, pattern):
 		"""
 		Searches for all occurrences of a pattern in the current memory segment, returns all occurrences as a list
 		"""
-		pos = []
-		last_found = -1
-		while True:
-			last_found = await self.current_segment.find(self.reader.file_handle, pattern, last_found + 1)
-			if last_found == -1:
-				break
-			pos.append(last_found + self.current_segment.start_address)
-
-		return pos
+		pos = await self.current_segment.find_all(self.reader.file_handle, pattern)
+		return [x + self.current_segment.start_address for x in pos]
 
 	async def find_global(self, pattern):
 		"""
@@ -267,6 +379,84 @@ class AMinidumpBufferedReader:
 			await self.move(pos)
 			return await self.read_uint()
 
+	async def read_ptrs(self, addresses):
+		"""
+		Dereferences a batch of pointers, see the file reader's read_ptrs. Does not change the current position.
+		"""
+		return await self.reader.read_ptrs(addresses)
+
+	async def read_many(self, ranges):
+		"""
+		Reads a batch of (address, size) ranges, see the file reader's read_many. Does not change the current position.
+		"""
+		return await self.reader.read_many(ranges)
+
+	async def _read_prefetched(self, windows, address, size, prefetch):
+		"""
+		Returns size bytes from address using the windows dict ((region start, window index) -> (start address, data)) as a
+		local cache, on a miss the prefetch sized (aligned) window around address is read, clipped to the memory region.
+		Returns None if the data is not in the dump. The current position is not changed.
+		"""
+		region = self.reader.region_index.find(address)
+		if region is None or address + size > region.end_virtual_address:
+			return None
+		key = (region.start_virtual_address, address // prefetch)
+		window = windows.get(key)
+		if window is None or address < window[0] or address + size > window[0] + len(window[1]):
+			start = max(region.start_virtual_address, key[1] * prefetch)
+			end = min(region.end_virtual_address, max(start + prefetch, address + size))
+			# reading through the buffered segment of the region, the cursor of the reader stays where it is
+			segment = self._get_buffered_segment(region)
+			window = (start, bytes(await segment.read(self.reader.file_handle, start - segment.start_address, end - segment.start_address)))
+			if len(windows) >= 64:
+				del windows[next(iter(windows))]
+			windows[key] = window
+		offset = address - window[0]
+		return window[1][offset:offset + size]
+
+	async def walk_list(self, head, layout = None, list_entry_offset = 0, max_nodes = 100000, prefetch = 64*1024):
+		"""
+		Generator walking a doubly linked list (LIST_ENTRY) along the Flink pointers, head is the address of the list head.
+		Yields (entry address, entry) for every node, the entry address is the node address - list_entry_offset (the offset
+		of the LIST_ENTRY in the entry), entry is the entry decoded with layout (a StructLayout) or None without layout.
+		The walk stops when it gets back to the head, on a NULL or an already visited Flink (a corrupt, looping list),
+		after max_nodes entries, or when the next entry is not in the dump.
+		The memory is read in prefetch sized windows, nodes allocated close to each other are served from the same read.
+		The current position is not changed.
+		"""
+		ptr = struct.Struct(self.reader.unpack_ptr)
+		compiled = layout.compile(self.reader.sizeof_ptr) if layout is not None else None
+		size = list_entry_offset + ptr.size
+		if compiled is not None:
+			size = max(size, compiled.size)
+		windows = {}
+		data = await self._read_prefetched(windows, head, ptr.size, prefetch)
+		if data is None:
+			return
+		flink = ptr.unpack_from(data)[0]
+		visited = set([head])
+		count = 0
+		while flink != 0 and flink not in visited and count < max_nodes:
+			visited.add(flink)
+			entry_address = flink - list_entry_offset
+			data = await self._read_prefetched(windows, entry_address, size, prefetch)
+			if data is None:
+				return
+			count += 1
+			yield entry_address, compiled.unpack(data) if compiled is not None else None
+			flink = ptr.unpack_from(data, list_entry_offset)[0]
+
+	async def read_struct(self, layout, address = None):
+		"""
+		Reads a structure described by a StructLayout with one read, at address or at the current position.
+		The position is moved after the structure.
+		"""
+		compiled = layout.compile(self.reader.sizeof_ptr)
+		if address is not None:
+			await self.move(address)
+		data = await self.read(compiled.size)
+		return compiled.unpack(data)
+
 	async def find_in_module(self, module_name, pattern, find_first = False, reverse_order = False):
 		t = await self.reader.search_module(module_name, pattern, find_first = find_first, reverse_order = reverse_order,chunksize = self.segment_chunk_size)
 		return t
@@ -274,19 +464,52 @@ class AMinidumpBufferedReader:
 
 
 
+def scan_window(pattern, data, limit, find_first):
+	"""
+	Returns the offsets of the pattern occurrences in data which start below limit, runs in the executor of search_concurrent
+	"""
+	hits = []
+	marker = pattern.find(data)
+	while marker != -1 and marker < limit:
+		hits.append(marker)
+		if find_first is True:
+			break
+		marker = pattern.find(data, marker + 1)
+	return hits
+
 class AMinidumpFileReader:
 	def __init__(self, minidumpfile):
-		self.modules = minidumpfile.modules.modules
+		# streams not selected by the streams parameter of parse are None
+		self.modules = []
+		if minidumpfile.modules is not None:
+			self.modules = minidumpfile.modules.modules
+		self.unloaded_modules = []
+		if minidumpfile.unloaded_modules is not None:
+			self.unloaded_modules = minidumpfile.unloaded_modules.modules
+
 		self.sysinfo = minidumpfile.sysinfo
+		if self.sysinfo is None:
+			raise Exception('The reader needs the sysinfo stream, it is missing from the dump or was not selected')
 
 		if minidumpfile.memory_segments_64:
 			self.memory_segments = minidumpfile.memory_segments_64.memory_segments
 			self.is_fulldump = True
 
-		else:
+		elif minidumpfile.memory_segments is not None:
 			self.memory_segments = minidumpfile.memory_segments.memory_segments
 			self.is_fulldump = False
 
+		else:
+			raise Exception('The reader needs the memory_segments_64 or the memory_segments stream, neither is in the dump or was selected')
+
+		self.segment_index = MinidumpSegmentIndex(self.memory_segments)
+		# contiguous segments merged, used for reading so reads can cross segment boundaries
+		self.region_index = MinidumpSegmentIndex(MinidumpMemorySegment.merge_contiguous(self.memory_segments))
+		self.module_index = MinidumpModuleIndex(self.modules, self.segment_index)
+		self.unloaded_index = MinidumpModuleIndex(self.unloaded_modules, self.segment_index)
+
+		self.minidumpfile = minidumpfile
+		self.address_map = None
 		self.filename = minidumpfile.filename
 		self.file_handle = minidumpfile.file_handle
 
@@ -303,38 +526,290 @@ class AMinidumpFileReader:
 		else:
 			raise Exception('Unknown processor architecture %s! Please fix and submit PR!' % self.sysinfo.ProcessorArchitecture)
 
-	def get_buffered_reader(self, segment_chunk_size = 10*1024):
-		return AMinidumpBufferedReader(self, segment_chunk_size = segment_chunk_size)
+	def get_buffered_reader(self, segment_chunk_size = 10*1024, cache_size = 64*1024*1024, readahead = 'adaptive', cache = None):
+		return AMinidumpBufferedReader(self, segment_chunk_size = segment_chunk_size, cache_size = cache_size, readahead = readahead, cache = cache)
+
+	def get_address_map(self):
+		"""
+		Returns the MinidumpAddressMap of the dump, it is built on the first call
+		"""
+		if self.address_map is None:
+			memory_info = self.minidumpfile.memory_info
+			self.address_map = MinidumpAddressMap(
+				memory_info.infos if memory_info is not None else None,
+				self.region_index,
+				self.modules,
+			)
+		return self.address_map
+
+	def get_address_info(self, virt_addr):
+		"""
+		Returns the MinidumpAddressRange (memory info region, captured region and module) containing virt_addr, None if nothing is known about it
+		"""
+		return self.get_address_map().find(virt_addr)
 
 	def get_module_by_name(self, module_name):
-		for mod in self.modules:
-			if ntpath.basename(mod.name).lower().find(module_name.lower()) != -1:
-				return mod
-		return None
+		return self.module_index.find_by_name(module_name)
 
-	async def search_module(self, module_name, pattern, find_first = False, reverse_order = False, chunksize = 10*1024):
-		mod = self.get_module_by_name(module_name)
+	def get_unloaded_by_name(self, module_name):
+		return self.unloaded_index.find_by_name(module_name)
+
+	def get_module_by_address(self, virt_addr):
+		"""
+		Returns the loaded (or if there is none, the unloaded) module that contains virt_addr, None if there is none
+		"""
+		mod = self.module_index.find(virt_addr)
 		if mod is None:
-			raise Exception('Could not find module! %s' % module_name)
-		needles = []
-		for ms in self.memory_segments:
-			if mod.baseaddress <= ms.start_virtual_address < mod.endaddress:
-				needles += await ms.asearch(pattern, self.file_handle, find_first = find_first, chunksize = chunksize)
-				if len(needles) > 0 and find_first is True:
-					return needles
+			mod = self.unloaded_index.find(virt_addr)
+		return mod
+
+	def get_module_segments(self, module_name):
+		"""
+		Returns the module and the memory segments overlapping it
+		"""
+		mod = self.get_module_by_name(module_name)
+		if mod is not None:
+			return mod, self.module_index.get_segments(mod)
+		mod = self.get_unloaded_by_name(module_name)
+		if mod is not None:
+			return mod, self.unloaded_index.get_segments(mod)
+		raise Exception('Could not find module! %s' % module_name)
+
+	async def aiter_search_module(self, module_name, pattern, reverse_order = False, chunksize = 10*1024):
+		"""
+		Generator yielding the addresses of pattern occurrences in the module's memory, in address order.
+		With reverse_order the module is scanned from its end backwards and the hits are yielded in descending address order.
+		"""
+		mod, segments = self.get_module_segments(module_name)
+		pattern = MinidumpSignature.from_pattern(pattern)
+		if reverse_order is True:
+			for ms in reversed(segments):
+				async for hit in ms.aiter_search_reverse(pattern, self.file_handle, chunksize = chunksize, start = mod.baseaddress, end = mod.endaddress):
+					yield hit
+		else:
+			for ms in segments:
+				async for hit in ms.aiter_search(pattern, self.file_handle, chunksize = chunksize, start = mod.baseaddress, end = mod.endaddress):
+					yield hit
 
+	async def search_module(self, module_name, pattern, find_first = False, reverse_order = False, chunksize = 10*1024):
+		"""
+		Searches for the pattern in the memory of a loaded (or unloaded) module.
+		With reverse_order the hits are returned in descending address order, with find_first this is the last occurrence.
+		"""
+		needles = []
+		async for hit in self.aiter_search_module(module_name, pattern, reverse_order = reverse_order, chunksize = chunksize):
+			needles.append(hit)
+			if find_first is True:
+				break
 		return needles
 
+	async def search_modules(self, module_names, pattern, find_first = False, reverse_order = False, chunksize = 10*1024):
+		"""
+		Searches for the pattern in multiple modules, returns a dict of module name -> list of addresses
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		results = {}
+		for module_name in module_names:
+			results[module_name] = await self.search_module(module_name, pattern, find_first = find_first, reverse_order = reverse_order, chunksize = chunksize)
+		return results
+
 	async def search(self, pattern, find_first = False, chunksize = 10*1024):
+		pattern = MinidumpSignature.from_pattern(pattern)
 		t = []
 		for ms in self.memory_segments:
 			t += await ms.asearch(pattern, self.file_handle, find_first = find_first, chunksize = chunksize)
 
 		return t
 
+	async def search_concurrent(self, pattern, find_first = False, concurrency = 8, window = 4*1024*1024, executor = None, inline_size = 64*1024):
+		"""
+		Searches for the pattern in the whole process memory space, searching up to concurrency segments at the same time.
+		The segments are read with position independent reads (AsyncFile.read_at) so the reads of the segments overlap,
+		which pays off on high latency sources. Windows of at least inline_size bytes are matched in executor
+		(None: the event loop's default executor) to keep the event loop responsive.
+		Results are returned in address order. With find_first only the lowest address occurrence is returned,
+		the segments above the lowest segment with a hit are cancelled as soon as the hit is found.
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		segments = list(self.segment_index)
+		if len(pattern) == 0 or len(segments) == 0:
+			return []
+		loop = asyncio.get_running_loop()
+		semaphore = asyncio.Semaphore(concurrency)
+		# handles without read_at are seeked for every read, those reads must not interleave
+		lock = asyncio.Lock() if not hasattr(self.file_handle, 'read_at') else None
+		overlap = len(pattern) - 1
+		results = [None] * len(segments)
+		running = {}
+		lowest_hit = [len(segments)] # index of the lowest segment with a hit (find_first)
+
+		async def search_segment(i, ms):
+			hits = []
+			offset = 0
+			while offset + len(pattern) <= ms.size:
+				n = min(window + overlap, ms.size - offset)
+				if lock is not None:
+					async with lock:
+						data = await aread_at(self.file_handle, ms.start_file_address + offset, n)
+				else:
+					data = await aread_at(self.file_handle, ms.start_file_address + offset, n)
+				# matches starting in the overlap belong to the next window
+				limit = window if offset + n < ms.size else n
+				if len(data) < inline_size:
+					found = scan_window(pattern, data, limit, find_first)
+				else:
+					found = await loop.run_in_executor(executor, scan_window, pattern, data, limit, find_first)
+				hits += [ms.start_virtual_address + offset + x for x in found]
+				if find_first is True and len(hits) > 0:
+					if i < lowest_hit[0]:
+						lowest_hit[0] = i
+						for j, task in list(running.items()):
+							if j > i:
+								task.cancel()
+					break
+				offset += window
+			results[i] = hits
+
+		def segment_done(i):
+			# also called for tasks cancelled before they started
+			running.pop(i, None)
+			semaphore.release()
+
+		tasks = []
+		for i, ms in enumerate(segments):
+			await semaphore.acquire()
+			if find_first is True and lowest_hit[0] < i:
+				# every segment from here on is above the hit
+				semaphore.release()
+				break
+			task = asyncio.ensure_future(search_segment(i, ms))
+			task.add_done_callback(lambda _, i = i: segment_done(i))
+			running[i] = task
+			tasks.append(task)
+
+		await asyncio.gather(*tasks, return_exceptions = True)
+		# failures other than the cancellations
+		for task in tasks:
+			if not task.cancelled() and task.exception() is not None:
+				raise task.exception()
+
+		if find_first is True:
+			if lowest_hit[0] == len(segments):
+				return []
+			return results[lowest_hit[0]][:1]
+		t = []
+		for hits in results:
+			if hits is not None:
+				t += hits
+		return t
+
+	async def aiter_search(self, pattern, start = None, end = None, max_hits = None, chunksize = 10*1024, accessible_only = False):
+		"""
+		Generator yielding the addresses of pattern occurrences in the whole process memory space, in address order.
+		Segments are only read when the consumer gets to them, so breaking out of the loop skips the rest of the dump.
+		start, end: only matches lying entirely in the [start, end) virtual address range are yielded
+		max_hits: stops after this many hits
+		accessible_only: skips the memory the address map knows to be inaccessible (not committed, no access or guard pages)
+		"""
+		if max_hits is not None and max_hits <= 0:
+			return
+		pattern = MinidumpSignature.from_pattern(pattern)
+		if start is None:
+			start = 0
+		if end is None:
+			end = 1 << 64
+		if accessible_only is True:
+			parts = self.get_address_map().iter_captured(start, end, accessible_only = True)
+		else:
+			parts = ((start, end, ms) for ms in self.segment_index.overlapping(start, end))
+		hits = 0
+		for pstart, pend, ms in parts:
+			async for hit in ms.aiter_search(pattern, self.file_handle, chunksize = chunksize, start = pstart, end = pend):
+				yield hit
+				hits += 1
+				if max_hits is not None and hits >= max_hits:
+					return
+
+	async def search_many(self, patterns, find_first = False, chunksize = 10*1024):
+		"""
+		Searches for multiple patterns in the whole process memory space, reading every memory segment only once.
+		Returns a dict of pattern -> list of addresses, with find_first only the first address is returned for each pattern.
+		"""
+		return await self._search_many(self.memory_segments, patterns, find_first, chunksize)
+
+	async def search_module_many(self, module_name, patterns, find_first = False, chunksize = 10*1024):
+		"""
+		Searches for multiple patterns in the memory of a module, reading every memory segment only once.
+		Returns a dict of pattern -> list of addresses, with find_first only the first address is returned for each pattern.
+		"""
+		mod, segments = self.get_module_segments(module_name)
+		return await self._search_many(segments, patterns, find_first, chunksize, start = mod.baseaddress, end = mod.endaddress)
+
+	async def _search_many(self, memory_segments, patterns, find_first, chunksize, start = None, end = None):
+		results = {pattern: [] for pattern in MinidumpPatternSet(patterns).patterns}
+		remaining = list(results)
+		for ms in memory_segments:
+			hits = await ms.asearch_many(remaining, self.file_handle, find_first = find_first, chunksize = chunksize, start = start, end = end)
+			for pattern in hits:
+				results[pattern] += hits[pattern]
+			if find_first is True:
+				remaining = [pattern for pattern in remaining if len(results[pattern]) == 0]
+				if len(remaining) == 0:
+					break
+		return results
+
+	async def read_many(self, ranges):
+		"""
+		Reads a batch of (address, size) ranges. The requests are sorted and grouped per memory region, nearby
+		requests are served by a single read. Returns the data in request order, None for the ranges which are
+		not (entirely) in the dump and b'' for zero size ranges.
+		"""
+		results = [b'' if size == 0 else None for _, size in ranges]
+		for segment, start, end, items in self.region_index.group_requests(ranges):
+			data = await segment.aread(start, end - start, self.file_handle)
+			for i, address, size in items:
+				results[i] = data[address - start : address - start + size]
+		return results
+
+	async def read_ptrs(self, addresses):
+		"""
+		Dereferences a batch of pointers like read_many, returns the pointer values in request order,
+		None for the addresses which are not in the dump.
+		"""
+		results = [None] * len(addresses)
+		unpack_from = struct.Struct(self.unpack_ptr).unpack_from
+		ranges = [(address, self.sizeof_ptr) for address in addresses]
+		for segment, start, end, items in self.region_index.group_requests(ranges):
+			data = await segment.aread(start, end - start, self.file_handle)
+			for i, address, _ in items:
+				results[i] = unpack_from(data, address - start)[0]
+		return results
+
+	async def read_struct(self, layout, virt_addr):
+		"""
+		Reads a structure described by a StructLayout from virt_addr with one read
+		"""
+		compiled = layout.compile(self.sizeof_ptr)
+		data = await self.read(virt_addr, compiled.size)
+		return compiled.unpack(data)
+
 	async def read(self, virt_addr, size):
-		for segment in self.memory_segments:
-			if segment.inrange(virt_addr):
-				return await segment.aread(virt_addr, size, self.file_handle)
-		raise Exception('Address not in memory range! %s' % hex(virt_addr))
+		segment = self.region_index.find(virt_addr)
+		if segment is None:
+			raise Exception('Address not in memory range! %s' % hex(virt_addr))
+		if virt_addr + size <= segment.end_virtual_address:
+			return await segment.aread(virt_addr, size, self.file_handle)
+
+		# the read continues in the adjacent segment(s)
+		data = []
+		while True:
+			n = min(size, segment.end_virtual_address - virt_addr)
+			data.append(await segment.aread(virt_addr, n, self.file_handle))
+			virt_addr += n
+			size -= n
+			if size == 0:
+				return b''.join(data)
+			segment = self.region_index.find(virt_addr)
+			if segment is None:
+				raise Exception('Read would cross boundaries!')
 
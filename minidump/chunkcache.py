@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+import asyncio
+from collections import OrderedDict
+
+class MinidumpChunkCache:
+	"""
+	Byte budgeted LRU cache of memory blocks, shared by all buffered segments of a reader.
+	Blocks are block_size long and aligned to the start of their memory segment (the last block of a segment may be shorter),
+	so cached data never overlaps. Keys are (segment start address, block index) tuples.
+	"""
+	def __init__(self, max_size = 64*1024*1024, block_size = 0x1000):
+		self.max_size = max_size
+		self.block_size = block_size
+		self.blocks = OrderedDict()
+		self.size = 0
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __contains__(self, key):
+		return key in self.blocks
+
+	def __len__(self):
+		return len(self.blocks)
+
+	def get(self, key):
+		"""
+		Returns the cached block for key or None, marking the block as most recently used
+		"""
+		data = self.blocks.get(key)
+		if data is None:
+			self.misses += 1
+			return None
+		self.blocks.move_to_end(key)
+		self.hits += 1
+		return data
+
+	def put(self, key, data):
+		"""
+		Stores a block, evicting the least recently used blocks until the cache fits the budget again
+		"""
+		old = self.blocks.pop(key, None)
+		if old is not None:
+			self.size -= len(old)
+		self.blocks[key] = data
+		self.size += len(data)
+		while self.size > self.max_size and len(self.blocks) > 1:
+			_, evicted = self.blocks.popitem(last = False)
+			self.size -= len(evicted)
+			self.evictions += 1
+
+	def clear(self):
+		self.blocks.clear()
+		self.size = 0
+
+	def get_stats(self):
+		return {
+			'hits' : self.hits,
+			'misses' : self.misses,
+			'evictions' : self.evictions,
+			'blocks' : len(self.blocks),
+			'size' : self.size,
+			'max_size' : self.max_size,
+		}
+
+	def __str__(self):
+		return 'Blocks: %s Size: %s/%s Hits: %s Misses: %s Evictions: %s' % (len(self.blocks), self.size, self.max_size, self.hits, self.misses, self.evictions)
+
+class AMinidumpChunkCache(MinidumpChunkCache):
+	"""
+	MinidumpChunkCache for the async readers with single-flight fetches: while a block is being read from the file
+	it has a pending future, tasks missing the same block await that future instead of issuing their own read.
+	Lookups, insertions and evictions never await, so they are atomic for the tasks of the event loop.
+	"""
+	def __init__(self, max_size = 64*1024*1024, block_size = 0x1000):
+		MinidumpChunkCache.__init__(self, max_size = max_size, block_size = block_size)
+		self.pending = {} #key -> future of the block being fetched
+		self.coalesced = 0
+
+	def is_pending(self, key):
+		return key in self.pending
+
+	def begin_fetch(self, keys):
+		"""
+		Registers a pending future for each key, the caller must finish with end_fetch or fail_fetch
+		"""
+		loop = asyncio.get_running_loop()
+		for key in keys:
+			self.pending[key] = loop.create_future()
+
+	def end_fetch(self, keys, blocks):
+		"""
+		Stores the fetched blocks and wakes up the tasks waiting for them
+		"""
+		for key, block in zip(keys, blocks):
+			self.put(key, block)
+			future = self.pending.pop(key, None)
+			if future is not None and not future.done():
+				future.set_result(block)
+
+	def fail_fetch(self, keys, exception):
+		"""
+		Drops the pending futures of a fetch which failed or was cancelled, the waiters get the exception
+		(or retry the fetch themselves if the fetching task was cancelled)
+		"""
+		for key in keys:
+			future = self.pending.pop(key, None)
+			if future is None or future.done():
+				continue
+			if isinstance(exception, asyncio.CancelledError):
+				future.cancel()
+			else:
+				future.set_exception(exception)
+				future.exception() # the fetching task raises it, no need to log it for unawaited futures
+
+	async def wait(self, key):
+		"""
+		Waits for the pending fetch of key. Returns the block, or None if the fetch was cancelled.
+		"""
+		future = self.pending[key]
+		self.coalesced += 1
+		await asyncio.wait([future])
+		if future.cancelled():
+			return None
+		return future.result()
+
+	def get_stats(self):
+		stats = MinidumpChunkCache.get_stats(self)
+		stats['coalesced'] = self.coalesced
+		stats['pending'] = len(self.pending)
+		return stats
+
+	def __str__(self):
+		return '%s Coalesced: %s Pending: %s' % (MinidumpChunkCache.__str__(self), self.coalesced, len(self.pending))
+
+class MinidumpReadAhead:
+	"""
+	Decides how much data a buffered segment fetches when a read misses the cache, shared by all segments of a reader.
+	policies:
+	  adaptive: the window doubles on every sequential read missing the cache (up to max_size) and halves on every random one (down to min_size)
+	  fixed: the window is always initial_size, small segments (up to 2*initial_size) are read as a whole
+	Window sizes are rounded up to block_size so fetches stay aligned to the cache blocks.
+	"""
+	def __init__(self, policy = 'adaptive', initial_size = 10*1024, min_size = 0x1000, max_size = 1024*1024, block_size = 0x1000):
+		if policy not in ['adaptive', 'fixed']:
+			raise Exception('Unknown read-ahead policy %s' % policy)
+		self.policy = policy
+		self.block_size = block_size
+		self.min_size = max(min_size, block_size)
+		self.max_size = max(max_size, self.min_size)
+		self.window = min(max(initial_size, self.min_size), self.max_size)
+		if policy == 'fixed':
+			self.window = initial_size
+
+		self.last_start = None
+		self.last_end = None
+
+		self.sequential_reads = 0
+		self.random_reads = 0
+		self.fetches = 0
+		self.fetched_bytes = 0
+
+	def access(self, start, end):
+		"""
+		Registers a read of the [start, end) virtual address range. Returns True if the read continues the previous one,
+		reading the same place again (eg. peeking at a struct before reading it) is not sequential.
+		"""
+		sequential = self.last_start is not None and self.last_start < start <= self.last_end + self.block_size
+		if sequential:
+			self.sequential_reads += 1
+		else:
+			self.random_reads += 1
+		self.last_start = start
+		self.last_end = end
+		return sequential
+
+	def adjust(self, sequential):
+		"""
+		Adjusts the window to the access pattern, called once for every read which misses the cache
+		"""
+		if self.policy == 'adaptive':
+			if sequential:
+				self.window = min(self.window * 2, self.max_size)
+			else:
+				self.window = max(self.window // 2, self.min_size)
+
+	def get_window(self):
+		"""
+		Returns the number of bytes to fetch for a cache miss
+		"""
+		return self.window
+
+	def fetched(self, size):
+		self.fetches += 1
+		self.fetched_bytes += size
+
+	def get_stats(self):
+		return {
+			'policy' : self.policy,
+			'window' : self.window,
+			'sequential_reads' : self.sequential_reads,
+			'random_reads' : self.random_reads,
+			'fetches' : self.fetches,
+			'fetched_bytes' : self.fetched_bytes,
+		}
+
+	def __str__(self):
+		return 'Policy: %s Window: %s Sequential: %s Random: %s Fetches: %s Fetched bytes: %s' % (self.policy, self.window, self.sequential_reads, self.random_reads, self.fetches, self.fetched_bytes)
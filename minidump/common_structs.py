@@ -1,6 +1,16 @@
+import re
+import sys
+import bisect
+import ntpath
+import struct
+import itertools
+from array import array
+
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680383(v=vs.85).aspx
 class MINIDUMP_LOCATION_DESCRIPTOR:
+	__slots__ = ('DataSize', 'Rva')
+
 	def __init__(self):
 		self.DataSize = None
 		self.Rva = None
@@ -34,6 +44,8 @@ class MINIDUMP_LOCATION_DESCRIPTOR:
 		return t
 
 class MINIDUMP_LOCATION_DESCRIPTOR64:
+	__slots__ = ('DataSize', 'Rva')
+
 	def __init__(self):
 		self.DataSize = None
 		self.Rva = None
@@ -99,7 +111,147 @@ class MINIDUMP_STRING:
 		except:
 			return '<STRING_DECODE_FAILED>'
 
+class MinidumpSignature:
+	"""
+	Byte signature with wildcard bytes and nibbles, eg. '48 8B 05 ?? ?? ?? ?? 48 85 C0' or '4? 8B ?5'.
+	A byte matches if (byte & mask) == value. The signature is compiled once: the longest run of fully known bytes
+	is used as an anchor for bytes.find and the candidates are verified with a compiled regex.
+	Signatures without wildcards are searched with a plain bytes.find.
+	"""
+	def __init__(self, values, mask = None):
+		if mask is None:
+			mask = b'\xff' * len(values)
+		if len(mask) != len(values):
+			raise Exception('Signature mask length must match the pattern length!')
+		self.mask = bytes(mask)
+		self.values = bytes(v & m for v, m in zip(values, self.mask))
+		self.length = len(self.values)
+		self.is_exact = self.mask == b'\xff' * self.length
+
+		# longest run of fully known bytes
+		self.anchor = b''
+		self.anchor_offset = 0
+		i = 0
+		while i < self.length:
+			if self.mask[i] != 0xff:
+				i += 1
+				continue
+			j = i
+			while j < self.length and self.mask[j] == 0xff:
+				j += 1
+			if j - i > len(self.anchor):
+				self.anchor = self.values[i:j]
+				self.anchor_offset = i
+			i = j
+
+		self.regex = None
+		if self.is_exact is False:
+			expr = b''
+			for v, m in zip(self.values, self.mask):
+				if m == 0xff:
+					expr += re.escape(bytes([v]))
+				elif m == 0:
+					expr += b'.'
+				else:
+					expr += b'[' + b''.join(re.escape(bytes([x])) for x in range(256) if x & m == v) + b']'
+			self.regex = re.compile(expr, re.DOTALL)
+
+	@staticmethod
+	def parse(signature):
+		"""
+		Parses a hex string signature, '?' stands for an unknown nibble. Whitespace is ignored.
+		"""
+		signature = ''.join(signature.split())
+		if len(signature) % 2 != 0:
+			raise Exception('Signature must consist of full bytes! %s' % signature)
+		values = []
+		mask = []
+		for i in range(0, len(signature), 2):
+			v = 0
+			m = 0
+			for c in signature[i:i+2]:
+				v <<= 4
+				m <<= 4
+				if c != '?':
+					v |= int(c, 16)
+					m |= 0xf
+			values.append(v)
+			mask.append(m)
+		return MinidumpSignature(bytes(values), bytes(mask))
+
+	@staticmethod
+	def from_pattern(pattern):
+		"""
+		Returns a MinidumpSignature for pattern, which can be bytes, a hex string signature or a MinidumpSignature
+		"""
+		if isinstance(pattern, MinidumpSignature):
+			return pattern
+		if isinstance(pattern, str):
+			return MinidumpSignature.parse(pattern)
+		return MinidumpSignature(pattern)
+
+	def __len__(self):
+		return self.length
+
+	def find(self, data, start = 0):
+		"""
+		Returns the index of the first match in data at or after start, -1 if there is none
+		"""
+		if self.is_exact is True:
+			return data.find(self.values, start)
+		if len(self.anchor) == 0:
+			m = self.regex.search(data, start)
+			return m.start() if m is not None else -1
+
+		pos = start + self.anchor_offset
+		while True:
+			marker = data.find(self.anchor, pos)
+			if marker == -1:
+				return -1
+			candidate = marker - self.anchor_offset
+			if self.regex.match(data, candidate) is not None:
+				return candidate
+			pos = marker + 1
+
+	def __str__(self):
+		t = []
+		for v, m in zip(self.values, self.mask):
+			h = '%02X' % v
+			t.append((h[0] if m & 0xf0 else '?') + (h[1] if m & 0x0f else '?'))
+		return ' '.join(t)
+
+class MinidumpPatternSet:
+	"""
+	A set of byte patterns that are searched together.
+	Every window of data is read once and scanned for all (remaining) patterns while it is in memory.
+	"""
+	def __init__(self, patterns):
+		self.patterns = list(dict.fromkeys(patterns))
+		if len(self.patterns) == 0:
+			raise Exception('No patterns to search for!')
+		for pattern in self.patterns:
+			if len(pattern) == 0:
+				raise Exception('Empty pattern!')
+		self.maxlen = max(len(pattern) for pattern in self.patterns)
+
+	def scan(self, data, base, skip, active, results, find_first = False):
+		"""
+		Appends the addresses of the active patterns found in data to results. base is the virtual address of data[0],
+		the first skip bytes have already been scanned (overlap with the previous window) so matches fully inside them are ignored.
+		With find_first, patterns are removed from active after their first match.
+		"""
+		for pattern in list(active):
+			marker = data.find(pattern, max(0, skip - len(pattern) + 1))
+			while marker != -1:
+				results[pattern].append(base + marker)
+				if find_first is True:
+					active.remove(pattern)
+					break
+				marker = data.find(pattern, marker + 1)
+
 class MinidumpMemorySegment:
+	__slots__ = ('start_virtual_address', 'size', 'end_virtual_address', 'start_file_address')
+
 	def __init__(self):
 		self.start_virtual_address = None
 		self.size = None
@@ -128,6 +280,39 @@ class MinidumpMemorySegment:
 		mms.end_virtual_address = mms.start_virtual_address + mms.size
 		return mms
 
+	@staticmethod
+	def merge_contiguous(memory_segments):
+		"""
+		Merges runs of segments that are contiguous both in the virtual address space and in the file into single segments.
+		Returns a new list sorted by virtual address, segments that could not be merged are returned as-is.
+		"""
+		if isinstance(memory_segments, MinidumpSegmentTable):
+			return memory_segments.merge_contiguous()
+		regions = []
+		run = []
+		for segment in sorted(memory_segments, key = lambda x: x.start_virtual_address):
+			if len(run) > 0:
+				prev = run[-1]
+				if prev.end_virtual_address == segment.start_virtual_address and prev.start_file_address + prev.size == segment.start_file_address:
+					run.append(segment)
+					continue
+				regions.append(MinidumpMemorySegment.from_run(run))
+			run = [segment]
+		if len(run) > 0:
+			regions.append(MinidumpMemorySegment.from_run(run))
+		return regions
+
+	@staticmethod
+	def from_run(run):
+		if len(run) == 1:
+			return run[0]
+		mms = MinidumpMemorySegment()
+		mms.start_virtual_address = run[0].start_virtual_address
+		mms.end_virtual_address = run[-1].end_virtual_address
+		mms.size = mms.end_virtual_address - mms.start_virtual_address
+		mms.start_file_address = run[0].start_file_address
+		return mms
+
 	def inrange(self, virt_addr):
 		if virt_addr >= self.start_virtual_address and virt_addr < self.end_virtual_address:
 			return True
@@ -140,8 +325,11 @@ class MinidumpMemorySegment:
 		if virtual_address+size > self.end_virtual_address:
 			raise Exception('Read would cross boundaries!')
 
-		pos = file_handler.tell()
 		offset = virtual_address - self.start_virtual_address
+		if hasattr(file_handler, 'view'):
+			return file_handler.view(self.start_file_address + offset, size)
+
+		pos = file_handler.tell()
 		file_handler.seek(self.start_file_address + offset, 0)
 		data = file_handler.read(size)
 		file_handler.seek(pos, 0)
@@ -154,97 +342,228 @@ class MinidumpMemorySegment:
 		if virtual_address+size > self.end_virtual_address:
 			raise Exception('Read would cross boundaries!')
 
-		pos = file_handler.tell()
 		offset = virtual_address - self.start_virtual_address
-		await file_handler.seek(self.start_file_address + offset, 0)
-		data = await file_handler.read(size)
-		await file_handler.seek(pos, 0)
-		return data
-
-	def search(self, pattern, file_handler, find_first = False, chunksize = 50*1024):
-		if len(pattern) > self.size:
-			return []
-		pos = file_handler.tell()
-		file_handler.seek(self.start_file_address, 0)
-		fl = []
-		if find_first is True:
-			chunksize = min(chunksize, self.size)
-			data = b''
-			i = 0
-			while len(data) < self.size:
-				i += 1
-				if chunksize > (self.size - len(data)):
-					chunksize = (self.size - len(data))
-				data += file_handler.read(chunksize)
-				marker = data.find(pattern)
-				if marker != -1:
-					#print('FOUND! size: %s i: %s read: %s perc: %s' % (self.size, i, i*chunksize, 100*((i*chunksize)/self.size)))
-					file_handler.seek(pos, 0)
-					return [self.start_virtual_address + marker]
+		return await aread_at(file_handler, self.start_file_address + offset, size)
 
-
-			#print('NOTFOUND! size: %s i: %s read: %s perc %s' % (self.size, i, len(data), 100*(len(data)/self.size) ))
-
-		else:
-			data = file_handler.read(self.size)
+	def iter_search(self, pattern, file_handler, chunksize = 50*1024, window = 4*1024*1024, start = None, end = None):
+		"""
+		Generator yielding the virtual addresses of pattern occurrences in the segment, in address order.
+		The first read is chunksize bytes and the read size doubles up to window, consecutive windows overlap by
+		len(pattern)-1 bytes so matches crossing window edges are found. Only matches lying entirely in the
+		[start, end) virtual address range are yielded.
+		The file position is restored after every read, so the handle can be used while the generator is suspended.
+		pattern is either bytes or a signature with wildcards (a hex string like '48 8B 05 ?? ?? ?? ??' or a MinidumpSignature).
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		offset = 0
+		limit = self.size
+		if start is not None:
+			offset = min(max(start - self.start_virtual_address, 0), self.size)
+		if end is not None:
+			limit = min(max(end - self.start_virtual_address, 0), self.size)
+		if len(pattern) == 0 or len(pattern) > limit - offset:
+			return
+		overlap = len(pattern) - 1
+		readsize = min(chunksize, window)
+		tail = b''
+		while offset < limit:
+			n = min(readsize, limit - offset)
+			pos = file_handler.tell()
+			file_handler.seek(self.start_file_address + offset, 0)
+			data = tail + file_handler.read(n)
 			file_handler.seek(pos, 0)
-
-			offset = 0
-			while len(data) > len(pattern):
-				marker = data.find(pattern)
-				if marker == -1:
-					return fl
-				fl.append(marker + offset + self.start_virtual_address)
-				data = data[marker+1:]
-				offset += marker + 1
-				if find_first is True:
-					return fl
-
-		file_handler.seek(pos, 0)
+			base = self.start_virtual_address + offset - len(tail)
+			marker = pattern.find(data)
+			while marker != -1:
+				yield base + marker
+				marker = pattern.find(data, marker + 1)
+			# the tail is shorter than the pattern, so matches in it are never reported twice
+			tail = data[-overlap:] if overlap > 0 else b''
+			offset += n
+			readsize = min(readsize * 2, window)
+
+	async def aiter_search(self, pattern, file_handler, chunksize = 50*1024, window = 4*1024*1024, start = None, end = None):
+		"""
+		Async version of iter_search
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		offset = 0
+		limit = self.size
+		if start is not None:
+			offset = min(max(start - self.start_virtual_address, 0), self.size)
+		if end is not None:
+			limit = min(max(end - self.start_virtual_address, 0), self.size)
+		if len(pattern) == 0 or len(pattern) > limit - offset:
+			return
+		overlap = len(pattern) - 1
+		readsize = min(chunksize, window)
+		tail = b''
+		while offset < limit:
+			n = min(readsize, limit - offset)
+			data = tail + await aread_at(file_handler, self.start_file_address + offset, n)
+			base = self.start_virtual_address + offset - len(tail)
+			marker = pattern.find(data)
+			while marker != -1:
+				yield base + marker
+				marker = pattern.find(data, marker + 1)
+			tail = data[-overlap:] if overlap > 0 else b''
+			offset += n
+			readsize = min(readsize * 2, window)
+
+	def iter_search_reverse(self, pattern, file_handler, chunksize = 50*1024, window = 4*1024*1024, start = None, end = None):
+		"""
+		Same as iter_search but scans the segment from its end backwards, yielding the hits in descending address order.
+		Consecutive windows overlap by len(pattern)-1 bytes at the start of the previously read (higher) window.
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		offset = 0
+		limit = self.size
+		if start is not None:
+			offset = min(max(start - self.start_virtual_address, 0), self.size)
+		if end is not None:
+			limit = min(max(end - self.start_virtual_address, 0), self.size)
+		if len(pattern) == 0 or len(pattern) > limit - offset:
+			return
+		overlap = len(pattern) - 1
+		readsize = min(chunksize, window)
+		head = b''
+		while limit > offset:
+			n = min(readsize, limit - offset)
+			limit -= n
+			pos = file_handler.tell()
+			file_handler.seek(self.start_file_address + limit, 0)
+			data = file_handler.read(n) + head
+			file_handler.seek(pos, 0)
+			base = self.start_virtual_address + limit
+			markers = []
+			marker = pattern.find(data)
+			while marker != -1:
+				markers.append(marker)
+				marker = pattern.find(data, marker + 1)
+			for marker in reversed(markers):
+				yield base + marker
+			# the head is shorter than the pattern, so matches in it are never reported twice
+			head = data[:overlap]
+			readsize = min(readsize * 2, window)
+
+	async def aiter_search_reverse(self, pattern, file_handler, chunksize = 50*1024, window = 4*1024*1024, start = None, end = None):
+		"""
+		Async version of iter_search_reverse
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		offset = 0
+		limit = self.size
+		if start is not None:
+			offset = min(max(start - self.start_virtual_address, 0), self.size)
+		if end is not None:
+			limit = min(max(end - self.start_virtual_address, 0), self.size)
+		if len(pattern) == 0 or len(pattern) > limit - offset:
+			return
+		overlap = len(pattern) - 1
+		readsize = min(chunksize, window)
+		head = b''
+		while limit > offset:
+			n = min(readsize, limit - offset)
+			limit -= n
+			data = await aread_at(file_handler, self.start_file_address + limit, n) + head
+			base = self.start_virtual_address + limit
+			markers = []
+			marker = pattern.find(data)
+			while marker != -1:
+				markers.append(marker)
+				marker = pattern.find(data, marker + 1)
+			for marker in reversed(markers):
+				yield base + marker
+			head = data[:overlap]
+			readsize = min(readsize * 2, window)
+
+	def search(self, pattern, file_handler, find_first = False, chunksize = 50*1024, window = 4*1024*1024):
+		"""
+		Returns the virtual addresses of pattern occurrences in the segment (only the first one if find_first is set).
+		pattern is either bytes or a signature with wildcards (a hex string like '48 8B 05 ?? ?? ?? ??' or a MinidumpSignature).
+		The segment is read in windows of at most window bytes, see iter_search. With find_first the first read
+		is chunksize bytes and the read size doubles up to window, so early hits are found cheaply.
+		"""
+		fl = []
+		for hit in self.iter_search(pattern, file_handler, chunksize = chunksize if find_first is True else window, window = window):
+			fl.append(hit)
+			if find_first is True:
+				break
 		return fl
 
-	async def asearch(self, pattern, file_handler, find_first = False, chunksize = 50*1024):
-		if len(pattern) > self.size:
-			return []
-		pos = file_handler.tell()
-		await file_handler.seek(self.start_file_address, 0)
+	async def asearch(self, pattern, file_handler, find_first = False, chunksize = 50*1024, window = 4*1024*1024):
+		"""
+		Async version of search
+		"""
 		fl = []
+		async for hit in self.aiter_search(pattern, file_handler, chunksize = chunksize if find_first is True else window, window = window):
+			fl.append(hit)
+			if find_first is True:
+				break
+		return fl
 
-		if find_first is True:
-			chunksize = min(chunksize, self.size)
-			data = b''
-			i = 0
-			while len(data) < self.size:
-				i += 1
-				if chunksize > (self.size - len(data)):
-					chunksize = (self.size - len(data))
-				data += await file_handler.read(chunksize)
-				marker = data.find(pattern)
-				if marker != -1:
-					#print('FOUND! size: %s i: %s read: %s perc: %s' % (self.size, i, i*chunksize, 100*((i*chunksize)/self.size)))
-					await file_handler.seek(pos, 0)
-					return [self.start_virtual_address + marker]
-
-
-			#print('NOTFOUND! size: %s i: %s read: %s perc %s' % (self.size, i, len(data), 100*(len(data)/self.size) ))
-
-		else:
-			offset = 0
-			data = await file_handler.read(self.size)
-			await file_handler.seek(pos, 0)
-			while len(data) > len(pattern):
-				marker = data.find(pattern)
-				if marker == -1:
-					return fl
-				fl.append(marker + offset + self.start_virtual_address)
-				data = data[marker+1:]
-				offset += marker + 1
-				if find_first is True:
-					return fl
+	def get_search_range(self, start = None, end = None):
+		"""
+		Returns the [offset, limit) segment relative range of the [start, end) virtual address range clipped to the segment
+		"""
+		offset = 0
+		limit = self.size
+		if start is not None:
+			offset = min(max(start - self.start_virtual_address, 0), self.size)
+		if end is not None:
+			limit = min(max(end - self.start_virtual_address, 0), self.size)
+		return offset, limit
+
+	def search_many(self, patterns, file_handler, find_first = False, chunksize = 50*1024, window = 4*1024*1024, start = None, end = None):
+		"""
+		Searches for multiple patterns reading the segment only once.
+		Returns a dict of pattern -> list of virtual addresses (only the first address per pattern if find_first is set)
+		Only matches lying entirely in the [start, end) virtual address range are returned.
+		"""
+		patternset = MinidumpPatternSet(patterns)
+		results = {pattern: [] for pattern in patternset.patterns}
+		offset, limit = self.get_search_range(start, end)
+		active = [pattern for pattern in patternset.patterns if len(pattern) <= limit - offset]
+		if len(active) == 0:
+			return results
+		pos = file_handler.tell()
+		file_handler.seek(self.start_file_address + offset, 0)
+		overlap = patternset.maxlen - 1
+		readsize = min(chunksize, window) if find_first is True else window
+		tail = b''
+		while offset < limit and len(active) > 0:
+			n = min(readsize, limit - offset)
+			data = tail + file_handler.read(n)
+			patternset.scan(data, self.start_virtual_address + offset - len(tail), len(tail), active, results, find_first = find_first)
+			tail = data[-overlap:] if overlap > 0 else b''
+			offset += n
+			readsize = min(readsize * 2, window)
 
-		await file_handler.seek(pos, 0)
-		return fl
+		file_handler.seek(pos, 0)
+		return results
 
+	async def asearch_many(self, patterns, file_handler, find_first = False, chunksize = 50*1024, window = 4*1024*1024, start = None, end = None):
+		"""
+		Async version of search_many
+		"""
+		patternset = MinidumpPatternSet(patterns)
+		results = {pattern: [] for pattern in patternset.patterns}
+		offset, limit = self.get_search_range(start, end)
+		active = [pattern for pattern in patternset.patterns if len(pattern) <= limit - offset]
+		if len(active) == 0:
+			return results
+		overlap = patternset.maxlen - 1
+		readsize = min(chunksize, window) if find_first is True else window
+		tail = b''
+		while offset < limit and len(active) > 0:
+			n = min(readsize, limit - offset)
+			data = tail + await aread_at(file_handler, self.start_file_address + offset, n)
+			patternset.scan(data, self.start_virtual_address + offset - len(tail), len(tail), active, results, find_first = find_first)
+			tail = data[-overlap:] if overlap > 0 else b''
+			offset += n
+			readsize = min(readsize * 2, window)
+
+		return results
 
 	@staticmethod
 	def get_header():
@@ -269,6 +588,285 @@ class MinidumpMemorySegment:
 
 
 
+class MinidumpSegmentTable:
+	"""
+	Memory segment table kept in parallel arrays of start virtual addresses, file offsets and sizes.
+	It behaves as a read-only sequence of MinidumpMemorySegment objects, the object of an entry is only created
+	when the entry is first accessed and it is kept afterwards, so the same entry always returns the same object.
+	"""
+	def __init__(self, starts = None, rvas = None, sizes = None):
+		self.starts = starts if starts is not None else array('Q')
+		self.rvas = rvas if rvas is not None else array('Q')
+		self.sizes = sizes if sizes is not None else array('Q')
+		self.segments = [None] * len(self.starts)
+
+	@staticmethod
+	def from_memory64(data, base_rva, count):
+		"""
+		data: raw MINIDUMP_MEMORY_DESCRIPTOR64 array (StartOfMemoryRange, DataSize),
+		the file offsets are the prefix sum of the sizes starting at base_rva (BaseRva of MINIDUMP_MEMORY64_LIST).
+		count: NumberOfMemoryRanges, buggy dumps may have less descriptors than stated
+		"""
+		count = min(count, len(data) // 16)
+		values = array('Q')
+		values.frombytes(data[:count * 16])
+		if sys.byteorder != 'little':
+			values.byteswap()
+		sizes = values[1::2]
+		rvas = array('Q', itertools.accumulate(sizes, initial = base_rva))
+		rvas.pop()
+		return MinidumpSegmentTable(values[0::2], rvas, sizes)
+
+	@staticmethod
+	def from_memory_list(data, count):
+		"""
+		data: raw MINIDUMP_MEMORY_DESCRIPTOR array (StartOfMemoryRange, DataSize, Rva)
+		"""
+		count = min(count, len(data) // 16)
+		if count == 0:
+			return MinidumpSegmentTable()
+		starts, sizes, rvas = zip(*struct.iter_unpack('<QII', data[:count * 16]))
+		return MinidumpSegmentTable(array('Q', starts), array('Q', rvas), array('Q', sizes))
+
+	@staticmethod
+	def from_segments(memory_segments):
+		table = MinidumpSegmentTable()
+		for segment in memory_segments:
+			table.starts.append(segment.start_virtual_address)
+			table.rvas.append(segment.start_file_address)
+			table.sizes.append(segment.size)
+		table.segments = list(memory_segments)
+		return table
+
+	def __len__(self):
+		return len(self.starts)
+
+	def get_segment(self, i):
+		segment = self.segments[i]
+		if segment is None:
+			segment = MinidumpMemorySegment()
+			segment.start_virtual_address = self.starts[i]
+			segment.size = self.sizes[i]
+			segment.end_virtual_address = segment.start_virtual_address + segment.size
+			segment.start_file_address = self.rvas[i]
+			self.segments[i] = segment
+		return segment
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self.get_segment(x) for x in range(*i.indices(len(self.starts)))]
+		if i < 0:
+			i += len(self.starts)
+		if i < 0 or i >= len(self.starts):
+			raise IndexError('segment index out of range')
+		return self.get_segment(i)
+
+	def __iter__(self):
+		for i in range(len(self.starts)):
+			yield self.get_segment(i)
+
+	def get_total_size(self):
+		return sum(self.sizes)
+
+	def is_sorted(self):
+		return all(a <= b for a, b in zip(self.starts, itertools.islice(self.starts, 1, None)))
+
+	def sort(self):
+		"""
+		Returns the table sorted by start address, the table itself if it is already sorted
+		"""
+		if self.is_sorted():
+			return self
+		order = sorted(range(len(self.starts)), key = self.starts.__getitem__)
+		table = MinidumpSegmentTable(
+			array('Q', [self.starts[i] for i in order]),
+			array('Q', [self.rvas[i] for i in order]),
+			array('Q', [self.sizes[i] for i in order]),
+		)
+		table.segments = [self.segments[i] for i in order]
+		return table
+
+	def merge_contiguous(self):
+		"""
+		Table version of MinidumpMemorySegment.merge_contiguous, returns a new table sorted by start address.
+		Entries which could not be merged keep their segment objects.
+		"""
+		table = self.sort()
+		starts = array('Q')
+		rvas = array('Q')
+		sizes = array('Q')
+		segments = []
+		for start, rva, size, segment in zip(table.starts, table.rvas, table.sizes, table.segments):
+			if len(starts) > 0 and starts[-1] + sizes[-1] == start and rvas[-1] + sizes[-1] == rva:
+				sizes[-1] += size
+				segments[-1] = None
+				continue
+			starts.append(start)
+			rvas.append(rva)
+			sizes.append(size)
+			segments.append(segment)
+		merged = MinidumpSegmentTable(starts, rvas, sizes)
+		merged.segments = segments
+		return merged
+
+class MinidumpSegmentIndex:
+	"""
+	Sorted lookup table over memory segments.
+	Finds the segment holding a virtual address with a binary search over the segment start addresses,
+	the most recently returned segment is checked first as pointer-chasing code tends to stay in the same segment.
+	"""
+	def __init__(self, memory_segments):
+		if isinstance(memory_segments, MinidumpSegmentTable):
+			# the table's arrays are used directly, segment objects are only created for the looked up entries
+			self.segments = memory_segments.sort()
+			self.starts = self.segments.starts
+		else:
+			self.segments = sorted(memory_segments, key = lambda x: x.start_virtual_address)
+			self.starts = [segment.start_virtual_address for segment in self.segments]
+		self.last_segment = None
+
+	def __len__(self):
+		return len(self.segments)
+
+	def __iter__(self):
+		return iter(self.segments)
+
+	def find(self, virt_addr):
+		"""
+		Returns the segment that contains virt_addr or None if the address is not in any segment
+		"""
+		segment = self.last_segment
+		if segment is not None and segment.start_virtual_address <= virt_addr < segment.end_virtual_address:
+			return segment
+
+		i = bisect.bisect_right(self.starts, virt_addr) - 1
+		if i < 0:
+			return None
+		segment = self.segments[i]
+		if virt_addr >= segment.end_virtual_address:
+			return None
+		self.last_segment = segment
+		return segment
+
+	def overlapping(self, start, end):
+		"""
+		Returns the list of segments which have at least one byte in the [start, end) address range, in address order
+		"""
+		i = bisect.bisect_right(self.starts, start) - 1
+		if i < 0 or self.segments[i].end_virtual_address <= start:
+			i += 1
+		j = bisect.bisect_left(self.starts, end)
+		return self.segments[i:j]
+
+	def range(self, start, end):
+		"""
+		Returns the list of segments which start in the [start, end) address range, in address order
+		"""
+		i = bisect.bisect_left(self.starts, start)
+		j = bisect.bisect_left(self.starts, end)
+		return self.segments[i:j]
+
+	def group_requests(self, requests, max_gap = 64*1024, max_size = 1024*1024):
+		"""
+		Plans the reads for a batch of (address, size) requests. The requests are sorted by address and the ones
+		in the same segment which are at most max_gap bytes apart are served by one read of at most max_size bytes
+		(a single larger request still gets its own read).
+		Returns a list of [segment, start, end, [(request index, address, size), ...]] reads, requests which are
+		not entirely inside one segment and zero size requests are left out.
+		"""
+		reads = []
+		current = None
+		segment = None
+		segment_start = segment_end = 0
+		for i in sorted(range(len(requests)), key = requests.__getitem__):
+			address, size = requests[i]
+			if size <= 0:
+				continue
+			end = address + size
+			if segment is None or address < segment_start or end > segment_end:
+				# not in the segment of the previous request
+				found = self.find(address)
+				if found is None or end > found.end_virtual_address:
+					continue
+				if found is not segment:
+					segment = found
+					segment_start = segment.start_virtual_address
+					segment_end = segment.end_virtual_address
+					current = None
+			if current is not None and address - current[2] <= max_gap and max(current[2], end) - current[1] <= max_size:
+				if end > current[2]:
+					current[2] = end
+				current[3].append((i, address, size))
+				continue
+			current = [segment, address, end, [(i, address, size)]]
+			reads.append(current)
+		return reads
+
+
+class MinidumpModuleIndex:
+	"""
+	Interval index over modules (anything having name, baseaddress and endaddress, eg. loaded or unloaded modules).
+	Address lookups are binary searches over the module base addresses, modules may overlap (unloaded modules often do).
+	The memory segments of a module are looked up once in the segment index and kept.
+	"""
+	def __init__(self, modules, segment_index = None):
+		self.modules = sorted(modules, key = lambda x: x.baseaddress)
+		self.starts = [mod.baseaddress for mod in self.modules]
+		# max_ends[i] is the highest end address of modules[:i+1], bounds the backwards scan of find
+		self.max_ends = []
+		max_end = 0
+		for mod in self.modules:
+			max_end = max(max_end, mod.endaddress)
+			self.max_ends.append(max_end)
+		self.names = {}
+		for mod in modules:
+			self.names.setdefault(ntpath.basename(mod.name).lower(), mod)
+		self.segment_index = segment_index
+		self.segments = {}
+
+	def __len__(self):
+		return len(self.modules)
+
+	def __iter__(self):
+		return iter(self.modules)
+
+	def find(self, virt_addr):
+		"""
+		Returns the module that contains virt_addr (the one with the highest base address if they overlap) or None
+		"""
+		i = bisect.bisect_right(self.starts, virt_addr) - 1
+		while i >= 0 and self.max_ends[i] > virt_addr:
+			if virt_addr < self.modules[i].endaddress:
+				return self.modules[i]
+			i -= 1
+		return None
+
+	def find_by_name(self, module_name):
+		"""
+		Returns the module with the given file name, falling back to the first module whose file name contains module_name.
+		Names are compared case-insensitively.
+		"""
+		module_name = module_name.lower()
+		mod = self.names.get(module_name)
+		if mod is not None:
+			return mod
+		for mod in self.modules:
+			if ntpath.basename(mod.name).lower().find(module_name) != -1:
+				return mod
+		return None
+
+	def get_segments(self, module):
+		"""
+		Returns the memory segments overlapping the module's address range, in address order
+		"""
+		key = (module.baseaddress, module.endaddress)
+		segments = self.segments.get(key)
+		if segments is None:
+			segments = self.segment_index.overlapping(module.baseaddress, module.endaddress)
+			self.segments[key] = segments
+		return segments
+
+
 def hexdump( src, length=16, sep='.', start = 0):
 	'''
 	@brief Return {src} in hex dump.
@@ -315,6 +913,59 @@ def hexdump( src, length=16, sep='.', start = 0):
 			result.append(('%08x(+%04x):  %-'+str(length*(2+1)+1)+'s  |%s|') % (start+i, i, hexa, text));
 	return '\n'.join(result);
 
+async def aread_at(file_handler, offset, size):
+	"""
+	Reads size bytes at offset of an async file handle. Handles with positional reads (read_at, see AsyncFile) are
+	read without touching their position, for the others the position is restored after the read.
+	"""
+	if hasattr(file_handler, 'read_at'):
+		return await file_handler.read_at(offset, size)
+	pos = file_handler.tell()
+	await file_handler.seek(offset, 0)
+	data = await file_handler.read(size)
+	await file_handler.seek(pos, 0)
+	return data
+
+class AReadAtFile:
+	"""
+	Base of the async file sources with positional reads (AsyncFile, AHTTPRangeFile).
+	Implements read/seek/tell for callers using the file object interface on top of the read_at(offset, size)
+	and get_size() coroutines of the subclass, the position is only a number in this object.
+	"""
+	def __init__(self):
+		self.position = 0
+
+	async def read_at(self, offset, size):
+		raise NotImplementedError()
+
+	async def get_size(self):
+		raise NotImplementedError()
+
+	async def read(self, n = -1):
+		offset = self.position
+		if n < 0:
+			n = max(await self.get_size() - offset, 0)
+		# the position is advanced before the read is awaited, so reads issued meanwhile continue after this one
+		self.position = offset + n
+		data = await self.read_at(offset, n)
+		if len(data) < n and self.position == offset + n:
+			self.position = offset + len(data)
+		return data
+
+	async def seek(self, n, beg = 0):
+		if beg == 0:
+			self.position = n
+		elif beg == 1:
+			self.position += n
+		elif beg == 2:
+			self.position = await self.get_size() + n
+		else:
+			raise Exception('Seek function whence value must be between 0-2')
+		return self.position
+
+	def tell(self):
+		return self.position
+
 def construct_table(lines, separate_head=True):
 	"""Prints a formatted table given a 2 dimensional array"""
 	#Count the column width
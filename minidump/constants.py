@@ -66,3 +66,21 @@ class MINIDUMP_TYPE(enum.IntFlag):
 	MiniDumpFilterTriage                   = 0x00100000
 	MiniDumpValidTypeFlags                 = 0x001fffff
 
+
+# MinidumpFile/AMinidumpFile attribute names of the parsed streams, these names can be used to select the streams to parse
+MINIDUMP_STREAM_ATTRIBUTES = {
+	'threads'            : MINIDUMP_STREAM_TYPE.ThreadListStream,
+	'modules'            : MINIDUMP_STREAM_TYPE.ModuleListStream,
+	'memory_segments'    : MINIDUMP_STREAM_TYPE.MemoryListStream,
+	'sysinfo'            : MINIDUMP_STREAM_TYPE.SystemInfoStream,
+	'threads_ex'         : MINIDUMP_STREAM_TYPE.ThreadExListStream,
+	'memory_segments_64' : MINIDUMP_STREAM_TYPE.Memory64ListStream,
+	'comment_a'          : MINIDUMP_STREAM_TYPE.CommentStreamA,
+	'comment_w'          : MINIDUMP_STREAM_TYPE.CommentStreamW,
+	'exception'          : MINIDUMP_STREAM_TYPE.ExceptionStream,
+	'handles'            : MINIDUMP_STREAM_TYPE.HandleDataStream,
+	'unloaded_modules'   : MINIDUMP_STREAM_TYPE.UnloadedModuleListStream,
+	'misc_info'          : MINIDUMP_STREAM_TYPE.MiscInfoStream,
+	'memory_info'        : MINIDUMP_STREAM_TYPE.MemoryInfoListStream,
+	'thread_info'        : MINIDUMP_STREAM_TYPE.ThreadInfoListStream,
+}
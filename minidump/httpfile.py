@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+import re
+import threading
+import http.client
+import urllib.parse
+import concurrent.futures
+
+from minidump.chunkcache import MinidumpChunkCache
+
+CONTENT_RANGE_RE = re.compile(r'bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)')
+
+class HTTPRangeSource:
+	"""
+	Fetches byte ranges of a remote file with HTTP Range requests, over a pool of keep-alive connections.
+	Thread safe, it is shared by the worker threads of HTTPRangeFile and AHTTPRangeFile.
+	Failed requests and short reads are retried (up to retries times per fetch), a short read only requests the missing part again.
+	A range starting past the end of the file returns no data.
+	"""
+	def __init__(self, url, headers = None, max_connections = 8, retries = 3, timeout = 30):
+		self.url = url
+		parsed = urllib.parse.urlsplit(url)
+		if parsed.scheme not in ['http', 'https']:
+			raise Exception('Unsupported URL scheme %s' % parsed.scheme)
+		self.scheme = parsed.scheme
+		self.host = parsed.hostname
+		self.port = parsed.port
+		self.path = parsed.path if parsed.path else '/'
+		if parsed.query:
+			self.path += '?' + parsed.query
+		self.headers = dict(headers) if headers is not None else {}
+		self.max_connections = max_connections
+		self.retries = retries
+		self.timeout = timeout
+		self.size = None # total size of the file, known after the first response
+
+		self.lock = threading.Lock()
+		self.connections = [] #idle connections
+		self.closed = False
+
+		self.requests = 0
+		self.retried = 0
+		self.fetched_bytes = 0
+		self.connections_opened = 0
+
+	def get_connection(self):
+		with self.lock:
+			if len(self.connections) > 0:
+				return self.connections.pop()
+			self.connections_opened += 1
+		if self.scheme == 'https':
+			return http.client.HTTPSConnection(self.host, self.port, timeout = self.timeout)
+		return http.client.HTTPConnection(self.host, self.port, timeout = self.timeout)
+
+	def release_connection(self, conn):
+		"""
+		Puts a connection whose response was read completely back to the pool
+		"""
+		with self.lock:
+			if self.closed is False and len(self.connections) < self.max_connections:
+				self.connections.append(conn)
+				return
+		conn.close()
+
+	def set_size(self, response):
+		m = CONTENT_RANGE_RE.match(response.getheader('Content-Range', ''))
+		if m is None:
+			raise Exception('Invalid Content-Range in the response: %s' % response.getheader('Content-Range'))
+		if m.group(3) != '*':
+			self.size = int(m.group(3))
+
+	def request(self, start, end):
+		"""
+		Issues one Range request for [start, end), returns the received data (which may be shorter)
+		"""
+		conn = self.get_connection()
+		with self.lock:
+			self.requests += 1
+		headers = dict(self.headers)
+		headers['Range'] = 'bytes=%d-%d' % (start, end - 1)
+		try:
+			conn.request('GET', self.path, headers = headers)
+			response = conn.getresponse()
+			if response.status != 206:
+				# not reading the body, with status 200 that would be the whole file
+				conn.close()
+				if response.status == 200:
+					raise Exception('The server does not support range requests for %s' % self.url)
+				if response.status == 416:
+					# the range starts past the end of the file, the response tells the size
+					self.set_size(response)
+					if self.size is None or start < self.size:
+						raise Exception('Range %s-%s is not satisfiable for %s' % (start, end, self.url))
+					return b''
+				raise http.client.HTTPException('HTTP status %s %s' % (response.status, response.reason))
+			self.set_size(response)
+			try:
+				data = response.read()
+			except http.client.IncompleteRead as e:
+				data = e.partial
+		except:
+			conn.close()
+			raise
+		if response.will_close or len(data) < end - start:
+			conn.close()
+		else:
+			self.release_connection(conn)
+		with self.lock:
+			self.fetched_bytes += len(data)
+		return data
+
+	def fetch(self, start, end):
+		"""
+		Returns the [start, end) range of the file, clipped to the end of the file
+		"""
+		chunks = []
+		pos = start
+		attempts = 0
+		while self.size is None or pos < min(end, self.size):
+			if pos > start or attempts > 0:
+				with self.lock:
+					self.retried += 1
+			try:
+				data = self.request(pos, end if self.size is None else min(end, self.size))
+			except (OSError, http.client.HTTPException) as e:
+				data = None
+				error = e
+			if data:
+				chunks.append(data)
+				pos += len(data)
+			if pos >= end or (self.size is not None and pos >= self.size):
+				break
+			# the request failed or returned less than asked, the next attempt continues where this one stopped
+			attempts += 1
+			if attempts > self.retries:
+				if data is None:
+					raise Exception('Range request %s-%s of %s failed: %s' % (pos, end, self.url, error))
+				raise Exception('Short read at %s of %s' % (pos, self.url))
+		if len(chunks) == 1:
+			return chunks[0]
+		return b''.join(chunks)
+
+	def close(self):
+		with self.lock:
+			self.closed = True
+			connections = self.connections
+			self.connections = []
+		for conn in connections:
+			conn.close()
+
+	def get_stats(self):
+		return {
+			'requests' : self.requests,
+			'retried' : self.retried,
+			'fetched_bytes' : self.fetched_bytes,
+			'connections_opened' : self.connections_opened,
+		}
+
+def get_fetch_parts(blocks, parallel):
+	"""
+	Splits the sorted list of missing block indices into (first, last) block ranges to fetch, one request each.
+	Runs of adjacent blocks are fetched with one request, or split into up to parallel requests which run at the same time.
+	"""
+	runs = []
+	for block in blocks:
+		if len(runs) > 0 and runs[-1][1] == block - 1:
+			runs[-1][1] = block
+		else:
+			runs.append([block, block])
+	parts = []
+	for first, last in runs:
+		count = last - first + 1
+		n = min(count, parallel)
+		for i in range(n):
+			parts.append((first + count * i // n, first + count * (i + 1) // n - 1))
+	return parts
+
+class HTTPRangeFile:
+	"""
+	Read only file object for a file served over HTTP(S), for MinidumpFile.parse_external.
+	The file is fetched block_size blocks at a time with Range requests and the blocks are kept in a MinidumpChunkCache,
+	so only the parts of the dump which are actually read are downloaded. Reads missing several adjacent blocks fetch them
+	with up to max_connections parallel requests over keep-alive connections.
+	headers: extra request headers (eg. authorization)
+	"""
+	def __init__(self, url, block_size = 64*1024, cache_size = 64*1024*1024, max_connections = 8, retries = 3, timeout = 30, headers = None):
+		self.url = url
+		self.source = HTTPRangeSource(url, headers = headers, max_connections = max_connections, retries = retries, timeout = timeout)
+		self.cache = MinidumpChunkCache(max_size = cache_size, block_size = block_size)
+		self.max_connections = max_connections
+		self.executor = None
+		self.lock = threading.Lock()
+		self.position = 0
+
+	@property
+	def size(self):
+		if self.source.size is None:
+			# the first block is needed anyway, the header of the dump is there
+			self.read_at(0, 1)
+		return self.source.size
+
+	def fetch_block_range(self, first, last):
+		block_size = self.cache.block_size
+		return self.source.fetch(first * block_size, (last + 1) * block_size)
+
+	def fetch_blocks(self, missing):
+		"""
+		Fetches the missing blocks, returns a block index -> block dict
+		"""
+		parts = get_fetch_parts(missing, self.max_connections)
+		if len(parts) == 1:
+			results = [self.fetch_block_range(*parts[0])]
+		else:
+			if self.executor is None:
+				self.executor = concurrent.futures.ThreadPoolExecutor(max_workers = self.max_connections)
+			results = list(self.executor.map(lambda part: self.fetch_block_range(*part), parts))
+
+		block_size = self.cache.block_size
+		blocks = {}
+		with self.lock:
+			for (first, last), data in zip(parts, results):
+				for k in range(first, last + 1):
+					block = data[(k - first) * block_size : (k - first + 1) * block_size]
+					if len(block) == 0:
+						break
+					self.cache.put(k, block)
+					blocks[k] = block
+		return blocks
+
+	def read_at(self, offset, size):
+		if self.source.size is not None:
+			size = min(size, self.source.size - offset)
+		if size <= 0:
+			return b''
+		block_size = self.cache.block_size
+		first = offset // block_size
+		last = (offset + size - 1) // block_size
+		with self.lock:
+			blocks = {k : self.cache.get(k) for k in range(first, last + 1)}
+		missing = [k for k in blocks if blocks[k] is None]
+		if len(missing) > 0:
+			blocks.update(self.fetch_blocks(missing))
+			if self.source.size is not None:
+				last = min(last, (self.source.size - 1) // block_size)
+		start = offset - first * block_size
+		if first == last:
+			return blocks[first][start : start + size]
+		return b''.join(blocks[k] for k in range(first, last + 1))[start : start + size]
+
+	def read(self, n = -1):
+		if n < 0:
+			n = max(self.size - self.position, 0)
+		data = self.read_at(self.position, n)
+		self.position += len(data)
+		return data
+
+	def seek(self, n, beg = 0):
+		if beg == 0:
+			self.position = n
+		elif beg == 1:
+			self.position += n
+		elif beg == 2:
+			self.position = self.size + n
+		else:
+			raise Exception('Seek function whence value must be between 0-2')
+		return self.position
+
+	def tell(self):
+		return self.position
+
+	def close(self):
+		if self.executor is not None:
+			self.executor.shutdown(wait = False)
+		self.source.close()
+
+	def get_stats(self):
+		"""
+		Returns the request counters of the source and the block cache counters
+		"""
+		stats = self.source.get_stats()
+		stats['cache'] = self.cache.get_stats()
+		return stats
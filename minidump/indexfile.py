@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+import os
+import sys
+import zlib
+import struct
+import logging
+from array import array
+
+from minidump.common_structs import MinidumpSegmentTable
+from minidump.streams.MemoryListStream import MinidumpMemoryList
+from minidump.streams.Memory64ListStream import MinidumpMemory64List
+from minidump.streams.MemoryInfoListStream import MinidumpMemoryInfoList, MinidumpMemoryInfoTable, MINIDUMP_MEMORY_INFO_LIST
+
+MDIDX_MAGIC = b'MDIDX\x00'
+MDIDX_VERSION = 3
+
+class MinidumpIndexFile:
+	"""
+	Sidecar index file (<dump>.mdidx) holding the parsed memory segment tables and the memory info list,
+	the streams which grow with the size of the dump. Reopening a dump with a valid index skips parsing those streams.
+	The index is keyed by the dump's file size, modification time and a checksum of the header and the stream directory,
+	an index with a different key is stale and gets rebuilt.
+
+	layout (little endian):
+	  header: magic(6s) version(H) file size(Q) mtime in ns(Q) checksum(I)
+	  sections: tag(4s) entry count(Q) followed by the packed entries
+	    SEGM, SEG6: memory list / memory64 list segment tables, the virtual address, file offset and size arrays one after the other (Q each)
+	    MINF: memory info table, the BaseAddress(Q), AllocationBase(Q), AllocationProtect(I), RegionSize(Q), State(I), Protect(I) and Type(I) arrays one after the other
+	"""
+	header_struct = struct.Struct('<6sHQQI')
+	section_struct = struct.Struct('<4sQ')
+
+	def __init__(self):
+		self.file_size = None
+		self.mtime = None
+		self.checksum = None
+		self.memory_segments = None
+		self.memory_segments_64 = None
+		self.memory_info = None
+
+	@staticmethod
+	def get_key(filename, header_data):
+		"""
+		Returns the (file size, mtime, checksum) key of a dump, header_data is the raw header followed by the raw stream directory
+		"""
+		st = os.stat(filename)
+		return st.st_size, st.st_mtime_ns, zlib.crc32(header_data)
+
+	@staticmethod
+	def from_minidump(minidumpfile, key):
+		mi = MinidumpIndexFile()
+		mi.file_size, mi.mtime, mi.checksum = key
+		if minidumpfile.memory_segments is not None:
+			mi.memory_segments = minidumpfile.memory_segments.memory_segments
+		if minidumpfile.memory_segments_64 is not None:
+			mi.memory_segments_64 = minidumpfile.memory_segments_64.memory_segments
+		if minidumpfile.memory_info is not None:
+			mi.memory_info = minidumpfile.memory_info.infos
+		return mi
+
+	def apply(self, minidumpfile):
+		"""
+		Sets the streams held by the index on the minidumpfile object, streams not selected by minidumpfile.streams are skipped
+		"""
+		selected = lambda name: minidumpfile.streams is None or name in minidumpfile.streams
+		if self.memory_segments is not None and selected('memory_segments'):
+			minidumpfile.memory_segments = MinidumpMemoryList()
+			minidumpfile.memory_segments.memory_segments = self.memory_segments
+		if self.memory_segments_64 is not None and selected('memory_segments_64'):
+			minidumpfile.memory_segments_64 = MinidumpMemory64List()
+			minidumpfile.memory_segments_64.memory_segments = self.memory_segments_64
+		if self.memory_info is not None and selected('memory_info'):
+			minidumpfile.memory_info = MinidumpMemoryInfoList()
+			minidumpfile.memory_info.header = MINIDUMP_MEMORY_INFO_LIST()
+			minidumpfile.memory_info.header.NumberOfEntries = len(self.memory_info)
+			minidumpfile.memory_info.infos = self.memory_info
+
+	@staticmethod
+	def pack_arrays(tag, count, arrays):
+		t = MinidumpIndexFile.section_struct.pack(tag, count)
+		for values in arrays:
+			if sys.byteorder != 'little':
+				values = array(values.typecode, values)
+				values.byteswap()
+			t += values.tobytes()
+		return t
+
+	@staticmethod
+	def unpack_arrays(data, pos, count, typecodes):
+		"""
+		Returns the arrays stored at pos and the position after them
+		"""
+		arrays = []
+		for typecode in typecodes:
+			values = array(typecode)
+			end = pos + count * values.itemsize
+			if end > len(data):
+				raise Exception('Truncated index file!')
+			values.frombytes(data[pos:end])
+			if sys.byteorder != 'little':
+				values.byteswap()
+			arrays.append(values)
+			pos = end
+		return arrays, pos
+
+	@staticmethod
+	def pack_segments(tag, segments):
+		if not isinstance(segments, MinidumpSegmentTable):
+			segments = MinidumpSegmentTable.from_segments(segments)
+		return MinidumpIndexFile.pack_arrays(tag, len(segments), [segments.starts, segments.rvas, segments.sizes])
+
+	def to_bytes(self):
+		t = MinidumpIndexFile.header_struct.pack(MDIDX_MAGIC, MDIDX_VERSION, self.file_size, self.mtime, self.checksum)
+		if self.memory_segments is not None:
+			t += MinidumpIndexFile.pack_segments(b'SEGM', self.memory_segments)
+		if self.memory_segments_64 is not None:
+			t += MinidumpIndexFile.pack_segments(b'SEG6', self.memory_segments_64)
+		if self.memory_info is not None:
+			infos = self.memory_info
+			if not isinstance(infos, MinidumpMemoryInfoTable):
+				infos = MinidumpMemoryInfoTable.from_infos(infos)
+			t += MinidumpIndexFile.pack_arrays(b'MINF', len(infos), [getattr(infos, name) for name in MinidumpMemoryInfoTable.columns])
+		return t
+
+	@staticmethod
+	def from_bytes(data):
+		mi = MinidumpIndexFile()
+		magic, version, mi.file_size, mi.mtime, mi.checksum = MinidumpIndexFile.header_struct.unpack_from(data, 0)
+		if magic != MDIDX_MAGIC or version != MDIDX_VERSION:
+			raise Exception('Not a minidump index file or unsupported version!')
+		pos = MinidumpIndexFile.header_struct.size
+		while pos < len(data):
+			tag, count = MinidumpIndexFile.section_struct.unpack_from(data, pos)
+			pos += MinidumpIndexFile.section_struct.size
+			if tag in [b'SEGM', b'SEG6']:
+				arrays, pos = MinidumpIndexFile.unpack_arrays(data, pos, count, ['Q', 'Q', 'Q'])
+				if tag == b'SEGM':
+					mi.memory_segments = MinidumpSegmentTable(*arrays)
+				else:
+					mi.memory_segments_64 = MinidumpSegmentTable(*arrays)
+			elif tag == b'MINF':
+				arrays, pos = MinidumpIndexFile.unpack_arrays(data, pos, count, MinidumpMemoryInfoTable.typecodes)
+				mi.memory_info = MinidumpMemoryInfoTable(*arrays)
+			else:
+				raise Exception('Unknown index section %s' % tag)
+		return mi
+
+	@staticmethod
+	def load(filename, key):
+		"""
+		Returns the index stored in filename if it exists and belongs to the dump identified by key, None otherwise
+		"""
+		try:
+			with open(filename, 'rb') as f:
+				data = f.read()
+		except OSError:
+			return None
+		try:
+			mi = MinidumpIndexFile.from_bytes(data)
+		except Exception as e:
+			logging.debug('Ignoring invalid index file %s: %s' % (filename, e))
+			return None
+		if (mi.file_size, mi.mtime, mi.checksum) != tuple(key):
+			logging.debug('Index file %s is stale' % filename)
+			return None
+		return mi
+
+	def save(self, filename):
+		"""
+		Writes the index to filename, the file is replaced atomically so concurrent readers never see a partial index
+		"""
+		tempname = '%s.%d.tmp' % (filename, os.getpid())
+		try:
+			with open(tempname, 'wb') as f:
+				f.write(self.to_bytes())
+			os.replace(tempname, filename)
+		except OSError as e:
+			logging.debug('Could not write index file %s: %s' % (filename, e))
+			try:
+				os.remove(tempname)
+			except OSError:
+				pass
@@ -6,6 +6,7 @@
 
 import io
 import sys
+import mmap
 import enum
 import struct
 import logging
@@ -15,46 +16,149 @@ from minidump.header import MinidumpHeader
 from minidump.minidumpreader import MinidumpFileReader
 from minidump.streams import *
 from minidump.common_structs import *
-from minidump.constants import MINIDUMP_STREAM_TYPE
+from minidump.constants import MINIDUMP_STREAM_TYPE, MINIDUMP_STREAM_ATTRIBUTES
 from minidump.directory import MINIDUMP_DIRECTORY
 from minidump.streams.SystemInfoStream import PROCESSOR_ARCHITECTURE
 from minidump.structures.peb import PEB
+from minidump.indexfile import MinidumpIndexFile
 
 
+class BufferFile:
+	"""
+	File-like wrapper around any object supporting the buffer protocol (mmap, bytes, bytearray...)
+	read/seek/tell behave like a regular file, view returns memoryview slices without copying the data.
+	The readers use view when it is available, so memory reads are served straight from the buffer.
+	"""
+	def __init__(self, buffer):
+		self.buffer = buffer
+		self.data = memoryview(buffer).cast('B')
+		self.size = len(self.data)
+		self.pos = 0
+
+	def read(self, n = -1):
+		if n is None or n < 0:
+			n = self.size - self.pos
+		data = self.data[self.pos:self.pos + n].tobytes()
+		self.pos += len(data)
+		return data
+
+	def view(self, offset, size):
+		return self.data[offset:offset + size]
+
+	def seek(self, n, beg = 0):
+		if beg == 0:
+			self.pos = n
+		elif beg == 1:
+			self.pos += n
+		elif beg == 2:
+			self.pos = self.size + n
+		else:
+			raise ValueError('Invalid whence value %s' % beg)
+		return self.pos
+
+	def tell(self):
+		return self.pos
+
 class MinidumpFile:
+	# streams are parsed on the first access of their attribute, see __getattr__
+	STREAM_PARSERS = {
+		'threads'            : MinidumpThreadList,
+		'modules'            : MinidumpModuleList,
+		'memory_segments'    : MinidumpMemoryList,
+		'sysinfo'            : MinidumpSystemInfo,
+		'threads_ex'         : MinidumpThreadExList,
+		'memory_segments_64' : MinidumpMemory64List,
+		'comment_a'          : CommentStreamA,
+		'comment_w'          : CommentStreamW,
+		'exception'          : ExceptionList,
+		'handles'            : MinidumpHandleDataStream,
+		'unloaded_modules'   : MinidumpUnloadedModuleList,
+		'misc_info'          : MinidumpMiscInfo,
+		'memory_info'        : MinidumpMemoryInfoList,
+		'thread_info'        : MinidumpThreadInfoList,
+	}
+
+	threads_ex:MinidumpThreadExList
+	threads:MinidumpThreadList
+	modules:MinidumpModuleList
+	memory_segments:MinidumpMemoryList
+	memory_segments_64:MinidumpMemory64List
+	sysinfo:MinidumpSystemInfo
+	comment_a:CommentStreamA
+	comment_w:CommentStreamW
+	exception:ExceptionList
+	handles:MinidumpHandleDataStream
+	unloaded_modules:MinidumpUnloadedModuleList
+	misc_info:MinidumpMiscInfo
+	memory_info:MinidumpMemoryInfoList
+	thread_info:MinidumpThreadInfoList
+	peb:PEB
+
 	def __init__(self):
 		self.filename:str = None
 		self.file_handle = None
 		self.header:MinidumpHeader = None
 		self.directories: List[MINIDUMP_DIRECTORY] = []
+		self.stream_directories = {}
+		# names of the streams to parse (keys of MINIDUMP_STREAM_ATTRIBUTES), None means all
+		self.streams = None
 
-		self.threads_ex:MinidumpThreadExList = None
-		self.threads:MinidumpThreadList = None
-		self.modules:MinidumpModuleList = None
-		self.memory_segments:MinidumpMemoryList = None
-		self.memory_segments_64:MinidumpMemory64List = None
-		self.sysinfo:MinidumpSystemInfo = None
-		self.comment_a:CommentStreamA = None
-		self.comment_w:CommentStreamW = None
-		self.exception:ExceptionList = None
-		self.handles:MinidumpHandleDataStream = None
-		self.unloaded_modules:MinidumpUnloadedModuleList = None
-		self.misc_info:MinidumpMiscInfo = None
-		self.memory_info:MinidumpMemoryInfoList = None
-		self.thread_info:MinidumpThreadInfoList = None
-
-		self.peb:PEB = None
+	def __getattr__(self, name):
+		"""
+		Parses a stream (or the PEB) on the first access of its attribute.
+		Streams missing from the dump or not selected by the streams parameter of parse are None.
+		"""
+		if name == 'peb':
+			value = self.__parse_peb()
+		elif name in MinidumpFile.STREAM_PARSERS:
+			value = self.__parse_stream(name)
+		else:
+			raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+		setattr(self, name, value)
+		return value
 
 	@staticmethod
-	def parse(filename):
+	def parse(filename, use_index = False, streams = None):
+		"""
+		use_index: keep the parsed memory segments and memory info in a <filename>.mdidx sidecar file,
+		reopening the dump later skips parsing those streams (see MinidumpIndexFile)
+		streams: list of the stream attributes to parse (eg. ['sysinfo', 'modules']), the others will be None.
+		Streams are only parsed when their attribute is first accessed.
+		"""
 		mf = MinidumpFile()
 		mf.filename = filename
 		mf.file_handle = open(filename, 'rb')
-		mf._parse()
+		mf._parse(index_filename = filename + '.mdidx' if use_index is True else None, streams = streams)
 		return mf
 
 	@staticmethod
-	def parse_external(file_handle, filename = ''):
+	def parse_mmap(filename, use_index = False, streams = None):
+		"""
+		Maps the file into memory and parses it.
+		Memory reads will return memoryview objects pointing into the mapping instead of copies.
+		"""
+		with open(filename, 'rb') as f:
+			mapping = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+		mf = MinidumpFile()
+		mf.filename = filename
+		mf.file_handle = BufferFile(mapping)
+		mf._parse(index_filename = filename + '.mdidx' if use_index is True else None, streams = streams)
+		return mf
+
+	@staticmethod
+	def parse_memory(buffer, filename = '', streams = None):
+		"""
+		Parses a minidump held in any object supporting the buffer protocol (bytes, bytearray, mmap...)
+		Memory reads will return memoryview objects pointing into the buffer instead of copies.
+		"""
+		mf = MinidumpFile()
+		mf.filename = filename
+		mf.file_handle = BufferFile(buffer)
+		mf._parse(streams = streams)
+		return mf
+
+	@staticmethod
+	def parse_external(file_handle, filename = '', streams = None):
 		"""
 		External file handle must be an object that exposes basic file IO functionality
 		that you'd get by python's file buffer (read, seek, tell etc.)
@@ -62,7 +166,7 @@ class MinidumpFile:
 		mf = MinidumpFile()
 		mf.filename = filename
 		mf.file_handle = file_handle
-		mf._parse()
+		mf._parse(streams = streams)
 		return mf
 
 	@staticmethod
@@ -79,13 +183,26 @@ class MinidumpFile:
 	def get_reader(self):
 		return MinidumpFileReader(self)
 
-	def _parse(self):
+	def _parse(self, index_filename = None, streams = None):
+		if streams is not None:
+			for name in streams:
+				if name not in MINIDUMP_STREAM_ATTRIBUTES:
+					raise Exception('Unknown stream %s' % name)
+			self.streams = list(streams)
 		self.__parse_header()
 		self.__parse_directories()
-		try:
-			self.__parse_peb()
-		except Exception as e:
-			logging.exception('PEB parsing error!')
+		if index_filename is not None:
+			self.file_handle.seek(0, 0)
+			header_data = self.file_handle.read(32)
+			self.file_handle.seek(self.header.StreamDirectoryRva, 0)
+			header_data += self.file_handle.read(self.header.NumberOfStreams * 12)
+			key = MinidumpIndexFile.get_key(self.filename, header_data)
+			index = MinidumpIndexFile.load(index_filename, key)
+			if index is not None:
+				index.apply(self)
+			elif self.streams is None:
+				# parses the memory streams
+				MinidumpIndexFile.from_minidump(self, key).save(index_filename)
 
 	def __parse_header(self):
 		self.header = MinidumpHeader.parse(self.file_handle)
@@ -101,126 +218,31 @@ class MinidumpFile:
 				logging.debug('Found Unknown UserStream directory Type: %x' % (user_stream_type_value))
 
 	def __parse_directories(self):
-
 		for dir in self.directories:
-			if dir.StreamType == MINIDUMP_STREAM_TYPE.UnusedStream:
-				logging.debug('Found UnusedStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				continue # Reserved. Do not use this enumeration value.
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ReservedStream0:
-				logging.debug('Found ReservedStream0 @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				continue # Reserved. Do not use this enumeration value.
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ReservedStream1:
-				logging.debug('Found ReservedStream1 @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				continue # Reserved. Do not use this enumeration value.
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ThreadListStream:
-				logging.debug('Found ThreadListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.threads = MinidumpThreadList.parse(dir, self.file_handle)
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ModuleListStream:
-				logging.debug('Found ModuleListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.modules = MinidumpModuleList.parse(dir, self.file_handle)
-				#logging.debug(str(modules_list))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.MemoryListStream:
-				logging.debug('Found MemoryListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.memory_segments = MinidumpMemoryList.parse(dir, self.file_handle)
-				#logging.debug(str(self.memory_segments))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.SystemInfoStream:
-				logging.debug('Found SystemInfoStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.sysinfo = MinidumpSystemInfo.parse(dir, self.file_handle)
-				#logging.debug(str(self.sysinfo))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ThreadExListStream:
-				logging.debug('Found ThreadExListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.threads_ex = MinidumpThreadExList.parse(dir, self.file_handle)
-				#logging.debug(str(self.threads_ex))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.Memory64ListStream:
-				logging.debug('Found Memory64ListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.memory_segments_64 = MinidumpMemory64List.parse(dir, self.file_handle)
-				#logging.debug(str(self.memory_segments_64))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.CommentStreamA:
-				logging.debug('Found CommentStreamA @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.comment_a = CommentStreamA.parse(dir, self.file_handle)
-				#logging.debug(str(self.comment_a))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.CommentStreamW:
-				logging.debug('Found CommentStreamW @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.comment_w = CommentStreamW.parse(dir, self.file_handle)
-				#logging.debug(str(self.comment_w))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ExceptionStream:
-				logging.debug('Found ExceptionStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.exception = ExceptionList.parse(dir, self.file_handle)
-				#logging.debug(str(self.comment_w))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.HandleDataStream:
-				logging.debug('Found HandleDataStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.handles = MinidumpHandleDataStream.parse(dir, self.file_handle)
-				#logging.debug(str(self.handles))
-				continue
-
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.FunctionTableStream:
-				logging.debug('Found FunctionTableStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				logging.debug('Parsing of this stream type is not yet implemented!')
+			logging.debug('Found %s @%x Size: %d' % (dir.StreamType.name, dir.Location.Rva, dir.Location.DataSize))
+			if dir.StreamType not in MINIDUMP_STREAM_ATTRIBUTES.values():
+				logging.debug('Parsing of this stream type is not implemented!')
 				continue
+			self.stream_directories[dir.StreamType] = dir
 
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.UnloadedModuleListStream:
-				logging.debug('Found UnloadedModuleListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.unloaded_modules = MinidumpUnloadedModuleList.parse(dir, self.file_handle)
-				#logging.debug(str(self.unloaded_modules))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.MiscInfoStream:
-				logging.debug('Found MiscInfoStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.misc_info = MinidumpMiscInfo.parse(dir, self.file_handle)
-				#logging.debug(str(self.misc_info))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.MemoryInfoListStream:
-				logging.debug('Found MemoryInfoListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.memory_info = MinidumpMemoryInfoList.parse(dir, self.file_handle)
-				#logging.debug(str(self.memory_info))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ThreadInfoListStream:
-				logging.debug('Found ThreadInfoListStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				self.thread_info = MinidumpThreadInfoList.parse(dir, self.file_handle)
-				logging.debug(str(self.thread_info))
-				continue
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.SystemMemoryInfoStream:
-				logging.debug('Found SystemMemoryInfoStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				logging.debug('SystemMemoryInfoStream parsing is not implemented (Missing documentation)')
-				continue
+	def __parse_stream(self, name):
+		if self.streams is not None and name not in self.streams:
+			return None
+		dir = self.stream_directories.get(MINIDUMP_STREAM_ATTRIBUTES[name])
+		if dir is None:
+			return None
+		stream = MinidumpFile.STREAM_PARSERS[name].parse(dir, self.file_handle)
+		if name == 'threads':
+			try:
+				self.__parse_thread_context(stream)
+			except Exception as e:
+				logging.exception('Thread context parsing error!')
+		return stream
 
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.JavaScriptDataStream:
-				logging.debug('Found JavaScriptDataStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				logging.debug('JavaScriptDataStream parsing is not implemented (Missing documentation)')
-
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.ProcessVmCountersStream:
-				logging.debug('Found ProcessVmCountersStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				logging.debug('ProcessVmCountersStream parsing is not implemented (Missing documentation)')
-
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.TokenStream:
-				logging.debug('Found TokenStream @%x Size: %d' % (dir.Location.Rva, dir.Location.DataSize))
-				logging.debug('TokenStream parsing is not implemented (Missing documentation)')
-
-			else:
-				logging.debug('Found Unknown Stream! Type: %s @%x Size: %d' % (dir.StreamType.name, dir.Location.Rva, dir.Location.DataSize))
-
-			"""
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.HandleOperationListStream:
-			elif dir.StreamType == MINIDUMP_STREAM_TYPE.LastReservedStream:
-
-			"""
-		try:
-			self.__parse_thread_context()
-		except Exception as e:
-			logging.exception('Thread context parsing error!')
-
-	def __parse_thread_context(self):
-		if not self.sysinfo or not self.threads:
+	def __parse_thread_context(self, threads):
+		if not self.sysinfo:
 			return
-		for thread in self.threads.threads:
+		for thread in threads.threads:
 			rva = thread.ThreadContext.Rva
 			self.file_handle.seek(rva)
 			if self.sysinfo.ProcessorArchitecture == PROCESSOR_ARCHITECTURE.AMD64:
@@ -230,11 +252,12 @@ class MinidumpFile:
 
 	def __parse_peb(self):
 		if not self.sysinfo or not self.threads:
-			return
-		
-		self.peb = PEB.from_minidump(self)
-		
-
+			return None
+		try:
+			return PEB.from_minidump(self)
+		except Exception as e:
+			logging.exception('PEB parsing error!')
+			return None
 
 	def __str__(self):
 		t = '== Minidump File ==\n'
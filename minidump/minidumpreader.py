@@ -3,32 +3,28 @@
 # Author:
 #  Tamas Jos (@skelsec)
 #
+import os
 import struct
 import ntpath
+import concurrent.futures
 from .common_structs import *
+from .addressmap import MinidumpAddressMap
+from .chunkcache import MinidumpChunkCache, MinidumpReadAhead
 from .streams.SystemInfoStream import PROCESSOR_ARCHITECTURE
 
-class VirtualSegment:
-	def __init__(self, start, end, start_file_address):
-		self.start = start
-		self.end = end
-		self.start_file_address = start_file_address
-
-
-
-		self.data = None
-
-	def inrange(self, start, end):
-		return self.start <= start and end<= self.end
-
 class MinidumpBufferedMemorySegment:
-	def __init__(self, memory_segment, file_handle, chunksize = 10*1024):
+	def __init__(self, memory_segment, file_handle, chunksize = 10*1024, cache = None, readahead = None):
 		self.start_address = memory_segment.start_virtual_address
 		self.end_address = memory_segment.end_virtual_address
 		self.total_size = memory_segment.end_virtual_address - memory_segment.start_virtual_address
 		self.start_file_address = memory_segment.start_file_address
 		self.chunksize = chunksize
-		self.chunks = []
+		# blocks are shared with the other segments of the reader, see MinidumpChunkCache
+		self.cache = cache if cache is not None else MinidumpChunkCache()
+		self.block_count = -(-self.total_size // self.cache.block_size)
+		self.readahead = readahead if readahead is not None else MinidumpReadAhead(policy = 'fixed', initial_size = chunksize, block_size = self.cache.block_size)
+		# file handles exposing view (BufferFile) are served without copying or caching
+		self.view = getattr(file_handle, 'view', None)
 
 	def inrange(self, position):
 		return self.start_address <= position < self.end_address
@@ -38,68 +34,159 @@ class MinidumpBufferedMemorySegment:
 			return None
 		return self.end_address - position
 
-	def find(self, file_handle, pattern, startpos):
-		data = self.read(file_handle, 0, -1)
-		return data.find(pattern, startpos)
+	def find(self, file_handle, pattern, startpos = 0):
+		"""
+		Returns the segment relative offset of the first occurrence of pattern at or after startpos, -1 if not found
+		"""
+		hits = self.find_all(file_handle, pattern, startpos, find_first = True)
+		if len(hits) == 0:
+			return -1
+		return hits[0]
+
+	def find_all(self, file_handle, pattern, startpos = 0, find_first = False, window = 1024*1024):
+		"""
+		Returns the segment relative offsets of all occurrences of pattern at or after startpos.
+		The segment is scanned once, window bytes at a time through the chunk cache,
+		consecutive windows overlap by len(pattern)-1 bytes so matches crossing window edges are found as well.
+		"""
+		hits = []
+		pattern = MinidumpSignature.from_pattern(pattern)
+		plen = len(pattern)
+		if plen == 0:
+			return hits
+		pos = startpos
+		while pos + plen <= self.total_size:
+			end = min(pos + window + plen - 1, self.total_size)
+			data = bytes(self.read(file_handle, pos, end))
+			marker = pattern.find(data)
+			# matches starting in the overlap belong to the next window
+			while marker != -1 and marker < window:
+				hits.append(pos + marker)
+				if find_first is True:
+					return hits
+				marker = pattern.find(data, marker + 1)
+			pos += window
+		return hits
+
+	def readahead_limit(self, block_index):
+		"""
+		Returns the index of the block after the last one that should be fetched when block_index is missing
+		"""
+		window = self.readahead.get_window()
+		if self.readahead.policy == 'fixed' and self.total_size <= 2*window:
+			return self.block_count
+		return min(self.block_count, block_index + -(-window // self.cache.block_size))
 
 	def read(self, file_handle, start, end):
+		if self.view is not None:
+			if end is None:
+				end = self.total_size
+			return self.view(self.start_file_address + start, end - start)
+
 		if end is None:
 			file_handle.seek(self.start_file_address + start)
-			return file_handle.read(self.end_address - (self.start_file_address + start))
-
-		for chunk in self.chunks:
-			if chunk.inrange(start, end):
-				return chunk.data[start - chunk.start: end - chunk.start]
-
-		if self.total_size <= 2*self.chunksize:
-			chunksize = self.total_size
-			vs = VirtualSegment(0, chunksize, self.start_file_address)
-			file_handle.seek(self.start_file_address)
-			vs.data = file_handle.read(chunksize)
-			self.chunks.append(vs)
-			return vs.data[start - vs.start: end - vs.start]
-
-		chunksize = max((end-start), self.chunksize)
-		if start + chunksize > self.end_address:
-			chunksize = self.end_address - start
-
-		vs = VirtualSegment(start, start+chunksize, self.start_file_address + start)
-		file_handle.seek(vs.start_file_address)
-		vs.data = file_handle.read(chunksize)
-		self.chunks.append(vs)
-
-		return vs.data[start - vs.start: end - vs.start]
-
+			return file_handle.read(self.total_size - start)
+
+		sequential = self.readahead.access(self.start_address + start, self.start_address + end)
+		block_size = self.cache.block_size
+		first = start // block_size
+		last = (end - 1) // block_size
+		blocks = [self.cache.get((self.start_address, i)) for i in range(first, last + 1)]
+
+		adjusted = False
+		i = first
+		while i <= last:
+			if blocks[i - first] is not None:
+				i += 1
+				continue
+			# fetching every consecutive missing block with one read, reading ahead past the requested range
+			j = i
+			while j < last and blocks[j + 1 - first] is None:
+				j += 1
+			if adjusted is False:
+				# once per read, however many missing runs the read has
+				self.readahead.adjust(sequential)
+				adjusted = True
+			limit = self.readahead_limit(i)
+			while j + 1 < limit and (self.start_address, j + 1) not in self.cache:
+				j += 1
+
+			file_handle.seek(self.start_file_address + i * block_size)
+			data = file_handle.read(min((j + 1) * block_size, self.total_size) - i * block_size)
+			self.readahead.fetched(len(data))
+			for k in range(i, j + 1):
+				block = data[(k - i) * block_size : (k - i + 1) * block_size]
+				self.cache.put((self.start_address, k), block)
+				if k <= last:
+					blocks[k - first] = block
+			i = j + 1
+
+		offset = first * block_size
+		if len(blocks) == 1:
+			return blocks[0][start - offset : end - offset]
+		return b''.join(blocks)[start - offset : end - offset]
 
 
 class MinidumpBufferedReader:
-	def __init__(self, reader, segment_chunk_size = 10*1024):
+	def __init__(self, reader, segment_chunk_size = 10*1024, cache_size = 64*1024*1024, readahead = 'adaptive', cache = None):
 		self.reader = reader
+		# several readers of the same dump can share one cache
+		self.cache = cache if cache is not None else MinidumpChunkCache(max_size = cache_size)
+		self.readahead = MinidumpReadAhead(policy = readahead, initial_size = segment_chunk_size, block_size = self.cache.block_size)
 		self.segment_chunk_size = segment_chunk_size
 		self.memory_segments = []
+		self.segment_cache = {} #start address of the memory segment -> buffered segment
 
 		self.current_segment = None
 		self.current_position = None
 
-	def _select_segment(self, requested_position):
+	def _get_buffered_segment(self, memory_segment):
+		"""
+		Returns the buffered segment for memory_segment, creating it on first use
 		"""
+		newsegment = self.segment_cache.get(memory_segment.start_virtual_address)
+		if newsegment is None:
+			newsegment = MinidumpBufferedMemorySegment(memory_segment, self.reader.file_handle, chunksize=self.segment_chunk_size, cache=self.cache, readahead=self.readahead)
+			self.segment_cache[memory_segment.start_virtual_address] = newsegment
+			self.memory_segments.append(newsegment)
+		return newsegment
+
+	def _read_span(self, position, size):
+		"""
+		Reads size bytes from position which is in the current segment, continuing in the adjacent segments when the read crosses the segment end.
+		Returns the data and the segment the read ended in.
+		"""
+		segment = self.current_segment
+		data = []
+		while True:
+			n = min(size, segment.end_address - position)
+			data.append(segment.read(self.reader.file_handle, position - segment.start_address, position - segment.start_address + n))
+			position += n
+			size -= n
+			if size == 0:
+				break
+			memory_segment = self.reader.region_index.find(position)
+			if memory_segment is None:
+				raise Exception('Would read over segment boundaries!')
+			segment = self._get_buffered_segment(memory_segment)
+		if len(data) == 1:
+			return data[0], segment
+		return b''.join(data), segment
 
+	def _select_segment(self, requested_position):
 		"""
-		# check if we have semgnet for requested address in cache
-		for memory_segment in self.memory_segments:
-			if memory_segment.inrange(requested_position):
-				self.current_segment = memory_segment
-				self.current_position = requested_position
-				return
+		Positions the reader to requested_position, selecting the memory segment that holds the address
+		"""
+		# most of the time we are moving inside the current segment
+		if self.current_segment is not None and self.current_segment.inrange(requested_position):
+			self.current_position = requested_position
+			return
 
-		# not in cache, check if it's present in memory space. if yes then create a new buffered memeory object, and copy data
-		for memory_segment in self.reader.memory_segments:
-			if memory_segment.inrange(requested_position):
-				newsegment = MinidumpBufferedMemorySegment(memory_segment, self.reader.file_handle, chunksize=self.segment_chunk_size)
-				self.memory_segments.append(newsegment)
-				self.current_segment = newsegment
-				self.current_position = requested_position
-				return
+		memory_segment = self.reader.region_index.find(requested_position)
+		if memory_segment is not None:
+			self.current_segment = self._get_buffered_segment(memory_segment)
+			self.current_position = requested_position
+			return
 
 		raise Exception('Memory address 0x%08x is not in process memory space' % requested_position)
 
@@ -158,13 +245,26 @@ class MinidumpBufferedReader:
 		"""
 		return self.current_position
 
+	def get_cache_stats(self):
+		"""
+		Returns the hit/miss/eviction counters and the current size of the chunk cache
+		"""
+		return self.cache.get_stats()
+
+	def get_readahead_stats(self):
+		"""
+		Returns the read-ahead policy in use, the current window size and the access pattern counters
+		"""
+		return self.readahead.get_stats()
+
 	def peek(self, length):
 		"""
 		Returns up to length bytes from the current memory segment
 		"""
 		t = self.current_position + length
 		if not self.current_segment.inrange(t - 1):
-			raise Exception('Would read over segment boundaries!')
+			data, _ = self._read_span(self.current_position, length)
+			return data
 		return self.current_segment.read(self.reader.file_handle, self.current_position - self.current_segment.start_address , t - self.current_segment.start_address)
 
 	def read(self, size = -1):
@@ -184,7 +284,9 @@ class MinidumpBufferedReader:
 
 		t = self.current_position + size
 		if not self.current_segment.inrange(t - 1):
-			raise Exception('Would read over segment boundaries!')
+			data, self.current_segment = self._read_span(self.current_position, size)
+			self.current_position = t
+			return data
 
 		old_new_pos = self.current_position
 		self.current_position = t
@@ -214,26 +316,19 @@ class MinidumpBufferedReader:
 
 	def find(self, pattern):
 		"""
-		Searches for a pattern in the current memory segment
+		Searches for a pattern in the current memory segment starting from the current position, returns the address of the first occurrence or -1
 		"""
-		pos = self.current_segment.find(self.reader.file_handle, pattern)
+		pos = self.current_segment.find(self.reader.file_handle, pattern, self.current_position - self.current_segment.start_address)
 		if pos == -1:
 			return -1
-		return pos + self.current_position
+		return pos + self.current_segment.start_address
 
 	def find_all(self, pattern):
 		"""
 		Searches for all occurrences of a pattern in the current memory segment, returns all occurrences as a list
 		"""
-		pos = []
-		last_found = -1
-		while True:
-			last_found = self.current_segment.find(self.reader.file_handle, pattern, last_found + 1)
-			if last_found == -1:
-				break
-			pos.append(last_found + self.current_segment.start_address)
-
-		return pos
+		pos = self.current_segment.find_all(self.reader.file_handle, pattern)
+		return [x + self.current_segment.start_address for x in pos]
 
 	def find_global(self, pattern):
 		"""
@@ -268,27 +363,143 @@ class MinidumpBufferedReader:
 			self.move(pos)
 			return self.read_uint()
 
+	def read_ptrs(self, addresses):
+		"""
+		Dereferences a batch of pointers, see the file reader's read_ptrs. Does not change the current position.
+		"""
+		return self.reader.read_ptrs(addresses)
+
+	def read_many(self, ranges):
+		"""
+		Reads a batch of (address, size) ranges, see the file reader's read_many. Does not change the current position.
+		"""
+		return self.reader.read_many(ranges)
+
+	def _read_prefetched(self, windows, address, size, prefetch):
+		"""
+		Returns size bytes from address using the windows dict ((region start, window index) -> (start address, data)) as a
+		local cache, on a miss the prefetch sized (aligned) window around address is read, clipped to the memory region.
+		Returns None if the data is not in the dump. The current position is not changed.
+		"""
+		region = self.reader.region_index.find(address)
+		if region is None or address + size > region.end_virtual_address:
+			return None
+		key = (region.start_virtual_address, address // prefetch)
+		window = windows.get(key)
+		if window is None or address < window[0] or address + size > window[0] + len(window[1]):
+			start = max(region.start_virtual_address, key[1] * prefetch)
+			end = min(region.end_virtual_address, max(start + prefetch, address + size))
+			# reading through the buffered segment of the region, the cursor of the reader stays where it is
+			segment = self._get_buffered_segment(region)
+			window = (start, bytes(segment.read(self.reader.file_handle, start - segment.start_address, end - segment.start_address)))
+			if len(windows) >= 64:
+				del windows[next(iter(windows))]
+			windows[key] = window
+		offset = address - window[0]
+		return window[1][offset:offset + size]
+
+	def walk_list(self, head, layout = None, list_entry_offset = 0, max_nodes = 100000, prefetch = 64*1024):
+		"""
+		Generator walking a doubly linked list (LIST_ENTRY) along the Flink pointers, head is the address of the list head.
+		Yields (entry address, entry) for every node, the entry address is the node address - list_entry_offset (the offset
+		of the LIST_ENTRY in the entry), entry is the entry decoded with layout (a StructLayout) or None without layout.
+		The walk stops when it gets back to the head, on a NULL or an already visited Flink (a corrupt, looping list),
+		after max_nodes entries, or when the next entry is not in the dump.
+		The memory is read in prefetch sized windows, nodes allocated close to each other are served from the same read.
+		The current position is not changed.
+		"""
+		ptr = struct.Struct(self.reader.unpack_ptr)
+		compiled = layout.compile(self.reader.sizeof_ptr) if layout is not None else None
+		size = list_entry_offset + ptr.size
+		if compiled is not None:
+			size = max(size, compiled.size)
+		windows = {}
+		data = self._read_prefetched(windows, head, ptr.size, prefetch)
+		if data is None:
+			return
+		flink = ptr.unpack_from(data)[0]
+		visited = set([head])
+		count = 0
+		while flink != 0 and flink not in visited and count < max_nodes:
+			visited.add(flink)
+			entry_address = flink - list_entry_offset
+			data = self._read_prefetched(windows, entry_address, size, prefetch)
+			if data is None:
+				return
+			count += 1
+			yield entry_address, compiled.unpack(data) if compiled is not None else None
+			flink = ptr.unpack_from(data, list_entry_offset)[0]
+
+	def read_struct(self, layout, address = None):
+		"""
+		Reads a structure described by a StructLayout with one read, at address or at the current position.
+		The position is moved after the structure.
+		"""
+		compiled = layout.compile(self.reader.sizeof_ptr)
+		if address is not None:
+			self.move(address)
+		data = self.read(compiled.size)
+		return compiled.unpack(data)
+
 	def find_in_module(self, module_name, pattern, find_first = False, reverse_order = False):
 		t = self.reader.search_module(module_name, pattern, find_first = find_first, reverse_order = reverse_order, chunksize = self.segment_chunk_size)
 		return t
 
+def search_worker(filename, units, pattern, find_first):
+	"""
+	Process pool entry point of MinidumpFileReader.search_parallel, opens its own handle to the dump file.
+	units: list of (start virtual address, start file address, size, scan size) tuples,
+	scan size extends the range with len(pattern)-1 bytes (within the memory segment) so matches crossing units are found,
+	only matches starting in the first size bytes are reported.
+	"""
+	hits = []
+	with open(filename, 'rb') as f:
+		for start_virtual_address, start_file_address, size, scan_size in units:
+			ms = MinidumpMemorySegment()
+			ms.start_virtual_address = start_virtual_address
+			ms.start_file_address = start_file_address
+			ms.size = scan_size
+			ms.end_virtual_address = start_virtual_address + scan_size
+			for hit in ms.search(pattern, f, find_first = find_first):
+				if hit < start_virtual_address + size:
+					hits.append(hit)
+			if find_first is True and len(hits) > 0:
+				break
+	return hits
+
 class MinidumpFileReader:
 	def __init__(self, minidumpfile):
-		self.modules = minidumpfile.modules.modules
+		# streams not selected by the streams parameter of parse are None
+		self.modules = []
+		if minidumpfile.modules is not None:
+			self.modules = minidumpfile.modules.modules
 		self.unloaded_modules = []
 		if minidumpfile.unloaded_modules is not None:
 			self.unloaded_modules = minidumpfile.unloaded_modules.modules
 
 		self.sysinfo = minidumpfile.sysinfo
+		if self.sysinfo is None:
+			raise Exception('The reader needs the sysinfo stream, it is missing from the dump or was not selected')
 
 		if minidumpfile.memory_segments_64:
 			self.memory_segments = minidumpfile.memory_segments_64.memory_segments
 			self.is_fulldump = True
 
-		else:
+		elif minidumpfile.memory_segments is not None:
 			self.memory_segments = minidumpfile.memory_segments.memory_segments
 			self.is_fulldump = False
 
+		else:
+			raise Exception('The reader needs the memory_segments_64 or the memory_segments stream, neither is in the dump or was selected')
+
+		self.segment_index = MinidumpSegmentIndex(self.memory_segments)
+		# contiguous segments merged, used for reading so reads can cross segment boundaries
+		self.region_index = MinidumpSegmentIndex(MinidumpMemorySegment.merge_contiguous(self.memory_segments))
+		self.module_index = MinidumpModuleIndex(self.modules, self.segment_index)
+		self.unloaded_index = MinidumpModuleIndex(self.unloaded_modules, self.segment_index)
+
+		self.minidumpfile = minidumpfile
+		self.address_map = None
 		self.filename = minidumpfile.filename
 		self.file_handle = minidumpfile.file_handle
 
@@ -311,47 +522,281 @@ class MinidumpFileReader:
 	def get_memory(self):
 		return self.memory_segments
 
-	def get_buffered_reader(self, segment_chunk_size = 10*1024):
-		return MinidumpBufferedReader(self, segment_chunk_size = segment_chunk_size)
+	def get_buffered_reader(self, segment_chunk_size = 10*1024, cache_size = 64*1024*1024, readahead = 'adaptive', cache = None):
+		return MinidumpBufferedReader(self, segment_chunk_size = segment_chunk_size, cache_size = cache_size, readahead = readahead, cache = cache)
+
+	def get_address_map(self):
+		"""
+		Returns the MinidumpAddressMap of the dump, it is built on the first call
+		"""
+		if self.address_map is None:
+			memory_info = self.minidumpfile.memory_info
+			self.address_map = MinidumpAddressMap(
+				memory_info.infos if memory_info is not None else None,
+				self.region_index,
+				self.modules,
+			)
+		return self.address_map
+
+	def get_address_info(self, virt_addr):
+		"""
+		Returns the MinidumpAddressRange (memory info region, captured region and module) containing virt_addr, None if nothing is known about it
+		"""
+		return self.get_address_map().find(virt_addr)
 
 	def get_module_by_name(self, module_name):
-		for mod in self.modules:
-			if ntpath.basename(mod.name).lower().find(module_name.lower()) != -1:
-				return mod
-		return None
+		return self.module_index.find_by_name(module_name)
 
 	def get_unloaded_by_name(self, module_name):
-		for mod in self.unloaded_modules:
-			if ntpath.basename(mod.name).find(module_name) != -1:
-				return mod
-		return None
+		return self.unloaded_index.find_by_name(module_name)
 
-	def search_module(self, module_name, pattern, find_first = False, reverse_order = False, chunksize = 10*1024):
-		mod = self.get_module_by_name(module_name)
+	def get_module_by_address(self, virt_addr):
+		"""
+		Returns the loaded (or if there is none, the unloaded) module that contains virt_addr, None if there is none
+		"""
+		mod = self.module_index.find(virt_addr)
 		if mod is None:
-			mod = self.get_unloaded_by_name(module_name)
-			if mod is None:
-				raise Exception('Could not find module! %s' % module_name)
-
-		needles = []
-		for ms in self.memory_segments:
-			if mod.baseaddress <= ms.start_virtual_address < mod.endaddress:
-				needles+= ms.search(pattern, self.file_handle, find_first = find_first, chunksize = chunksize)
-				if len(needles) > 0 and find_first is True:
-					return needles
+			mod = self.unloaded_index.find(virt_addr)
+		return mod
 
+	def get_module_segments(self, module_name):
+		"""
+		Returns the module and the memory segments overlapping it
+		"""
+		mod = self.get_module_by_name(module_name)
+		if mod is not None:
+			return mod, self.module_index.get_segments(mod)
+		mod = self.get_unloaded_by_name(module_name)
+		if mod is not None:
+			return mod, self.unloaded_index.get_segments(mod)
+		raise Exception('Could not find module! %s' % module_name)
+
+	def iter_search_module(self, module_name, pattern, reverse_order = False, chunksize = 10*1024):
+		"""
+		Generator yielding the addresses of pattern occurrences in the module's memory, in address order.
+		With reverse_order the module is scanned from its end backwards and the hits are yielded in descending address order.
+		"""
+		mod, segments = self.get_module_segments(module_name)
+		pattern = MinidumpSignature.from_pattern(pattern)
+		if reverse_order is True:
+			for ms in reversed(segments):
+				for hit in ms.iter_search_reverse(pattern, self.file_handle, chunksize = chunksize, start = mod.baseaddress, end = mod.endaddress):
+					yield hit
+		else:
+			for ms in segments:
+				for hit in ms.iter_search(pattern, self.file_handle, chunksize = chunksize, start = mod.baseaddress, end = mod.endaddress):
+					yield hit
 
+	def search_module(self, module_name, pattern, find_first = False, reverse_order = False, chunksize = 10*1024):
+		"""
+		Searches for the pattern in the memory of a loaded (or unloaded) module.
+		With reverse_order the hits are returned in descending address order, with find_first this is the last occurrence.
+		"""
+		needles = []
+		for hit in self.iter_search_module(module_name, pattern, reverse_order = reverse_order, chunksize = chunksize):
+			needles.append(hit)
+			if find_first is True:
+				break
 		return needles
 
+	def search_modules(self, module_names, pattern, find_first = False, reverse_order = False, chunksize = 10*1024):
+		"""
+		Searches for the pattern in multiple modules, returns a dict of module name -> list of addresses
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		results = {}
+		for module_name in module_names:
+			results[module_name] = self.search_module(module_name, pattern, find_first = find_first, reverse_order = reverse_order, chunksize = chunksize)
+		return results
+
 	def search(self, pattern, find_first = False, chunksize = 10*1024):
+		pattern = MinidumpSignature.from_pattern(pattern)
 		t = []
 		for ms in self.memory_segments:
 			t+= ms.search(pattern, self.file_handle, find_first = find_first, chunksize = chunksize)
 
 		return t
 
+	def iter_search(self, pattern, start = None, end = None, max_hits = None, chunksize = 10*1024, accessible_only = False):
+		"""
+		Generator yielding the addresses of pattern occurrences in the whole process memory space, in address order.
+		Segments are only read when the consumer gets to them, so breaking out of the loop skips the rest of the dump.
+		start, end: only matches lying entirely in the [start, end) virtual address range are yielded
+		max_hits: stops after this many hits
+		accessible_only: skips the memory the address map knows to be inaccessible (not committed, no access or guard pages)
+		"""
+		if max_hits is not None and max_hits <= 0:
+			return
+		pattern = MinidumpSignature.from_pattern(pattern)
+		if start is None:
+			start = 0
+		if end is None:
+			end = 1 << 64
+		if accessible_only is True:
+			parts = self.get_address_map().iter_captured(start, end, accessible_only = True)
+		else:
+			parts = ((start, end, ms) for ms in self.segment_index.overlapping(start, end))
+		hits = 0
+		for pstart, pend, ms in parts:
+			for hit in ms.iter_search(pattern, self.file_handle, chunksize = chunksize, start = pstart, end = pend):
+				yield hit
+				hits += 1
+				if max_hits is not None and hits >= max_hits:
+					return
+
+	def get_search_units(self, pattern_length, unit_size):
+		"""
+		Splits the memory segments into work units of roughly unit_size bytes, in address order.
+		Small segments are grouped together, large ones are cut into pieces.
+		"""
+		units = []
+		unit = []
+		unit_total = 0
+		for ms in self.segment_index:
+			offset = 0
+			while offset < ms.size:
+				size = min(unit_size - unit_total, ms.size - offset)
+				scan_size = min(size + pattern_length - 1, ms.size - offset)
+				unit.append((ms.start_virtual_address + offset, ms.start_file_address + offset, size, scan_size))
+				unit_total += size
+				offset += size
+				if unit_total >= unit_size:
+					units.append(unit)
+					unit = []
+					unit_total = 0
+		if len(unit) > 0:
+			units.append(unit)
+		return units
+
+	def search_parallel(self, pattern, find_first = False, workers = None, unit_size = None):
+		"""
+		Searches for the pattern in the whole process memory space using a pool of worker processes.
+		Every worker opens the dump file by its filename, results are returned in address order.
+		With find_first only the lowest address occurrence is returned and the outstanding work is cancelled once it is known.
+		If the file can't be reopened (eg. parse_external/parse_bytes) this falls back to the single process search.
+		"""
+		pattern = MinidumpSignature.from_pattern(pattern)
+		if not self.filename or not os.path.isfile(self.filename) or len(pattern) == 0:
+			# iter_search walks the segments in address order
+			return list(self.iter_search(pattern, max_hits = 1 if find_first is True else None))
+
+		if workers is None:
+			workers = os.cpu_count() or 1
+		if unit_size is None:
+			total_size = sum(ms.size for ms in self.memory_segments)
+			unit_size = min(max(total_size // (workers * 8), 1024*1024), 64*1024*1024)
+
+		units = self.get_search_units(len(pattern), unit_size)
+		results = [None] * len(units)
+		with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+			futures = {}
+			for i, unit in enumerate(units):
+				futures[executor.submit(search_worker, self.filename, unit, pattern, find_first)] = i
+
+			first_hit = len(units)
+			for future in concurrent.futures.as_completed(futures):
+				i = futures[future]
+				if future.cancelled():
+					continue
+				results[i] = future.result()
+				if find_first is True and len(results[i]) > 0 and i < first_hit:
+					first_hit = i
+					# units after the first known hit are not needed anymore
+					for f in futures:
+						if futures[f] > first_hit:
+							f.cancel()
+				if find_first is True and all(results[j] is not None for j in range(first_hit)):
+					break
+
+		if find_first is True:
+			if first_hit == len(units):
+				return []
+			return results[first_hit][:1]
+
+		t = []
+		for hits in results:
+			t += hits
+		return t
+
+	def search_many(self, patterns, find_first = False, chunksize = 10*1024):
+		"""
+		Searches for multiple patterns in the whole process memory space, reading every memory segment only once.
+		Returns a dict of pattern -> list of addresses, with find_first only the first address is returned for each pattern.
+		"""
+		return self._search_many(self.memory_segments, patterns, find_first, chunksize)
+
+	def search_module_many(self, module_name, patterns, find_first = False, chunksize = 10*1024):
+		"""
+		Searches for multiple patterns in the memory of a module, reading every memory segment only once.
+		Returns a dict of pattern -> list of addresses, with find_first only the first address is returned for each pattern.
+		"""
+		mod, segments = self.get_module_segments(module_name)
+		return self._search_many(segments, patterns, find_first, chunksize, start = mod.baseaddress, end = mod.endaddress)
+
+	def _search_many(self, memory_segments, patterns, find_first, chunksize, start = None, end = None):
+		results = {pattern: [] for pattern in MinidumpPatternSet(patterns).patterns}
+		remaining = list(results)
+		for ms in memory_segments:
+			hits = ms.search_many(remaining, self.file_handle, find_first = find_first, chunksize = chunksize, start = start, end = end)
+			for pattern in hits:
+				results[pattern] += hits[pattern]
+			if find_first is True:
+				remaining = [pattern for pattern in remaining if len(results[pattern]) == 0]
+				if len(remaining) == 0:
+					break
+		return results
+
+	def read_many(self, ranges):
+		"""
+		Reads a batch of (address, size) ranges. The requests are sorted and grouped per memory region, nearby
+		requests are served by a single read. Returns the data in request order, None for the ranges which are
+		not (entirely) in the dump and b'' for zero size ranges.
+		"""
+		results = [b'' if size == 0 else None for _, size in ranges]
+		for segment, start, end, items in self.region_index.group_requests(ranges):
+			data = segment.read(start, end - start, self.file_handle)
+			for i, address, size in items:
+				results[i] = data[address - start : address - start + size]
+		return results
+
+	def read_ptrs(self, addresses):
+		"""
+		Dereferences a batch of pointers like read_many, returns the pointer values in request order,
+		None for the addresses which are not in the dump.
+		"""
+		results = [None] * len(addresses)
+		unpack_from = struct.Struct(self.unpack_ptr).unpack_from
+		ranges = [(address, self.sizeof_ptr) for address in addresses]
+		for segment, start, end, items in self.region_index.group_requests(ranges):
+			data = segment.read(start, end - start, self.file_handle)
+			for i, address, _ in items:
+				results[i] = unpack_from(data, address - start)[0]
+		return results
+
+	def read_struct(self, layout, virt_addr):
+		"""
+		Reads a structure described by a StructLayout from virt_addr with one read
+		"""
+		compiled = layout.compile(self.sizeof_ptr)
+		data = self.read(virt_addr, compiled.size)
+		return compiled.unpack(data)
+
 	def read(self, virt_addr, size):
-		for segment in self.memory_segments:
-			if segment.inrange(virt_addr):
-				return segment.read(virt_addr, size, self.file_handle)
-		raise Exception('Address not in memory range! %s' % hex(virt_addr))
+		segment = self.region_index.find(virt_addr)
+		if segment is None:
+			raise Exception('Address not in memory range! %s' % hex(virt_addr))
+		if virt_addr + size <= segment.end_virtual_address:
+			return segment.read(virt_addr, size, self.file_handle)
+
+		# the read continues in the adjacent segment(s)
+		data = []
+		while True:
+			n = min(size, segment.end_virtual_address - virt_addr)
+			data.append(segment.read(virt_addr, n, self.file_handle))
+			virt_addr += n
+			size -= n
+			if size == 0:
+				return b''.join(data)
+			segment = self.region_index.find(virt_addr)
+			if segment is None:
+				raise Exception('Read would cross boundaries!')
@@ -2,6 +2,8 @@
 
 # https://www.vergiliusproject.com/kernels/x64/Windows%2010%20%7C%202016/1507%20Threshold%201/_M128A
 class M128A:
+    __slots__ = ('Low', 'High')
+
     def __init__(self):
         self.Low = 0                                        # 0x0 ULONGLONG
         self.High = 0                                       # 0x8 LONGLONG
@@ -32,11 +34,17 @@ class M128A:
 # https://doxygen.reactos.org/df/d06/sdk_2include_2xdk_2arm_2ke_8h_source.html#l00229
 class NEON128(M128A):
     # looks to be the same as M128A
-    pass
+    __slots__ = ()
 
 
 # https://www.vergiliusproject.com/kernels/x64/Windows%20Vista%20%7C%202008/SP2/_XMM_SAVE_AREA32
 class XMM_SAVE_AREA32:
+    __slots__ = (
+        'ControlWord', 'StatusWord', 'TagWord', 'Reserved1', 'ErrorOpcode', 'ErrorOffset', 'ErrorSelector',
+        'Reserved2', 'DataOffset', 'DataSelector', 'Reserved3', 'MxCsr', 'MxCsr_Mask', 'FloatRegisters',
+        'XmmRegisters', 'Reserved4',
+    )
+
     def __init__(self):
         self.ControlWord = 0                               # 0x0 USHORT
         self.StatusWord = 0                                # 0x2 USHORT
@@ -108,6 +116,11 @@ class XMM_SAVE_AREA32:
 
 
 class CTX_DUMMYSTRUCTNAME:
+    __slots__ = (
+        'Header', 'Legacy', 'Xmm0', 'Xmm1', 'Xmm2', 'Xmm3', 'Xmm4', 'Xmm5', 'Xmm6', 'Xmm7', 'Xmm8', 'Xmm9', 'Xmm10',
+        'Xmm11', 'Xmm12', 'Xmm13', 'Xmm14', 'Xmm15',
+    )
+
     def __init__(self):
         # all are M128A
         self.Header = []                # [2]
@@ -183,6 +196,8 @@ class CTX_DUMMYSTRUCTNAME:
 
 
 class CTX_DUMMYUNIONNAME:
+    __slots__ = ('FltSave', 'Q', 'D', 'DUMMYSTRUCTNAME', 'S')
+
     def __init__(self):
         self.FltSave = []                  # XMM_SAVE_AREA32
         self.Q = []                        # NEON128 [16]
@@ -225,6 +240,14 @@ class CTX_DUMMYUNIONNAME:
 
 # https:# docs.microsoft.com/en-us/windows/win32/api/winnt/ns-winnt-context
 class CONTEXT:
+    __slots__ = (
+        'P1Home', 'P2Home', 'P3Home', 'P4Home', 'P5Home', 'P6Home', 'ContextFlags', 'MxCsr', 'SegCs', 'SegDs', 'SegEs',
+        'SegFs', 'SegGs', 'SegSs', 'EFlags', 'Dr0', 'Dr1', 'Dr2', 'Dr3', 'Dr6', 'Dr7', 'Rax', 'Rcx', 'Rdx', 'Rbx',
+        'Rsp', 'Rbp', 'Rsi', 'Rdi', 'R8', 'R9', 'R10', 'R11', 'R12', 'R13', 'R14', 'R15', 'Rip', 'DUMMYUNIONNAME',
+        'VectorRegister', 'VectorControl', 'DebugControl', 'LastBranchToRip', 'LastBranchFromRip',
+        'LastExceptionToRip', 'LastExceptionFromRip',
+    )
+
     def __init__(self):
         self.P1Home = 0   # DWORD64
         self.P2Home = 0   # DWORD64
@@ -376,6 +399,11 @@ class CONTEXT:
 
 # https:# docs.microsoft.com/en-us/windows/win32/api/winnt/ns-winnt-wow64_floating_save_area
 class WOW64_FLOATING_SAVE_AREA:
+    __slots__ = (
+        'ControlWord', 'StatusWord', 'TagWord', 'ErrorOffset', 'ErrorSelector', 'DataOffset', 'DataSelector',
+        'RegisterArea', 'Cr0NpxState',
+    )
+
     def __init__(self):
         self.ControlWord = 0  # DWORD
         self.StatusWord = 0   # DWORD
@@ -416,6 +444,11 @@ class WOW64_FLOATING_SAVE_AREA:
 
 # https:# docs.microsoft.com/en-us/windows/win32/api/winnt/ns-winnt-wow64_context
 class WOW64_CONTEXT:
+    __slots__ = (
+        'ContextFlags', 'Dr0', 'Dr1', 'Dr2', 'Dr3', 'Dr6', 'Dr7', 'FloatSave', 'SegGs', 'SegFs', 'SegEs', 'SegDs',
+        'Edi', 'Esi', 'Ebx', 'Edx', 'Ecx', 'Eax', 'Ebp', 'Eip', 'SegCs', 'EFlags', 'Esp', 'SegSs', 'ExtendedRegisters',
+    )
+
     def __init__(self):
         self.ContextFlags = 0   # DWORD
         self.Dr0 = 0   # DWORD
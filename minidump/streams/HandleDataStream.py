@@ -28,6 +28,8 @@ class MINIDUMP_HANDLE_DATA_STREAM:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680374(v=vs.85).aspx
 class MINIDUMP_HANDLE_DESCRIPTOR:
+	__slots__ = ('Handle', 'TypeNameRva', 'ObjectNameRva', 'Attributes', 'GrantedAccess', 'HandleCount', 'PointerCount')
+
 	size = 32
 	def __init__(self):
 		self.Handle:int = None
@@ -53,6 +55,11 @@ class MINIDUMP_HANDLE_DESCRIPTOR:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680373(v=vs.85).aspx
 class MINIDUMP_HANDLE_DESCRIPTOR_2:
+	__slots__ = (
+		'Handle', 'TypeNameRva', 'ObjectNameRva', 'Attributes', 'GrantedAccess', 'HandleCount', 'PointerCount',
+		'ObjectInfoRva', 'Reserved0',
+	)
+
 	def __init__(self):
 		self.Handle:int = None
 		self.TypeNameRva:int = None
@@ -89,6 +96,8 @@ class MINIDUMP_HANDLE_OBJECT_INFORMATION_TYPE(enum.Enum):
 
 
 class MINIDUMP_HANDLE_OBJECT_INFORMATION:
+	__slots__ = ('NextInfoRva', 'InfoType', 'SizeOfInfo', 'info_bytes')
+
 	def __init__(self):
 		self.NextInfoRva:int = None
 		self.InfoType:int = None
@@ -119,6 +128,8 @@ class MINIDUMP_HANDLE_OBJECT_INFORMATION:
 		return mhoi
 
 class MinidumpHandleObjectInformation:
+	__slots__ = ('NextInfo', 'InfoType', 'SizeOfInfo', 'info_bytes')
+
 	def __init__(self):
 		self.NextInfo = None
 		self.InfoType:int = None
@@ -139,6 +150,11 @@ class MinidumpHandleObjectInformation:
 
 
 class MinidumpHandleDescriptor:
+	__slots__ = (
+		'Handle', 'TypeName', 'ObjectName', 'Attributes', 'GrantedAccess', 'HandleCount', 'PointerCount',
+		'ObjectInfos',
+	)
+
 	def __init__(self):
 		self.Handle:int = None
 		self.TypeName:str = None
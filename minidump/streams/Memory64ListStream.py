@@ -4,6 +4,7 @@
 #  Tamas Jos (@skelsec)
 #
 import io
+import struct
 from minidump.common_structs import *
 from typing import List
 
@@ -27,8 +28,9 @@ class MINIDUMP_MEMORY64_LIST:
 	@staticmethod
 	def parse(buff):
 		mml = MINIDUMP_MEMORY64_LIST()
-		buffsize = len(buff.read())
-		buff.seek(-buffsize, io.SEEK_CUR)
+		pos = buff.tell()
+		buffsize = buff.seek(0, io.SEEK_END)
+		buff.seek(pos, io.SEEK_SET)
 		mml.NumberOfMemoryRanges = int.from_bytes(buff.read(8), byteorder = 'little', signed = False)
 		mml.BaseRva = int.from_bytes(buff.read(8), byteorder = 'little', signed = False)
 		for _ in range(mml.NumberOfMemoryRanges):
@@ -52,6 +54,8 @@ class MINIDUMP_MEMORY64_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680384(v=vs.85).aspx
 class MINIDUMP_MEMORY_DESCRIPTOR64:
+	__slots__ = ('StartOfMemoryRange', 'DataSize')
+
 	def __init__(self):
 		self.StartOfMemoryRange:int = None
 		self.DataSize:int = None
@@ -78,33 +82,30 @@ class MINIDUMP_MEMORY_DESCRIPTOR64:
 
 class MinidumpMemory64List:
 	def __init__(self):
-		self.memory_segments:List[MinidumpMemorySegment] = []
+		self.memory_segments:MinidumpSegmentTable = MinidumpSegmentTable()
 
 	@staticmethod
 	def parse(dir, buff):
-		t = MinidumpMemory64List()
 		buff.seek(dir.Location.Rva)
-		chunk = io.BytesIO(buff.read(dir.Location.DataSize))
-		mtl = MINIDUMP_MEMORY64_LIST.parse(chunk)
-		rva = mtl.BaseRva
-		for mod in mtl.MemoryRanges:
-			t.memory_segments.append(MinidumpMemorySegment.parse_full(mod, rva))
-			rva += mod.DataSize
-		return t
+		return MinidumpMemory64List.from_bytes(buff.read(dir.Location.DataSize))
 
 	@staticmethod
 	async def aparse(dir, buff):
-		mml = MinidumpMemory64List()
 		await buff.seek(dir.Location.Rva)
 		chunk_data = await buff.read(dir.Location.DataSize)
-		chunk = io.BytesIO(chunk_data)
-		mtl = MINIDUMP_MEMORY64_LIST.parse(chunk)
-		rva = mtl.BaseRva
-		for mod in mtl.MemoryRanges:
-			ms = MinidumpMemorySegment.parse_full(mod, rva)
-			mml.memory_segments.append(ms)
-			rva += mod.DataSize
-		return mml
+		return MinidumpMemory64List.from_bytes(chunk_data)
+
+	@staticmethod
+	def from_bytes(data):
+		"""
+		Decodes the raw MINIDUMP_MEMORY64_LIST into a MinidumpSegmentTable, without creating per-range objects
+		"""
+		t = MinidumpMemory64List()
+		if len(data) < 16:
+			return t
+		count, base_rva = struct.unpack_from('<QQ', data, 0)
+		t.memory_segments = MinidumpSegmentTable.from_memory64(data[16:], base_rva, count)
+		return t
 
 	def to_table(self):
 		t = []
@@ -4,9 +4,18 @@
 #  Tamas Jos (@skelsec)
 #
 import io
+import sys
 import enum
+import struct
+import itertools
+from array import array
 from minidump.common_structs import *
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
 class AllocationProtect(enum.Enum):
 	NONE = 0
 	PAGE_EXECUTE = 0x10 #Enables execute access to the committed region of pages. An attempt to write to the committed region results in an access violation.
@@ -61,6 +70,21 @@ class MemoryState(enum.Enum):
 	MEM_FREE = 0x10000 #Indicates free pages not accessible to the calling process and available to be allocated. For free pages, the information in the AllocationBase, AllocationProtect, Protect, and Type members is undefined.
 	MEM_RESERVE = 0x2000 #Indicates reserved pages where a range of the process's virtual address space is reserved without any physical storage being allocated. For reserved pages, the information in the Protect member is undefined.
 
+# value -> enum member lookups, values which are not members map to None
+MEMORY_STATES = {x.value: x for x in MemoryState}
+ALLOCATION_PROTECTS = {x.value: x for x in AllocationProtect}
+MEMORY_TYPES = {x.value: x for x in MemoryType}
+
+def get_enum_value(members, value):
+	"""
+	Returns the enum member of value and None, or None and value if it is not a member (the raw value is kept only then,
+	most entries share a few member values and storing those again would cost an int object per field)
+	"""
+	member = members.get(value)
+	if member is None:
+		return None, value
+	return member, None
+
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680385(v=vs.85).aspx
 class MINIDUMP_MEMORY_INFO_LIST:
@@ -90,6 +114,11 @@ class MINIDUMP_MEMORY_INFO_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680386(v=vs.85).aspx
 class MINIDUMP_MEMORY_INFO:
+	__slots__ = (
+		'BaseAddress', 'AllocationBase', 'AllocationProtect', '__alignment1', 'RegionSize', 'State', 'Protect', 'Type',
+		'__alignment2', 'raw_state', 'raw_protect', 'raw_type',
+	)
+
 	def __init__(self):
 		self.BaseAddress = None
 		self.AllocationBase = None
@@ -100,14 +129,20 @@ class MINIDUMP_MEMORY_INFO:
 		self.Protect = None
 		self.Type = None
 		self.__alignment2 = 0
+		# State, Protect and Type values of the dump which are not enum members (the enum field is None for those)
+		self.raw_state = None
+		self.raw_protect = None
+		self.raw_type = None
 
 	def get_size(self):
 		return 8+8+4+4+8+4+4+4+4
 
 	def __str__(self):
 		t = ''
-		for k in self.__dict__:
-			t += '%s : %s\r\n' % (k, str(self.__dict__[k]))
+		for k in self.__slots__:
+			if k.startswith('__') or k.startswith('raw_'): # alignment, raw values
+				continue
+			t += '%s : %s\r\n' % (k, str(getattr(self, k)))
 		return t
 
 	def to_bytes(self):
@@ -130,23 +165,16 @@ class MINIDUMP_MEMORY_INFO:
 		mmi.AllocationProtect = int.from_bytes(buff.read(4), byteorder = 'little', signed = False)
 		mmi.__alignment1 = int.from_bytes(buff.read(4), byteorder = 'little', signed = False)
 		mmi.RegionSize = int.from_bytes(buff.read(8), byteorder = 'little', signed = False)
-		try:
-			mmi.State = MemoryState(int.from_bytes(buff.read(4), byteorder = 'little', signed = False))
-		except:
-			pass
-		try:
-			mmi.Protect = AllocationProtect(int.from_bytes(buff.read(4), byteorder = 'little', signed = False))
-		except:
-			pass
-		try:
-			mmi.Type = MemoryType(int.from_bytes(buff.read(4), byteorder = 'little', signed = False))
-		except:
-			pass
+		mmi.State, mmi.raw_state = get_enum_value(MEMORY_STATES, int.from_bytes(buff.read(4), byteorder = 'little', signed = False))
+		mmi.Protect, mmi.raw_protect = get_enum_value(ALLOCATION_PROTECTS, int.from_bytes(buff.read(4), byteorder = 'little', signed = False))
+		mmi.Type, mmi.raw_type = get_enum_value(MEMORY_TYPES, int.from_bytes(buff.read(4), byteorder = 'little', signed = False))
 		mmi.__alignment2 = int.from_bytes(buff.read(4), byteorder = 'little', signed = False)
 
 		return mmi
 
 class MinidumpMemoryInfo:
+	__slots__ = ('BaseAddress', 'AllocationBase', 'AllocationProtect', 'RegionSize', 'State', 'Protect', 'Type', 'raw_state', 'raw_protect', 'raw_type')
+
 	def __init__(self):
 		self.BaseAddress = None
 		self.AllocationBase = None
@@ -155,6 +183,10 @@ class MinidumpMemoryInfo:
 		self.State = None
 		self.Protect = None
 		self.Type = None
+		# State, Protect and Type values of the dump which are not enum members (the enum field is None for those)
+		self.raw_state = None
+		self.raw_protect = None
+		self.raw_type = None
 
 	@staticmethod
 	def parse(t, buff):
@@ -166,6 +198,9 @@ class MinidumpMemoryInfo:
 		mmi.State = t.State
 		mmi.Protect = t.Protect
 		mmi.Type = t.Type
+		mmi.raw_state = t.raw_state
+		mmi.raw_protect = t.raw_protect
+		mmi.raw_type = t.raw_type
 		return mmi
 
 	@staticmethod
@@ -194,37 +229,232 @@ class MinidumpMemoryInfo:
 		return t
 
 
+class MinidumpMemoryInfoTable:
+	"""
+	Memory info entries kept in typed arrays, one per field, the enum fields hold the raw values.
+	It behaves as a read-only sequence of MinidumpMemoryInfo objects which are created on first access.
+	Filtering is done on the columns with get_mask/select, vectorized with numpy if it is installed.
+	Masks are numpy bool arrays with numpy and bytearrays (one 0/1 byte per entry) without it,
+	use mask_and/mask_or/mask_not to combine them.
+	"""
+	columns = ['base_addresses', 'allocation_bases', 'allocation_protects', 'region_sizes', 'states', 'protects', 'types']
+	typecodes = ['Q', 'Q', 'I', 'Q', 'I', 'I', 'I']
+
+	def __init__(self, base_addresses = None, allocation_bases = None, allocation_protects = None, region_sizes = None, states = None, protects = None, types = None):
+		self.base_addresses = base_addresses if base_addresses is not None else array('Q')
+		self.allocation_bases = allocation_bases if allocation_bases is not None else array('Q')
+		self.allocation_protects = allocation_protects if allocation_protects is not None else array('I')
+		self.region_sizes = region_sizes if region_sizes is not None else array('Q')
+		self.states = states if states is not None else array('I')
+		self.protects = protects if protects is not None else array('I')
+		self.types = types if types is not None else array('I')
+		self.infos = [None] * len(self.base_addresses)
+
+	@staticmethod
+	def from_bytes(data, count, entry_size = 48):
+		"""
+		data: raw MINIDUMP_MEMORY_INFO array, count: NumberOfEntries, entry_size: SizeOfEntry
+		"""
+		count = min(count, len(data) // entry_size) if entry_size > 0 else 0
+		if count == 0:
+			return MinidumpMemoryInfoTable()
+		if entry_size != 48:
+			# entries with trailing fields we do not know about
+			entries = [struct.unpack_from('<QQIIQIIII', data, i * entry_size) for i in range(count)]
+			bases, allocbases, allocprotects, _, sizes, states, protects, types, _ = zip(*entries)
+			return MinidumpMemoryInfoTable(
+				array('Q', bases), array('Q', allocbases), array('I', allocprotects), array('Q', sizes),
+				array('I', states), array('I', protects), array('I', types)
+			)
+
+		# the same bytes are viewed as 6 qwords and as 12 dwords per entry
+		qwords = array('Q')
+		qwords.frombytes(data[:count * 48])
+		dwords = array('I')
+		dwords.frombytes(data[:count * 48])
+		if sys.byteorder != 'little':
+			qwords.byteswap()
+			dwords.byteswap()
+		return MinidumpMemoryInfoTable(
+			qwords[0::6], qwords[1::6], dwords[4::12], qwords[3::6], dwords[8::12], dwords[9::12], dwords[10::12]
+		)
+
+	@staticmethod
+	def get_raw_value(raw, member):
+		"""
+		Returns the raw value of an enum field of a MinidumpMemoryInfo
+		"""
+		if member is not None:
+			return member.value
+		return raw if raw is not None else 0
+
+	@staticmethod
+	def from_infos(infos):
+		table = MinidumpMemoryInfoTable()
+		for info in infos:
+			table.base_addresses.append(info.BaseAddress)
+			table.allocation_bases.append(info.AllocationBase)
+			table.allocation_protects.append(info.AllocationProtect)
+			table.region_sizes.append(info.RegionSize)
+			table.states.append(MinidumpMemoryInfoTable.get_raw_value(info.raw_state, info.State))
+			table.protects.append(MinidumpMemoryInfoTable.get_raw_value(info.raw_protect, info.Protect))
+			table.types.append(MinidumpMemoryInfoTable.get_raw_value(info.raw_type, info.Type))
+		table.infos = list(infos)
+		return table
+
+	def __len__(self):
+		return len(self.base_addresses)
+
+	def get_info(self, i):
+		info = self.infos[i]
+		if info is None:
+			info = MinidumpMemoryInfo()
+			info.BaseAddress = self.base_addresses[i]
+			info.AllocationBase = self.allocation_bases[i]
+			info.AllocationProtect = self.allocation_protects[i]
+			info.RegionSize = self.region_sizes[i]
+			info.State, info.raw_state = get_enum_value(MEMORY_STATES, self.states[i])
+			info.Protect, info.raw_protect = get_enum_value(ALLOCATION_PROTECTS, self.protects[i])
+			info.Type, info.raw_type = get_enum_value(MEMORY_TYPES, self.types[i])
+			self.infos[i] = info
+		return info
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self.get_info(x) for x in range(*i.indices(len(self)))]
+		if i < 0:
+			i += len(self)
+		if i < 0 or i >= len(self):
+			raise IndexError('memory info index out of range')
+		return self.get_info(i)
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self.get_info(i)
+
+	@staticmethod
+	def get_values(items):
+		"""
+		Returns the raw values of an enum member, an int or an iterable of those
+		"""
+		if isinstance(items, (int, enum.Enum)):
+			items = [items]
+		return set(x.value if isinstance(x, enum.Enum) else x for x in items)
+
+	def get_mask(self, states = None, protects = None, types = None, protect_flags = None, start = None, end = None):
+		"""
+		Returns the mask of the entries matching all given filters
+		states, protects, types: enum member, raw value or a set of those, the entry's value must be one of them
+		protect_flags: the entry's Protect value must have at least one of these bits set (eg. 0xF0 for any executable page)
+		start, end: the entry's region must overlap the [start, end) address range
+		"""
+		if numpy is not None:
+			return self.get_mask_numpy(states, protects, types, protect_flags, start, end)
+
+		mask = None
+		for column, items in [(self.states, states), (self.protects, protects), (self.types, types)]:
+			if items is not None:
+				mask = MinidumpMemoryInfoTable.mask_and(mask, bytearray(map(self.get_values(items).__contains__, column)))
+		if protect_flags is not None:
+			mask = MinidumpMemoryInfoTable.mask_and(mask, bytearray(x & protect_flags != 0 for x in self.protects))
+		if start is not None or end is not None:
+			start = start if start is not None else 0
+			end = end if end is not None else 2**64
+			mask = MinidumpMemoryInfoTable.mask_and(mask, bytearray(
+				base < end and base + size > start for base, size in zip(self.base_addresses, self.region_sizes)
+			))
+		if mask is None:
+			mask = bytearray(b'\x01') * len(self)
+		return mask
+
+	def get_mask_numpy(self, states, protects, types, protect_flags, start, end):
+		mask = numpy.ones(len(self), dtype = bool)
+		for column, items in [(self.states, states), (self.protects, protects), (self.types, types)]:
+			if items is not None:
+				mask &= numpy.isin(numpy.frombuffer(column, dtype = numpy.uint32), list(self.get_values(items)))
+		if protect_flags is not None:
+			mask &= (numpy.frombuffer(self.protects, dtype = numpy.uint32) & protect_flags) != 0
+		if start is not None or end is not None:
+			bases = numpy.frombuffer(self.base_addresses, dtype = numpy.uint64)
+			if end is not None:
+				mask &= bases < numpy.uint64(end)
+			if start is not None:
+				mask &= (bases + numpy.frombuffer(self.region_sizes, dtype = numpy.uint64)) > numpy.uint64(start)
+		return mask
+
+	@staticmethod
+	def mask_and(a, b):
+		if a is None:
+			return b
+		if numpy is not None and isinstance(a, numpy.ndarray):
+			return a & b
+		# the masks are 0/1 bytes, a big integer AND combines them in one go
+		return bytearray((int.from_bytes(a, 'little') & int.from_bytes(b, 'little')).to_bytes(len(a), 'little'))
+
+	@staticmethod
+	def mask_or(a, b):
+		if numpy is not None and isinstance(a, numpy.ndarray):
+			return a | b
+		return bytearray((int.from_bytes(a, 'little') | int.from_bytes(b, 'little')).to_bytes(len(a), 'little'))
+
+	@staticmethod
+	def mask_not(a):
+		if numpy is not None and isinstance(a, numpy.ndarray):
+			return ~a
+		return a.translate(bytes([1, 0]) + bytes(254))
+
+	def get_indices(self, mask):
+		"""
+		Returns the indices of the entries set in mask
+		"""
+		if numpy is not None and isinstance(mask, numpy.ndarray):
+			return numpy.flatnonzero(mask).tolist()
+		return list(itertools.compress(range(len(mask)), mask))
+
+	def select(self, **filters):
+		"""
+		Returns the MinidumpMemoryInfo objects of the entries matching the filters, see get_mask for the filters
+		"""
+		return [self.get_info(i) for i in self.get_indices(self.get_mask(**filters))]
+
+	def count(self, **filters):
+		mask = self.get_mask(**filters)
+		if numpy is not None and isinstance(mask, numpy.ndarray):
+			return int(numpy.count_nonzero(mask))
+		return mask.count(1)
+
 class MinidumpMemoryInfoList:
 	def __init__(self):
 		self.header = None
-		self.infos = []
+		self.infos:MinidumpMemoryInfoTable = MinidumpMemoryInfoTable()
 
 	@staticmethod
 	def parse(dir, buff):
-		t = MinidumpMemoryInfoList()
 		buff.seek(dir.Location.Rva)
-		data = buff.read(dir.Location.DataSize)
-		chunk = io.BytesIO(data)
-		t.header = MINIDUMP_MEMORY_INFO_LIST.parse(chunk)
-		for _ in range(t.header.NumberOfEntries):
-			mi = MINIDUMP_MEMORY_INFO.parse(chunk)
-			t.infos.append(MinidumpMemoryInfo.parse(mi, buff))
-
-		return t
+		return MinidumpMemoryInfoList.from_bytes(buff.read(dir.Location.DataSize))
 
 	@staticmethod
 	async def aparse(dir, buff):
-		t = MinidumpMemoryInfoList()
 		await buff.seek(dir.Location.Rva)
 		data = await buff.read(dir.Location.DataSize)
-		chunk = io.BytesIO(data)
-		t.header = MINIDUMP_MEMORY_INFO_LIST.parse(chunk)
-		for _ in range(t.header.NumberOfEntries):
-			mi = MINIDUMP_MEMORY_INFO.parse(chunk)
-			t.infos.append(MinidumpMemoryInfo.parse(mi, None))
+		return MinidumpMemoryInfoList.from_bytes(data)
 
+	@staticmethod
+	def from_bytes(data):
+		"""
+		Decodes the raw MINIDUMP_MEMORY_INFO_LIST into a MinidumpMemoryInfoTable, without creating per-entry objects
+		"""
+		t = MinidumpMemoryInfoList()
+		t.header = MINIDUMP_MEMORY_INFO_LIST.parse(io.BytesIO(data))
+		t.infos = MinidumpMemoryInfoTable.from_bytes(data[t.header.SizeOfHeader:], t.header.NumberOfEntries, t.header.SizeOfEntry)
 		return t
 
+	def select(self, **filters):
+		"""
+		Returns the memory info entries matching the filters, see MinidumpMemoryInfoTable.get_mask
+		"""
+		return self.infos.select(**filters)
+
 	def to_table(self):
 		t = []
 		t.append(MinidumpMemoryInfo.get_header())
@@ -233,4 +463,4 @@ class MinidumpMemoryInfoList:
 		return t
 
 	def __str__(self):
-		return '== MinidumpMemoryInfoList ==\n' + construct_table(self.to_table())
\ No newline at end of file
+		return '== MinidumpMemoryInfoList ==\n' + construct_table(self.to_table())
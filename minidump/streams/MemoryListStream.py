@@ -36,6 +36,8 @@ class MINIDUMP_MEMORY_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680384(v=vs.85).aspx
 class MINIDUMP_MEMORY_DESCRIPTOR:
+	__slots__ = ('StartOfMemoryRange', 'MemoryLocation', 'DataSize', 'Rva')
+
 	def __init__(self):
 		self.StartOfMemoryRange = None
 		self.MemoryLocation = None
@@ -75,27 +77,29 @@ class MINIDUMP_MEMORY_DESCRIPTOR:
 
 class MinidumpMemoryList:
 	def __init__(self):
-		self.memory_segments = []
+		self.memory_segments = MinidumpSegmentTable()
 
 	@staticmethod
 	def parse(dir, buff):
-		t = MinidumpMemoryList()
 		buff.seek(dir.Location.Rva)
-		chunk = io.BytesIO(buff.read(dir.Location.DataSize))
-		mtl = MINIDUMP_MEMORY_LIST.parse(chunk)
-		for mod in mtl.MemoryRanges:
-			t.memory_segments.append(MinidumpMemorySegment.parse_mini(mod, buff))
-		return t
+		return MinidumpMemoryList.from_bytes(buff.read(dir.Location.DataSize))
 
 	@staticmethod
 	async def aparse(dir, buff):
-		t = MinidumpMemoryList()
 		await buff.seek(dir.Location.Rva)
 		chunk_data = await buff.read(dir.Location.DataSize)
-		chunk = io.BytesIO(chunk_data)
-		mtl = MINIDUMP_MEMORY_LIST.parse(chunk)
-		for mod in mtl.MemoryRanges:
-			t.memory_segments.append(MinidumpMemorySegment.parse_mini(mod, buff))
+		return MinidumpMemoryList.from_bytes(chunk_data)
+
+	@staticmethod
+	def from_bytes(data):
+		"""
+		Decodes the raw MINIDUMP_MEMORY_LIST into a MinidumpSegmentTable, without creating per-range objects
+		"""
+		t = MinidumpMemoryList()
+		if len(data) < 4:
+			return t
+		count = int.from_bytes(data[:4], byteorder = 'little', signed = False)
+		t.memory_segments = MinidumpSegmentTable.from_memory_list(data[4:], count)
 		return t
 
 	def __str__(self):
@@ -7,6 +7,8 @@ import io
 from minidump.common_structs import *
 
 class MinidumpModule:
+	__slots__ = ('name', 'baseaddress', 'size', 'endaddress', 'versioninfo', 'checksum', 'timestamp')
+
 	def __init__(self):
 		self.name = None
 		self.baseaddress = None
@@ -77,6 +79,12 @@ class MinidumpModule:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms646997(v=vs.85).aspx
 class VS_FIXEDFILEINFO:
+	__slots__ = (
+		'dwSignature', 'dwStrucVersion', 'dwFileVersionMS', 'dwFileVersionLS', 'dwProductVersionMS',
+		'dwProductVersionLS', 'dwFileFlagsMask', 'dwFileFlags', 'dwFileOS', 'dwFileType', 'dwFileSubtype',
+		'dwFileDateMS', 'dwFileDateLS',
+	)
+
 	def __init__(self):
 		self.dwSignature = None
 		self.dwStrucVersion = None
@@ -135,12 +143,19 @@ class VS_FIXEDFILEINFO:
 
 	def __str__(self):
 		t = ''
-		for k in self.__dict__:
-			t += '%s : %s\r\n' % (k, str(self.__dict__[k]))
+		for k in self.__slots__:
+			if k.startswith('__'): # alignment
+				continue
+			t += '%s : %s\r\n' % (k, str(getattr(self, k)))
 		return t
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680392(v=vs.85).aspx
 class MINIDUMP_MODULE:
+	__slots__ = (
+		'BaseOfImage', 'SizeOfImage', 'CheckSum', 'TimeDateStamp', 'ModuleNameRva', 'VersionInfo', 'CvRecord',
+		'MiscRecord', 'Reserved0', 'Reserved1', 'ModuleName',
+	)
+
 	def __init__(self):
 		self.BaseOfImage = None
 		self.SizeOfImage = None
@@ -189,8 +204,10 @@ class MINIDUMP_MODULE:
 
 	def __str__(self):
 		t = ''
-		for k in self.__dict__:
-			t += '%s : %s\r\n' % (k, str(self.__dict__[k]))
+		for k in self.__slots__:
+			if k.startswith('__'): # alignment
+				continue
+			t += '%s : %s\r\n' % (k, str(getattr(self, k)))
 		return t
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680391(v=vs.85).aspx
@@ -25,6 +25,10 @@ class MINIDUMP_THREAD_EX_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680400(v=vs.85).aspx
 class MINIDUMP_THREAD_EX:
+	__slots__ = (
+		'ThreadId', 'SuspendCount', 'PriorityClass', 'Priority', 'Teb', 'Stack', 'ThreadContext', 'BackingStore',
+	)
+
 	def __init__(self):
 		self.ThreadId = None
 		self.SuspendCount = None
@@ -41,6 +41,11 @@ class MINIDUMP_THREAD_INFO_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680510(v=vs.85).aspx
 class MINIDUMP_THREAD_INFO:
+	__slots__ = (
+		'ThreadId', 'DumpFlags', 'DumpError', 'ExitStatus', 'CreateTime', 'ExitTime', 'KernelTime', 'UserTime',
+		'StartAddress', 'Affinity',
+	)
+
 	def __init__(self):
 		self.ThreadId = None
 		self.DumpFlags = None
@@ -88,6 +93,11 @@ class MINIDUMP_THREAD_INFO:
 		return mti
 
 class MinidumpThreadInfo:
+	__slots__ = (
+		'ThreadId', 'DumpFlags', 'DumpError', 'ExitStatus', 'CreateTime', 'ExitTime', 'KernelTime', 'UserTime',
+		'StartAddress', 'Affinity',
+	)
+
 	def __init__(self):
 		self.ThreadId = None
 		self.DumpFlags = None
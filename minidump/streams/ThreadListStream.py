@@ -29,6 +29,10 @@ class MINIDUMP_THREAD_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680517(v=vs.85).aspx
 class MINIDUMP_THREAD:
+	__slots__ = (
+		'ThreadId', 'SuspendCount', 'PriorityClass', 'Priority', 'Teb', 'Stack', 'ThreadContext', 'ContextObject',
+	)
+
 	def __init__(self):
 		self.ThreadId = None
 		self.SuspendCount = None
@@ -37,6 +41,7 @@ class MINIDUMP_THREAD:
 		self.Teb = None
 		self.Stack = None
 		self.ThreadContext = None
+		self.ContextObject = None
 
 	def to_bytes(self):
 		t  = self.ThreadId.value.to_bytes(4, byteorder = 'little', signed = False)
@@ -30,6 +30,8 @@ class MINIDUMP_UNLOADED_MODULE_LIST:
 
 # https://msdn.microsoft.com/en-us/library/windows/desktop/ms680523(v=vs.85).aspx
 class MINIDUMP_UNLOADED_MODULE:
+	__slots__ = ('BaseOfImage', 'SizeOfImage', 'CheckSum', 'TimeDateStamp', 'ModuleNameRva')
+
 	def __init__(self):
 		self.BaseOfImage = None
 		self.SizeOfImage = None
@@ -56,6 +58,8 @@ class MINIDUMP_UNLOADED_MODULE:
 		return mum
 
 class MinidumpUnloadedModule:
+	__slots__ = ('name', 'baseaddress', 'size', 'endaddress', 'memorysegments', 'checksum', 'timestamp')
+
 	def __init__(self):
 		self.name = None
 		self.baseaddress = None
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+import struct
+import collections
+
+# field type -> struct format character
+FIELD_TYPES = {
+	'BYTE'      : 'B',
+	'UCHAR'     : 'B',
+	'BOOLEAN'   : 'B',
+	'UINT8'     : 'B',
+	'CHAR'      : 'b',
+	'INT8'      : 'b',
+	'WORD'      : 'H',
+	'USHORT'    : 'H',
+	'WCHAR'     : 'H',
+	'SHORT'     : 'h',
+	'INT16'     : 'h',
+	'DWORD'     : 'I',
+	'DWORD32'   : 'I',
+	'ULONG'     : 'I',
+	'ULONG32'   : 'I',
+	'UINT'      : 'I',
+	'BOOL'      : 'I',
+	'LONG'      : 'i',
+	'INT'       : 'i',
+	'INT32'     : 'i',
+	'DWORD64'   : 'Q',
+	'DWORDLONG' : 'Q',
+	'ULONGLONG' : 'Q',
+	'ULONG64'   : 'Q',
+	'LONGLONG'  : 'q',
+	'LONG64'    : 'q',
+	'INT64'     : 'q',
+}
+
+# field types which have the size of a pointer, (format on 32 bit, format on 64 bit)
+POINTER_FIELD_TYPES = {
+	'PVOID'     : ('I', 'Q'),
+	'POINTER'   : ('I', 'Q'),
+	'HANDLE'    : ('I', 'Q'),
+	'PWSTR'     : ('I', 'Q'),
+	'SIZE_T'    : ('I', 'Q'),
+	'ULONG_PTR' : ('I', 'Q'),
+	'DWORD_PTR' : ('I', 'Q'),
+	'LONG_PTR'  : ('i', 'q'),
+	'INT_PTR'   : ('i', 'q'),
+}
+
+# arrays of these are decoded as bytes
+BYTE_FIELD_TYPES = ['BYTE', 'UCHAR', 'CHAR']
+
+class StructLayout:
+	"""
+	Declarative structure layout, a list of (name, type) or (name, type, count) fields.
+	type is a key of FIELD_TYPES/POINTER_FIELD_TYPES or another StructLayout (embedded structure), count makes the field an array.
+	The fields are placed with the natural C alignment, the layout is compiled once per pointer size into a struct.Struct,
+	so a structure is decoded with a single unpack. Decoded structures are namedtuples.
+	"""
+	def __init__(self, name, fields):
+		self.name = name
+		self.fields = fields
+		self.compiled = {} #pointer size -> CompiledStructLayout
+
+	def compile(self, ptr_size):
+		compiled = self.compiled.get(ptr_size)
+		if compiled is None:
+			compiled = CompiledStructLayout(self, ptr_size)
+			self.compiled[ptr_size] = compiled
+		return compiled
+
+	def get_size(self, ptr_size):
+		return self.compile(ptr_size).size
+
+	def get_offset(self, field_name, ptr_size):
+		return self.compile(ptr_size).offsets[field_name]
+
+	def unpack(self, data, ptr_size, offset = 0):
+		return self.compile(ptr_size).unpack(data, offset)
+
+class CompiledStructLayout:
+	"""
+	StructLayout compiled for a pointer size (4 or 8)
+	"""
+	def __init__(self, layout, ptr_size):
+		if ptr_size not in [4, 8]:
+			raise Exception('Unsupported pointer size %s' % ptr_size)
+		self.layout = layout
+		self.ptr_size = ptr_size
+		self.offsets = {}
+		self.alignment = 1
+		self.value_count = 0 # number of values the format produces
+		self.decoders = [] # (number of values, array count or None, embedded CompiledStructLayout or None) per field
+		self.body = '' # format without the byte order prefix, used when embedding this layout into another
+
+		pos = 0
+		for field in layout.fields:
+			name, ftype = field[0], field[1]
+			count = field[2] if len(field) > 2 else None
+			n = count if count is not None else 1
+			embedded = None
+			if isinstance(ftype, StructLayout):
+				embedded = ftype.compile(ptr_size)
+				size = embedded.size
+				alignment = embedded.alignment
+				fmt = embedded.body * n
+				values = embedded.value_count * n
+			else:
+				if ftype in FIELD_TYPES:
+					code = FIELD_TYPES[ftype]
+				elif ftype in POINTER_FIELD_TYPES:
+					code = POINTER_FIELD_TYPES[ftype][ptr_size == 8]
+				else:
+					raise Exception('Unknown field type %s in %s' % (ftype, layout.name))
+				size = alignment = struct.calcsize('<' + code)
+				if count is not None and ftype in BYTE_FIELD_TYPES:
+					fmt = '%ds' % count
+					values = 1
+					count = None # comes out as a single bytes value
+				else:
+					fmt = code * n
+					values = n
+
+			padding = -pos % alignment
+			if padding > 0:
+				self.body += '%dx' % padding
+				pos += padding
+			self.offsets[name] = pos
+			self.body += fmt
+			pos += size * n
+			self.alignment = max(self.alignment, alignment)
+			self.value_count += values
+			self.decoders.append((values, count, embedded))
+
+		padding = -pos % self.alignment
+		if padding > 0:
+			self.body += '%dx' % padding
+			pos += padding
+
+		self.struct = struct.Struct('<' + self.body)
+		self.size = self.struct.size
+		self.is_flat = all(count is None and embedded is None for _, count, embedded in self.decoders)
+		self.result_type = collections.namedtuple(layout.name, [field[0] for field in layout.fields])
+
+	def decode(self, values, pos):
+		"""
+		Builds the namedtuple from the flat list of unpacked values starting at pos, returns it and the position after it
+		"""
+		if self.is_flat:
+			return self.result_type._make(values[pos:pos + self.value_count]), pos + self.value_count
+		result = []
+		for n, count, embedded in self.decoders:
+			if embedded is not None:
+				if count is None:
+					value, pos = embedded.decode(values, pos)
+				else:
+					value = []
+					for _ in range(count):
+						item, pos = embedded.decode(values, pos)
+						value.append(item)
+				result.append(value)
+			elif count is not None:
+				result.append(values[pos:pos + n])
+				pos += n
+			else:
+				result.append(values[pos])
+				pos += 1
+		return self.result_type._make(result), pos
+
+	def unpack(self, data, offset = 0):
+		values = self.struct.unpack_from(data, offset)
+		if self.is_flat:
+			return self.result_type._make(values)
+		return self.decode(values, 0)[0]
+
+#https://msdn.microsoft.com/en-us/library/windows/hardware/ff554296(v=vs.85).aspx
+LIST_ENTRY = StructLayout('LIST_ENTRY', [
+	('Flink', 'PVOID'),
+	('Blink', 'PVOID'),
+])
+
+UNICODE_STRING = StructLayout('UNICODE_STRING', [
+	('Length', 'USHORT'),
+	('MaximumLength', 'USHORT'),
+	('Buffer', 'PWSTR'),
+])
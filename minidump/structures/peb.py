@@ -1,48 +1,67 @@
 from minidump.streams.SystemInfoStream import PROCESSOR_ARCHITECTURE
-
-
-PEB_OFFSETS = [
-	{  # x86 offsets
-		# _TEB offsets
-		"peb": 0x30,
-		# _PEB offsets
-		"being_debugged": 0x2,
-		"image_base_address": 0x8,
-		"process_parameters": 0x10,
-		# _RTL_USER_PROCESS_PARAMETERS offsets
-		"image_path": 0x38,
-		"command_line": 0x40,
-		"window_title": 0x70,
-		"dll_path": 0x30,
-		"current_directory": 0x24,
-		"standard_input": 0x18,
-		"standard_output": 0x1C,
-		"standard_error": 0x20,
-		"environment_variables": 0x48,
-		# _UNICODE_STRING offsets
-		"buffer": 0x4,
-	},
-	{  # x64 offsets
-		# _TEB offsets
-		"peb": 0x60,
-		# _PEB offsets
-		"being_debugged": 0x2,
-		"image_base_address": 0x10,
-		"process_parameters": 0x20,
-		# _RTL_USER_PROCESS_PARAMETERS offsets
-		"image_path": 0x60,
-		"command_line": 0x70,
-		"window_title": 0xB0,
-		"dll_path": 0x50,
-		"current_directory": 0x38,
-		"standard_input": 0x20,
-		"standard_output": 0x28,
-		"standard_error": 0x30,
-		"environment_variables": 0x80,
-		# _UNICODE_STRING offsets
-		"buffer": 0x8,
-	},
-]
+from minidump.structlayout import StructLayout, UNICODE_STRING
+
+
+# only the leading part of the structures, up to the last field we use
+TEB = StructLayout('TEB', [
+	# _NT_TIB
+	('ExceptionList', 'PVOID'),
+	('StackBase', 'PVOID'),
+	('StackLimit', 'PVOID'),
+	('SubSystemTib', 'PVOID'),
+	('FiberData', 'PVOID'),
+	('ArbitraryUserPointer', 'PVOID'),
+	('Self', 'PVOID'),
+	('EnvironmentPointer', 'PVOID'),
+	('ClientIdUniqueProcess', 'HANDLE'),
+	('ClientIdUniqueThread', 'HANDLE'),
+	('ActiveRpcHandle', 'PVOID'),
+	('ThreadLocalStoragePointer', 'PVOID'),
+	('ProcessEnvironmentBlock', 'PVOID'),
+])
+
+PEB_LAYOUT = StructLayout('PEB', [
+	('InheritedAddressSpace', 'BOOLEAN'),
+	('ReadImageFileExecOptions', 'BOOLEAN'),
+	('BeingDebugged', 'BOOLEAN'),
+	('BitField', 'BOOLEAN'),
+	('Mutant', 'HANDLE'),
+	('ImageBaseAddress', 'PVOID'),
+	('Ldr', 'PVOID'),
+	('ProcessParameters', 'PVOID'),
+])
+
+CURDIR = StructLayout('CURDIR', [
+	('DosPath', UNICODE_STRING),
+	('Handle', 'HANDLE'),
+])
+
+RTL_USER_PROCESS_PARAMETERS = StructLayout('RTL_USER_PROCESS_PARAMETERS', [
+	('MaximumLength', 'ULONG'),
+	('Length', 'ULONG'),
+	('Flags', 'ULONG'),
+	('DebugFlags', 'ULONG'),
+	('ConsoleHandle', 'HANDLE'),
+	('ConsoleFlags', 'ULONG'),
+	('StandardInput', 'HANDLE'),
+	('StandardOutput', 'HANDLE'),
+	('StandardError', 'HANDLE'),
+	('CurrentDirectory', CURDIR),
+	('DllPath', UNICODE_STRING),
+	('ImagePathName', UNICODE_STRING),
+	('CommandLine', UNICODE_STRING),
+	('Environment', 'PVOID'),
+	('StartingX', 'ULONG'),
+	('StartingY', 'ULONG'),
+	('CountX', 'ULONG'),
+	('CountY', 'ULONG'),
+	('CountCharsX', 'ULONG'),
+	('CountCharsY', 'ULONG'),
+	('FillAttribute', 'ULONG'),
+	('WindowFlags', 'ULONG'),
+	('ShowWindowFlags', 'ULONG'),
+	('WindowTitle', UNICODE_STRING),
+])
 
 class PEB:
 	def __init__(self):
@@ -62,15 +81,11 @@ class PEB:
 		self.standard_error = None
 		self.environment_variables = []
 	
-	def read_unicode_string_property(self, reader, addr):
-		reader.move(addr)
-		string_length = int.from_bytes(reader.read(2), "little")
-		if not string_length:
+	def read_unicode_string(self, reader, unicode_string):
+		if not unicode_string.Length:
 			return ""
-		reader.move(addr + PEB_OFFSETS[self.is_x64]["buffer"])
-		buff_va = int.from_bytes(reader.read(self.ptr_size), "little")
-		reader.move(buff_va)
-		return reader.read(string_length).decode("utf-16")
+		reader.move(unicode_string.Buffer)
+		return bytes(reader.read(unicode_string.Length)).decode("utf-16")
 	
 	@staticmethod
 	def from_minidump(minidumpfile):
@@ -80,64 +95,40 @@ class PEB:
 		peb = PEB()
 		peb.is_x64 = not(reader.sysinfo.ProcessorArchitecture == PROCESSOR_ARCHITECTURE.INTEL) #dunno if this is the best way...
 		peb.ptr_size = 8 if peb.is_x64 else 4
-		offset_index = int(peb.is_x64)		
-
-		buff_reader.move(minidumpfile.threads.threads[0].Teb + PEB_OFFSETS[offset_index]["peb"])
-
-		peb.address = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
-
-		buff_reader.move(peb.address + PEB_OFFSETS[offset_index]["being_debugged"])
-		peb.being_debugged = int.from_bytes(buff_reader.read(1), "little")
-
-		buff_reader.move(peb.address + PEB_OFFSETS[offset_index]["image_base_address"])
-		peb.image_base_address = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
-
-		buff_reader.move(peb.address + PEB_OFFSETS[offset_index]["process_parameters"])
-		process_parameters = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
-
-		peb.image_path = peb.read_unicode_string_property(
-			buff_reader, process_parameters + PEB_OFFSETS[offset_index]["image_path"]
-		)
-
-		peb.command_line = peb.read_unicode_string_property(
-			buff_reader, process_parameters + PEB_OFFSETS[offset_index]["command_line"]
-		)
-
-		peb.window_title = peb.read_unicode_string_property(
-			buff_reader, process_parameters + PEB_OFFSETS[offset_index]["window_title"]
-		)
-
-		peb.dll_path = peb.read_unicode_string_property(buff_reader, process_parameters + PEB_OFFSETS[offset_index]["dll_path"])
-
-		peb.current_directory = peb.read_unicode_string_property(
-			buff_reader, process_parameters + PEB_OFFSETS[offset_index]["current_directory"]
-		)
-
-		buff_reader.move(process_parameters + PEB_OFFSETS[offset_index]["standard_input"])
-		peb.standard_input = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
-
-		buff_reader.move(process_parameters + PEB_OFFSETS[offset_index]["standard_output"])
-		peb.standard_output = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
 
-		buff_reader.move(process_parameters + PEB_OFFSETS[offset_index]["standard_error"])
-		peb.standard_error = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
+		# one read per structure
+		teb = buff_reader.read_struct(TEB, minidumpfile.threads.threads[0].Teb)
+		peb.address = teb.ProcessEnvironmentBlock
+
+		peb_struct = buff_reader.read_struct(PEB_LAYOUT, peb.address)
+		peb.being_debugged = peb_struct.BeingDebugged
+		peb.image_base_address = peb_struct.ImageBaseAddress
+		peb.process_parameters = peb_struct.ProcessParameters
+
+		params = buff_reader.read_struct(RTL_USER_PROCESS_PARAMETERS, peb.process_parameters)
+		peb.image_path = peb.read_unicode_string(buff_reader, params.ImagePathName)
+		peb.command_line = peb.read_unicode_string(buff_reader, params.CommandLine)
+		peb.window_title = peb.read_unicode_string(buff_reader, params.WindowTitle)
+		peb.dll_path = peb.read_unicode_string(buff_reader, params.DllPath)
+		peb.current_directory = peb.read_unicode_string(buff_reader, params.CurrentDirectory.DosPath)
+		peb.standard_input = params.StandardInput
+		peb.standard_output = params.StandardOutput
+		peb.standard_error = params.StandardError
 
 		# Parse Environment Variables from PEB
-		buff_reader.move(process_parameters + PEB_OFFSETS[offset_index]["environment_variables"])
-		environment_va = int.from_bytes(buff_reader.read(peb.ptr_size), "little")
-		buff_reader.move(environment_va)
+		buff_reader.move(params.Environment)
 
-		env_buffer = buff_reader.read(buff_reader.current_segment.end_address - buff_reader.current_position)
-		while (env_len := env_buffer.find(b"\x00\x00")) and (env_len != -1):
-			decoded_env = (env_buffer[:env_len] + b"\x00").decode("utf-16")
+		# the environment block is read once and decoded in place, it may span multiple (contiguous) segments
+		env_buffer = bytes(buff_reader.read(buff_reader.current_segment.end_address - buff_reader.current_position))
+		env_offset = 0
+		while (env_len := env_buffer.find(b"\x00\x00", env_offset)) != -1 and env_len != env_offset:
+			decoded_env = (env_buffer[env_offset:env_len] + b"\x00").decode("utf-16")
 			name = decoded_env
 			value = ""
 			if decoded_env.find("=") != -1:
 				name, value = decoded_env.split("=", 1)
 			peb.environment_variables.append({"name": name, "value": value})
-			environment_va += (len(decoded_env) + 1) * 2
-			buff_reader.move(environment_va)
-			env_buffer = buff_reader.read(buff_reader.current_segment.end_address - buff_reader.current_position)
+			env_offset += (len(decoded_env) + 1) * 2
 
 		return peb
 
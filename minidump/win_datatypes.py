@@ -56,11 +56,11 @@ class PBYTE(POINTER):
 
 class CCHAR:
 	def __init__(self, reader):
-		self.value = reader.read(1).decode('ascii')
+		self.value = bytes(reader.read(1)).decode('ascii')
 
 class CHAR:
 	def __init__(self, reader):
-		self.value = reader.read(1).decode('ascii')
+		self.value = bytes(reader.read(1)).decode('ascii')
 
 class UCHAR:
 	def __init__(self, reader):
@@ -39,6 +39,9 @@ setup(
 
 	# long_description=open("README.txt").read(),
 	python_requires='>=3.6',
+	extras_require={
+		'numpy': ['numpy'],
+	},
 	classifiers=(
 		"Programming Language :: Python :: 3.6",
 		"License :: OSI Approved :: MIT License",
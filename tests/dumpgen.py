@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Builds small synthetic x64 full memory dumps for the tests and benchmarks
+#
+import struct
+import random
+
+def u16(x):
+	return struct.pack('<H', x)
+
+def u32(x):
+	return struct.pack('<I', x)
+
+def u64(x):
+	return struct.pack('<Q', x)
+
+def make_dump(segment_count = 200, segment_size = 0x1000, gap_every = 3, seed = 1):
+	"""
+	Returns the bytes of a dump with sysinfo, module list, memory info list and memory64 list streams, and the list
+	of (virtual address, data) memory segments in it. Every gap_every-th segment is followed by an unmapped gap.
+	"""
+	rnd = random.Random(seed)
+	segments = []
+	va = 0x10000
+	for i in range(segment_count):
+		size = segment_size * rnd.choice([1, 1, 2, 4])
+		segments.append((va, rnd.randbytes(size)))
+		va += size
+		if i % gap_every == gap_every - 1:
+			va += 0x10000
+
+	modules = [
+		('C:\\Windows\\System32\\ntdll.dll', segments[min(10, segment_count - 1)][0]),
+		('C:\\Windows\\System32\\lsass.exe', segments[min(30, segment_count - 1)][0]),
+	]
+
+	out = bytearray(32)
+	def align():
+		while len(out) % 8:
+			out.append(0)
+	directories = []
+
+	name_rvas = []
+	for name, _ in modules:
+		align()
+		name_rvas.append(len(out))
+		data = name.encode('utf-16-le')
+		out.extend(u32(len(data)) + data + b'\x00\x00')
+	align()
+	csd_rva = len(out)
+	out.extend(u32(0))
+
+	# SystemInfoStream, AMD64
+	data = u16(9) + u16(6) + u16(0) + bytes([4, 1]) + u32(10) + u32(0) + u32(19041) + u32(2) + u32(csd_rva) + u16(0) + u16(0) + u64(0) * 2
+	align()
+	directories.append((7, len(data), len(out)))
+	out.extend(data)
+
+	# ModuleListStream, every module is 0x4000 bytes
+	data = u32(len(modules))
+	for (_, base), rva in zip(modules, name_rvas):
+		data += u64(base) + u32(0x4000) + u32(0) + u32(0) + u32(rva) + b'\x00' * 52 + b'\x00' * 16 + u64(0) + u64(0)
+	align()
+	directories.append((4, len(data), len(out)))
+	out.extend(data)
+
+	# MemoryInfoListStream, committed read-write private memory
+	data = u32(16) + u32(48) + u64(len(segments))
+	for va, segment in segments:
+		data += u64(va) + u64(va) + u32(4) + u32(0) + u64(len(segment)) + u32(0x1000) + u32(4) + u32(0x20000) + u32(0)
+	align()
+	directories.append((16, len(data), len(out)))
+	out.extend(data)
+
+	# Memory64ListStream, the memory follows the descriptors
+	align()
+	rva = len(out)
+	data = u64(len(segments)) + u64(rva + 16 + 16 * len(segments))
+	for va, segment in segments:
+		data += u64(va) + u64(len(segment))
+	directories.append((9, len(data), rva))
+	out.extend(data)
+	for _, segment in segments:
+		out.extend(segment)
+
+	directory_rva = len(out)
+	for stream_type, size, rva in directories:
+		out.extend(u32(stream_type) + u32(size) + u32(rva))
+	out[0:32] = b'MDMP' + u16(0xa793) + u16(0) + u32(len(directories)) + u32(directory_rva) + u32(0) + u32(0) + u32(2) + u32(0)
+	return bytes(out), segments
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Tests of the HTTP Range file sources against a local http.server stand-in,
+# the request counts measure the read amplification.
+#
+import re
+import sys
+import asyncio
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from minidump.minidumpfile import MinidumpFile
+from minidump.aminidumpfile import AMinidumpFile
+from minidump.httpfile import HTTPRangeFile, get_fetch_parts
+from minidump.ahttpfile import AHTTPRangeFile
+
+from dumpgen import make_dump
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+	"""
+	Serves server.files with Range support and keep-alive connections, counts the requests and the bytes sent.
+	server.truncate: number of responses which only send half of their body and close the connection
+	server.ranges: False answers every request with the whole file (status 200)
+	"""
+	protocol_version = 'HTTP/1.1'
+	# headers and body are separate writes, with Nagle every keep-alive response would wait for a delayed ACK
+	disable_nagle_algorithm = True
+
+	def log_message(self, format, *args):
+		pass
+
+	def do_GET(self):
+		server = self.server
+		with server.lock:
+			server.requests += 1
+			server.connections.add(self.client_address)
+		data = server.files.get(self.path.split('?')[0])
+		if data is None:
+			self.send_response(404)
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+		m = re.match(r'bytes=(\d+)-(\d+)$', self.headers.get('Range', ''))
+		if m is None or server.ranges is False:
+			self.send_response(200)
+			self.send_header('Content-Length', str(len(data)))
+			self.end_headers()
+			self.wfile.write(data)
+			return
+		start = int(m.group(1))
+		end = min(int(m.group(2)) + 1, len(data))
+		if start >= len(data):
+			self.send_response(416)
+			self.send_header('Content-Range', 'bytes */%d' % len(data))
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+		body = data[start:end]
+		self.send_response(206)
+		self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, end - 1, len(data)))
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		with server.lock:
+			truncate = server.truncate > 0 and len(body) > 1
+			if truncate:
+				server.truncate -= 1
+		if truncate:
+			body = body[:len(body) // 2]
+			self.close_connection = True
+		with server.lock:
+			server.sent_bytes += len(body)
+		self.wfile.write(body)
+
+class RangeTestServer(ThreadingHTTPServer):
+	daemon_threads = True
+
+	def handle_error(self, request, client_address):
+		# the clients of the truncation and no Range tests close their connection in the middle of a response
+		if isinstance(sys.exc_info()[1], ConnectionError):
+			return
+		ThreadingHTTPServer.handle_error(self, request, client_address)
+
+class HTTPRangeTestBase(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.dump, cls.segments = make_dump(segment_count = 300, segment_size = 0x2000)
+		cls.blob = bytes(range(256)) * 4096 # 1 MB
+		cls.server = RangeTestServer(('127.0.0.1', 0), RangeRequestHandler)
+		cls.server.lock = threading.Lock()
+		cls.server.files = {'/test.dmp' : cls.dump, '/blob.bin' : cls.blob}
+		cls.thread = threading.Thread(target = cls.server.serve_forever, daemon = True)
+		cls.thread.start()
+		cls.base_url = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.server.server_close()
+
+	def setUp(self):
+		self.server.requests = 0
+		self.server.sent_bytes = 0
+		self.server.connections = set()
+		self.server.truncate = 0
+		self.server.ranges = True
+
+class TestFetchParts(unittest.TestCase):
+	def test_runs(self):
+		self.assertEqual(get_fetch_parts([1, 2, 3, 7, 9, 10], 1), [(1, 3), (7, 7), (9, 10)])
+
+	def test_split(self):
+		self.assertEqual(get_fetch_parts(list(range(8)), 4), [(0, 1), (2, 3), (4, 5), (6, 7)])
+		self.assertEqual(get_fetch_parts([0, 1, 2], 8), [(0, 0), (1, 1), (2, 2)])
+
+class TestHTTPRangeFile(HTTPRangeTestBase):
+	def test_read_at(self):
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096)
+		self.assertEqual(f.read_at(100, 50), self.blob[100:150])
+		self.assertEqual(self.server.requests, 1)
+		self.assertEqual(f.size, len(self.blob))
+		# same block, served from the cache
+		self.assertEqual(f.read_at(200, 3000), self.blob[200:3200])
+		self.assertEqual(self.server.requests, 1)
+		self.assertEqual(self.server.sent_bytes, 4096)
+		f.close()
+
+	def test_end_of_file(self):
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096)
+		# the size is not known yet, the two blocks are fetched in parallel and the one past the end costs a request
+		# (answered with 416) unless the response of the other one told the size already
+		self.assertEqual(f.read_at(len(self.blob) - 10, 100), self.blob[-10:])
+		requests = self.server.requests
+		self.assertIn(requests, (1, 2))
+		self.assertEqual(f.size, len(self.blob))
+		self.assertEqual(f.read_at(len(self.blob) - 10, 100), self.blob[-10:])
+		self.assertEqual(f.read_at(len(self.blob) + 5, 10), b'')
+		self.assertEqual(self.server.requests, requests)
+		f.close()
+
+	def test_file_interface(self):
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096)
+		f.seek(5000)
+		self.assertEqual(f.read(10), self.blob[5000:5010])
+		self.assertEqual(f.tell(), 5010)
+		f.seek(-20, 2)
+		self.assertEqual(f.read(), self.blob[-20:])
+		self.assertEqual(f.tell(), len(self.blob))
+		f.close()
+
+	def test_parallel_adjacent_blocks(self):
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096, max_connections = 4)
+		self.assertEqual(f.read_at(0, 8 * 4096), self.blob[:8 * 4096])
+		# 8 missing blocks, fetched with 4 requests of 2 blocks
+		self.assertEqual(self.server.requests, 4)
+		self.assertEqual(self.server.sent_bytes, 8 * 4096)
+		f.close()
+
+	def test_single_connection_one_request(self):
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096, max_connections = 1)
+		self.assertEqual(f.read_at(4096, 8 * 4096), self.blob[4096:9 * 4096])
+		self.assertEqual(self.server.requests, 1)
+		f.close()
+
+	def test_keep_alive(self):
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096)
+		for i in range(10):
+			self.assertEqual(f.read_at(i * 3 * 4096, 16), self.blob[i * 3 * 4096 : i * 3 * 4096 + 16])
+		self.assertEqual(self.server.requests, 10)
+		self.assertEqual(len(self.server.connections), 1)
+		self.assertEqual(f.get_stats()['connections_opened'], 1)
+		f.close()
+
+	def test_short_read_retry(self):
+		self.server.truncate = 3
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096, max_connections = 1)
+		self.assertEqual(f.read_at(0, 3 * 4096), self.blob[:3 * 4096])
+		# every truncated response is followed by a request for the missing tail only
+		self.assertEqual(self.server.requests, 4)
+		self.assertEqual(f.get_stats()['retried'], 3)
+		self.assertEqual(self.server.sent_bytes, 3 * 4096)
+		f.close()
+
+	def test_retries_exhausted(self):
+		self.server.truncate = 100
+		f = HTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096, retries = 2)
+		with self.assertRaises(Exception):
+			f.read_at(0, 1)
+		f.close()
+
+	def test_no_range_support(self):
+		self.server.ranges = False
+		f = HTTPRangeFile(self.base_url + '/blob.bin')
+		with self.assertRaisesRegex(Exception, 'does not support range requests'):
+			f.read_at(0, 10)
+		# not retried
+		self.assertEqual(self.server.requests, 1)
+		f.close()
+
+	def test_parse_external(self):
+		f = HTTPRangeFile(self.base_url + '/test.dmp', block_size = 16*1024)
+		mf = MinidumpFile.parse_external(f, filename = 'test.dmp')
+		local = MinidumpFile.parse_bytes(self.dump)
+		self.assertEqual([m.name for m in mf.modules.modules], [m.name for m in local.modules.modules])
+		self.assertEqual(len(mf.memory_segments_64.memory_segments), len(self.segments))
+
+		reader = mf.get_reader()
+		va, data = self.segments[150]
+		self.assertEqual(bytes(reader.read(va + 100, 64)), data[100:164])
+		buffered = reader.get_buffered_reader()
+		buffered.move(va)
+		self.assertEqual(bytes(buffered.read(0x100)), data[:0x100])
+
+		# parsing and the reads touch the header, the stream data at the start and 1-2 blocks of memory
+		self.assertLessEqual(self.server.requests, 6)
+		self.assertLess(self.server.sent_bytes, len(self.dump) // 4)
+		self.assertEqual(f.get_stats()['requests'], self.server.requests)
+		f.close()
+
+class TestAHTTPRangeFile(HTTPRangeTestBase):
+	def run_async(self, coro):
+		return asyncio.run(coro)
+
+	def test_read_at(self):
+		async def test():
+			f = AHTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096)
+			self.assertEqual(await f.read_at(100, 50), self.blob[100:150])
+			self.assertEqual(await f.read_at(200, 3000), self.blob[200:3200])
+			self.assertEqual(await f.get_size(), len(self.blob))
+			self.assertEqual(await f.read_at(len(self.blob) - 10, 100), self.blob[-10:])
+			self.assertEqual(await f.read_at(len(self.blob) + 5, 10), b'')
+			f.close()
+		self.run_async(test())
+		self.assertEqual(self.server.requests, 2)
+
+	def test_coalescing(self):
+		async def test():
+			f = AHTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096)
+			results = await asyncio.gather(*[f.read_at(8192 + i, 100) for i in range(30)])
+			for i, data in enumerate(results):
+				self.assertEqual(data, self.blob[8192 + i : 8192 + i + 100])
+			stats = f.get_stats()
+			f.close()
+			return stats
+		stats = self.run_async(test())
+		# 30 tasks missing the same block wait for a single request
+		self.assertEqual(self.server.requests, 1)
+		self.assertEqual(stats['cache']['coalesced'], 29)
+		self.assertEqual(stats['cache']['pending'], 0)
+
+	def test_parallel_adjacent_blocks(self):
+		async def test():
+			f = AHTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096, max_connections = 4)
+			self.assertEqual(await f.read_at(0, 8 * 4096), self.blob[:8 * 4096])
+			f.close()
+		self.run_async(test())
+		self.assertEqual(self.server.requests, 4)
+
+	def test_short_read_retry(self):
+		self.server.truncate = 2
+		async def test():
+			f = AHTTPRangeFile(self.base_url + '/blob.bin', block_size = 4096, max_connections = 1)
+			self.assertEqual(await f.read_at(0, 2 * 4096), self.blob[:2 * 4096])
+			f.close()
+			return f.get_stats()
+		stats = self.run_async(test())
+		self.assertEqual(self.server.requests, 3)
+		self.assertEqual(stats['retried'], 2)
+
+	def test_no_range_support(self):
+		self.server.ranges = False
+		async def test():
+			f = AHTTPRangeFile(self.base_url + '/blob.bin')
+			with self.assertRaisesRegex(Exception, 'does not support range requests'):
+				await f.read_at(0, 10)
+			self.assertEqual(f.get_stats()['cache']['pending'], 0)
+			f.close()
+		self.run_async(test())
+
+	def test_parse_external(self):
+		async def test():
+			f = AHTTPRangeFile(self.base_url + '/test.dmp', block_size = 16*1024)
+			mf = await AMinidumpFile.parse_external(f, filename = 'test.dmp')
+			self.assertEqual(len(mf.memory_segments_64.memory_segments), len(self.segments))
+			reader = mf.get_reader()
+			va, data = self.segments[150]
+			self.assertEqual(bytes(await reader.read(va + 100, 64)), data[100:164])
+			buffered = reader.get_buffered_reader()
+			await buffered.move(va)
+			self.assertEqual(bytes(await buffered.read(0x100)), data[:0x100])
+			self.assertEqual(await reader.search(data[0x200:0x210]), [va + 0x200])
+			f.close()
+		self.run_async(test())
+		# the search reads the whole dump, through the block cache every byte is transferred at most once
+		self.assertLessEqual(self.server.sent_bytes, len(self.dump))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Tests of the columnar memory info table built from parsed memory info objects.
+#
+import io
+import struct
+import unittest
+
+from minidump.streams.MemoryInfoListStream import MINIDUMP_MEMORY_INFO, MinidumpMemoryInfo, MinidumpMemoryInfoTable, AllocationProtect, MemoryState
+from minidump.addressmap import MinidumpAddressMap
+
+MEM_COMMIT = 0x1000
+MEM_PRIVATE = 0x20000
+# protect values which are not AllocationProtect members, they are parsed as None
+PAGE_READWRITE_GUARD = 0x104
+PAGE_READWRITE_NOCACHE = 0x204
+PAGE_EXECUTE_READWRITE_GUARD = 0x140
+
+def make_info(base, protect):
+	data = struct.pack('<QQIIQIIII', base, base, 4, 0, 0x1000, MEM_COMMIT, protect, MEM_PRIVATE, 0)
+	return MinidumpMemoryInfo.parse(MINIDUMP_MEMORY_INFO.parse(io.BytesIO(data)), None)
+
+class TestMemoryInfoTable(unittest.TestCase):
+	def setUp(self):
+		self.infos = [
+			make_info(0x10000, AllocationProtect.PAGE_READWRITE.value),
+			make_info(0x20000, PAGE_READWRITE_GUARD),
+			make_info(0x30000, PAGE_READWRITE_NOCACHE),
+			make_info(0x40000, PAGE_EXECUTE_READWRITE_GUARD),
+			make_info(0x50000, AllocationProtect.NONE.value),
+		]
+
+	def test_parse(self):
+		self.assertEqual(self.infos[0].Protect, AllocationProtect.PAGE_READWRITE)
+		self.assertIsNone(self.infos[1].Protect)
+		self.assertEqual(self.infos[1].raw_protect, PAGE_READWRITE_GUARD)
+		self.assertEqual(self.infos[1].State, MemoryState.MEM_COMMIT)
+		self.assertIsNone(self.infos[0].raw_protect)
+
+	def test_from_infos_keeps_raw_protect(self):
+		table = MinidumpMemoryInfoTable.from_infos(self.infos)
+		self.assertEqual(list(table.protects), [0x04, PAGE_READWRITE_GUARD, PAGE_READWRITE_NOCACHE, PAGE_EXECUTE_READWRITE_GUARD, 0])
+		# the table rebuilds the info objects from the columns, unknown protection stays unknown
+		table.infos = [None] * len(table)
+		self.assertIsNone(table[1].Protect)
+		self.assertEqual(table[1].raw_protect, PAGE_READWRITE_GUARD)
+		self.assertEqual(table[4].Protect, AllocationProtect.NONE)
+		self.assertEqual(MinidumpMemoryInfoTable.from_infos(list(table)).protects, table.protects)
+
+	def test_filters(self):
+		table = MinidumpMemoryInfoTable.from_infos(self.infos)
+		guard = [x.BaseAddress for x in table.select(protect_flags = AllocationProtect.PAGE_GUARD.value)]
+		self.assertEqual(guard, [0x20000, 0x40000])
+		rwx = [x.BaseAddress for x in table.select(protect_flags = AllocationProtect.PAGE_EXECUTE_READWRITE.value)]
+		self.assertEqual(rwx, [0x40000])
+
+	def test_address_map(self):
+		address_map = MinidumpAddressMap(memory_info = self.infos)
+		accessible = [address_map.find(x.BaseAddress).is_accessible for x in self.infos]
+		self.assertEqual(accessible, [True, False, True, False, False])
+
+if __name__ == '__main__':
+	unittest.main()
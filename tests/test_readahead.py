@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Tests of the adaptive read-ahead window of the buffered readers.
+#
+import os
+import asyncio
+import tempfile
+import unittest
+
+from minidump.minidumpfile import MinidumpFile
+from minidump.aminidumpfile import AMinidumpFile
+from minidump.chunkcache import MinidumpReadAhead
+
+from dumpgen import make_dump
+
+BLOCK_SIZE = 0x1000
+
+class TestReadAheadWindow(unittest.TestCase):
+	def test_access(self):
+		readahead = MinidumpReadAhead(block_size = BLOCK_SIZE)
+		self.assertFalse(readahead.access(0x1000, 0x1008))
+		# peeking at the same place again is not sequential
+		self.assertFalse(readahead.access(0x1000, 0x1008))
+		self.assertFalse(readahead.access(0x1000, 0x1100))
+		self.assertTrue(readahead.access(0x1100, 0x1200))
+		self.assertFalse(readahead.access(0x8000, 0x8008))
+
+	def test_get_window(self):
+		readahead = MinidumpReadAhead(initial_size = 0x4000, block_size = BLOCK_SIZE)
+		self.assertEqual(readahead.get_window(), 0x4000)
+		self.assertEqual(readahead.get_window(), 0x4000)
+		readahead.adjust(True)
+		self.assertEqual(readahead.get_window(), 0x8000)
+		readahead.adjust(False)
+		readahead.adjust(False)
+		self.assertEqual(readahead.get_window(), 0x2000)
+
+class ReadAheadTestBase(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		dump, segments = make_dump(segment_count = 50, segment_size = 0x10000)
+		cls.tempdir = tempfile.TemporaryDirectory()
+		cls.filename = os.path.join(cls.tempdir.name, 'test.dmp')
+		with open(cls.filename, 'wb') as f:
+			f.write(dump)
+		cls.va, cls.data = [x for x in segments if len(x[1]) >= 0x10000][0]
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.tempdir.cleanup()
+
+	def put_every_other_block(self, br):
+		"""
+		Caches blocks 2, 4, 6 after the one holding self.va, a read of the first 7 blocks then has 3 missing runs
+		"""
+		segment = br.current_segment
+		base = (self.va - segment.start_address) // BLOCK_SIZE
+		for k in [2, 4, 6]:
+			br.cache.put((segment.start_address, base + k), self.data[k * BLOCK_SIZE : (k + 1) * BLOCK_SIZE])
+
+class TestReadAheadReader(ReadAheadTestBase):
+	def test_window_grows_once_per_read(self):
+		br = MinidumpFile.parse(self.filename).get_reader().get_buffered_reader(segment_chunk_size = BLOCK_SIZE)
+		br.move(self.va)
+		self.assertEqual(br.read(8), self.data[:8])
+		self.assertEqual(br.get_readahead_stats()['window'], BLOCK_SIZE)
+		self.put_every_other_block(br)
+		# sequential read with 3 missing runs
+		self.assertEqual(br.read(7 * BLOCK_SIZE - 8), self.data[8 : 7 * BLOCK_SIZE])
+		self.assertEqual(br.get_readahead_stats()['window'], 2 * BLOCK_SIZE)
+
+	def test_peeks_keep_window(self):
+		br = MinidumpFile.parse(self.filename).get_reader().get_buffered_reader(segment_chunk_size = 4 * BLOCK_SIZE)
+		br.move(self.va)
+		self.assertEqual(br.peek(8), self.data[:8])
+		window = br.get_readahead_stats()['window']
+		for _ in range(5):
+			self.assertEqual(br.peek(8), self.data[:8])
+		self.assertEqual(br.get_readahead_stats()['window'], window)
+		self.assertEqual(br.get_readahead_stats()['sequential_reads'], 0)
+
+class TestAReadAheadReader(ReadAheadTestBase):
+	def test_window_grows_once_per_read(self):
+		async def run():
+			mf = await AMinidumpFile.parse(self.filename)
+			br = mf.get_reader().get_buffered_reader(segment_chunk_size = BLOCK_SIZE)
+			await br.move(self.va)
+			self.assertEqual(await br.read(8), self.data[:8])
+			self.assertEqual(br.get_readahead_stats()['window'], BLOCK_SIZE)
+			self.put_every_other_block(br)
+			self.assertEqual(await br.read(7 * BLOCK_SIZE - 8), self.data[8 : 7 * BLOCK_SIZE])
+			self.assertEqual(br.get_readahead_stats()['window'], 2 * BLOCK_SIZE)
+		asyncio.run(run())
+
+if __name__ == '__main__':
+	unittest.main()
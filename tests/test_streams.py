@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+#
+# Author:
+#  Tamas Jos (@skelsec)
+#
+# Tests of parsing a subset of the streams (the streams parameter of parse) and reading the dump afterwards.
+#
+import os
+import asyncio
+import tempfile
+import unittest
+
+from minidump.minidumpfile import MinidumpFile
+from minidump.aminidumpfile import AMinidumpFile
+
+from dumpgen import make_dump
+
+class SelectedStreamsTestBase(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.dump, cls.segments = make_dump(segment_count = 50)
+		cls.tempdir = tempfile.TemporaryDirectory()
+		cls.filename = os.path.join(cls.tempdir.name, 'test.dmp')
+		with open(cls.filename, 'wb') as f:
+			f.write(cls.dump)
+		va, data = cls.segments[20]
+		cls.pattern = data[0x10:0x30]
+		cls.pattern_address = va + 0x10
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.tempdir.cleanup()
+
+class TestSelectedStreams(SelectedStreamsTestBase):
+	def test_without_modules(self):
+		mf = MinidumpFile.parse(self.filename, streams = ['sysinfo', 'memory_segments_64'])
+		self.assertIsNone(mf.modules)
+		self.assertIsNone(mf.memory_info)
+		reader = mf.get_reader()
+		self.assertEqual(reader.modules, [])
+		self.assertIn(self.pattern_address, reader.search(self.pattern))
+		va, data = self.segments[3]
+		self.assertEqual(reader.read(va, len(data)), data)
+
+	def test_parse_memory(self):
+		reader = MinidumpFile.parse_memory(self.dump, streams = ['sysinfo', 'memory_segments_64']).get_reader()
+		self.assertIn(self.pattern_address, reader.search(self.pattern))
+
+	def test_missing_memory_stream(self):
+		mf = MinidumpFile.parse(self.filename, streams = ['sysinfo', 'modules'])
+		with self.assertRaisesRegex(Exception, 'memory_segments_64'):
+			mf.get_reader()
+
+	def test_missing_sysinfo(self):
+		mf = MinidumpFile.parse(self.filename, streams = ['memory_segments_64'])
+		with self.assertRaisesRegex(Exception, 'sysinfo'):
+			mf.get_reader()
+
+class TestASelectedStreams(SelectedStreamsTestBase):
+	def test_without_modules(self):
+		async def run():
+			mf = await AMinidumpFile.parse(self.filename, streams = ['sysinfo', 'memory_segments_64'])
+			self.assertIsNone(mf.modules)
+			reader = mf.get_reader()
+			self.assertEqual(reader.modules, [])
+			self.assertIn(self.pattern_address, await reader.search(self.pattern))
+			va, data = self.segments[3]
+			self.assertEqual(await reader.read(va, len(data)), data)
+		asyncio.run(run())
+
+	def test_missing_memory_stream(self):
+		async def run():
+			mf = await AMinidumpFile.parse(self.filename, streams = ['sysinfo', 'modules'])
+			with self.assertRaisesRegex(Exception, 'memory_segments_64'):
+				mf.get_reader()
+		asyncio.run(run())
+
+if __name__ == '__main__':
+	unittest.main()